@@ -1,5 +1,6 @@
 import logging
 from logging import config
+import os
 import logging.handlers
 import time
 import threading
@@ -7,9 +8,18 @@ from datetime import datetime
 from src.config.config_manager import ConfigManager
 from src.auth.auth_manager import AuthManager
 from src.detection.trade_detector import TradeDetector
+from src.detection.poll_scheduler import PollScheduler
+from src.detection.fill_aggregator import FillAggregator
+from src.detection.trade_netter import TradeNetter
 from src.safety.safety_manager import SafetyManager
 from src.mirror.mirror_engine import MirrorEngine
+from src.mirror.execution_queue import ExecutionQueue
 from src.health.health_monitor import HealthMonitor
+from src.backtest.session_replay import SessionRecorder, SessionReplay
+from src.backtest.simulated_broker import SimulatedBroker
+from src.utils.retry_policy import RetryPolicy
+from src.utils.instrument_store import InstrumentStore, SCRIP_MASTER_URL
+from src.utils.symbol_parser import parse_symbol, underlying_of
 
 class MirroringController:
     def debug_symbol_search(self, symbol):
@@ -45,12 +55,7 @@ class MirroringController:
                     print(f"❌ Exact match NOT found for: {symbol}")
                     
                 # Also try with just the base symbol
-                if 'BANKNIFTY' in symbol:
-                    base_symbol = 'BANKNIFTY'
-                elif 'NIFTY' in symbol:
-                    base_symbol = 'NIFTY'
-                else:
-                    base_symbol = symbol.split('2')[0] if '2' in symbol else symbol
+                base_symbol = underlying_of(symbol) or symbol
                     
                 print(f"\n🔍 Trying base symbol search: {base_symbol}")
                 base_search = connection.search_scrip(exchange='NFO', searchscrip=base_symbol)
@@ -95,13 +100,53 @@ class MirroringController:
         # ✅ FIXED: Temporarily disable max_trade_qty for testing
         self.max_trade_qty = None
         
+        # Offline replay of a recorded session (clock follows the recording)
+        settings = self.config.get_settings()
+        self.recorder = None
+        self.replay = None
+        if settings.get('replay_session_path'):
+            self.replay = SessionReplay(settings['replay_session_path'], speed=settings.get('replay_speed', 1.0))
+        now_func = self.replay.now if self.replay else datetime.now
+        # Dry runs place mirror orders on a simulated broker, with their own trade stores
+        # (the detector's too, so simulated detections never mark live trades processed)
+        self.simulator = None
+        dry_run_db = None
+        detector_db = None
+        if settings.get('dry_run', True) and settings.get('dry_run_simulation', True) and not self.replay:
+            self.simulator = SimulatedBroker(settings)
+            dry_run_dir = settings.get('dry_run_dir', 'data/dry_run')
+            detector_db = os.path.join(dry_run_dir, 'processed_trades.db')
+            dry_run_db = os.path.join(dry_run_dir, 'mirrored_trades.db')
+        if self.replay:
+            # A replay never touches the live stores: every run gets a fresh scratch directory
+            # for processed trades, mirrored trades and the intent journal
+            scratch_dir = os.path.join(settings.get('replay_dir', 'data/replay'),
+                                       datetime.now().strftime('%Y%m%d_%H%M%S'))
+            detector_db = os.path.join(scratch_dir, 'processed_trades.db')
+            dry_run_db = os.path.join(scratch_dir, 'mirrored_trades.db')
+            self.logger.info(f"Replay stores in {scratch_dir}")
+        
         # Initialize modules with proper error handling
+        try:
+            self.instruments = InstrumentStore(
+                settings.get('instrument_db', 'data/instruments.db'),
+                source_url=settings.get('instrument_master_url') or SCRIP_MASTER_URL,
+                local_file=settings.get('instrument_master_file')
+            )
+        except Exception as e:
+            self.logger.warning(f"Instrument index unavailable - using search_scrip and LOT_SIZE: {e}")
+            self.instruments = None
         try:
             self.auth = AuthManager(self.config)
-            self.detector = TradeDetector(self.config, self.auth)
-            self.safety = SafetyManager(self.config)
-            self.mirror_engine = MirrorEngine(self.config, self.auth, self.safety)
+            if self.replay:
+                # recorded responses already carry the throttled timing
+                self.auth.rate_limiter = None
+            self.detector = TradeDetector(self.config, self.auth, db_path=detector_db)
+            self.safety = SafetyManager(self.config, now_func=now_func)
+            self.mirror_engine = MirrorEngine(self.config, self.auth, self.safety, instruments=self.instruments,
+                                              now_func=now_func, db_path=dry_run_db)
             self.health_monitor = HealthMonitor()
+            self.mirror_engine.reconciler.on_alert = self._on_mirror_alert
         except Exception as e:
             self.logger.error(f"Failed to initialize modules: {e}")
             # Set modules to None to avoid attribute errors
@@ -112,11 +157,18 @@ class MirroringController:
             self.health_monitor = None
         
         # Safety defaults
-        settings = self.config.get_settings()
         self.dry_run = settings.get('dry_run', True)
         
         self.running = False
         self.monitoring_thread = None
+        self.recovered_trades = []
+        self.scheduler = PollScheduler(settings, now_func=now_func,
+                                       skip_time=self.replay.advance if self.replay else None)
+        self.aggregator = FillAggregator(settings)
+        self.netter = TradeNetter(settings)
+        # Orders are placed by worker threads so a slow broker never stalls detection
+        self.executor = ExecutionQueue(self._process_trade_for_mirroring, settings,
+                                       prepare=self._prepare_mirror_batch)
         
         self.logger.info(f"Loaded LOT_SIZES: {self.LOT_SIZES}")
     def quick_test(self):
@@ -141,50 +193,39 @@ class MirroringController:
         
         # Restore original value
         self.max_trade_qty = original_max
+    def _load_instruments(self):
+        """Load today's scrip master (once per day) and take lot sizes from it"""
+        if not self.instruments:
+            return
+        try:
+            self.instruments.ensure_loaded()
+            self.LOT_SIZES = {**self.LOT_SIZES, **self.instruments.lot_sizes(self.LOT_SIZES)}
+            self.logger.info(f"Instrument index ready ({len(self.instruments)} contracts), LOT_SIZES: {self.LOT_SIZES}")
+        except Exception as e:
+            self.logger.warning(f"Could not load instrument master - using search_scrip and LOT_SIZE: {e}")
+
     def _get_instrument_lot_size(self, trading_symbol):
         """
-        Extract base instrument and return lot size from config
+        Lot size from the instrument index, else the configured table by underlying
         """
-        if not trading_symbol:
-            return self.DEFAULT_LOT_SIZE
-            
-        trading_symbol_upper = trading_symbol.upper()
-        
-        if 'NIFTY' in trading_symbol_upper and 'BANKNIFTY' not in trading_symbol_upper and 'FINNIFTY' not in trading_symbol_upper:
-            return self.LOT_SIZES.get('NIFTY', self.DEFAULT_LOT_SIZE)
-        elif 'BANKNIFTY' in trading_symbol_upper:
-            return self.LOT_SIZES.get('BANKNIFTY', self.DEFAULT_LOT_SIZE)
-        elif 'FINNIFTY' in trading_symbol_upper:
-            return self.LOT_SIZES.get('FINNIFTY', self.DEFAULT_LOT_SIZE)
-        elif 'MIDCPNIFTY' in trading_symbol_upper:
-            return self.LOT_SIZES.get('MIDCPNIFTY', self.DEFAULT_LOT_SIZE)
-        elif 'SENSEX' in trading_symbol_upper:
-            return self.LOT_SIZES.get('SENSEX', self.DEFAULT_LOT_SIZE)
-        elif 'BANKEX' in trading_symbol_upper:
-            return self.LOT_SIZES.get('BANKEX', self.DEFAULT_LOT_SIZE)
-        else:
+        if self.instruments:
+            lot_size = self.instruments.lot_size(trading_symbol)
+            if lot_size:
+                return lot_size
+        info = parse_symbol(trading_symbol)
+        if not info:
             return self.DEFAULT_LOT_SIZE
+        return self.LOT_SIZES.get(info.underlying, self.DEFAULT_LOT_SIZE)
 
     def _identify_instrument(self, symbol):
         """Identify the instrument type from symbol"""
         if not symbol:
             return 'UNKNOWN'
             
-        symbol_upper = symbol.upper()
-        if 'BANKNIFTY' in symbol_upper:
-            return 'BANKNIFTY'
-        elif 'FINNIFTY' in symbol_upper:
-            return 'FINNIFTY' 
-        elif 'MIDCPNIFTY' in symbol_upper:
-            return 'MIDCPNIFTY'
-        elif 'SENSEX' in symbol_upper:
-            return 'SENSEX'
-        elif 'BANKEX' in symbol_upper:
-            return 'BANKEX'
-        elif 'NIFTY' in symbol_upper:
-            return 'NIFTY'
-        else:
-            return 'UNKNOWN/DEFAULT'
+        info = parse_symbol(symbol)
+        if info and info.underlying in self.LOT_SIZES:
+            return info.underlying
+        return 'UNKNOWN/DEFAULT'
 
     def _convert_to_lot_based_quantity(self, trade):
         """
@@ -288,21 +329,54 @@ class MirroringController:
             self.logger.error("Authentication module not initialized. Cannot start monitoring.")
             return False
         
-        # Authenticate accounts (with retry)
-        self.logger.info("Authenticating accounts...")
-        try:
-            auth_results = self._call_with_retry(self.auth.authenticate_all_accounts, max_attempts=3, initial_delay=1)
-        except Exception as e:
-            self.logger.error(f"Authentication failed after retries: {e}. Aborting start.")
-            return False
+        settings = self.config.get_settings()
+        if self.replay:
+            # Recorded responses stand in for the broker - nothing to log in to
+            account_ids = list(self.config.get_source_account_ids()) + list(self.config.get_mirror_account_ids())
+            auth_results = self.replay.install(self.auth, account_ids)
+        else:
+            # Authenticate accounts (with retry)
+            self.logger.info("Authenticating accounts...")
+            try:
+                auth_results = self._call_with_retry(self.auth.authenticate_all_accounts, max_attempts=3)
+            except Exception as e:
+                self.logger.error(f"Authentication failed after retries: {e}. Aborting start.")
+                return False
         
         # If any account failed, do not start monitoring
         failed = [k for k,v in auth_results.items() if not v.get('success')]
         if failed:
             self.logger.error(f"Authentication failed for accounts: {failed}. Aborting start.")
             return False
+
+        if self.simulator:
+            # Before anything can place an order: mirror orders never reach the broker
+            self.simulator.install(self.auth, self.config.get_mirror_account_ids())
+        
+        # Token and lot-size lookups are local from here on
+        self._load_instruments()
+
+        # Mirror orders a crash left in flight: found ones are adopted, the rest
+        # wait for mirroring to be enabled (their fill-time deadline still applies, so
+        # ones older than mirror_deadline_seconds are expired instead of sent)
+        if not self.dry_run:
+            self.recovered_trades = self.mirror_engine.recover_intents()
+            if self.recovered_trades:
+                self.logger.warning(f"{len(self.recovered_trades)} mirror orders were lost in a crash - "
+                                    f"they are re-queued when mirroring is enabled")
+
+        if settings.get('record_session_path') and not self.replay:
+            self.recorder = SessionRecorder(settings['record_session_path'])
+            self.recorder.wrap(self.auth)
         
-        # Start monitoring thread
+        # Push detection from the source order-update stream (optional)
+        if settings.get('order_stream_enabled') and not self.replay:
+            self.detector.start_order_stream(listener=self.scheduler.wake)
+
+        # Start execution workers, then the monitoring thread
+        self.executor.start()
+        if self.auth.sessions and not self.replay:
+            self.auth.sessions.start_warming(is_active=self.safety.is_market_hours)
         self.running = True
         self.monitoring_thread = threading.Thread(target=self._monitoring_loop)
         self.monitoring_thread.daemon = False
@@ -344,8 +418,24 @@ class MirroringController:
             return False
         
         self.running = False
+        self.scheduler.wake()
         if self.monitoring_thread:
             self.monitoring_thread.join(timeout=5)
+        self.detector.stop_order_stream()
+        # Let queued mirror orders finish before flushing and logging out
+        self.executor.stop()
+        if self.auth.sessions:
+            self.auth.sessions.stop_warming()
+        if not self.dry_run or self.simulator:
+            # Record the final state of orders placed just before shutdown
+            self.mirror_engine.reconcile_orders(force=True)
+        
+        # Make sure write-behind persistence is on disk before we go quiet
+        for module in (self.detector, self.mirror_engine):
+            try:
+                module.flush()
+            except Exception:
+                self.logger.exception("Error flushing persisted trade keys")
         
         # Stop mirroring engine and logout
         if getattr(self, 'mirror_engine', None):
@@ -354,6 +444,11 @@ class MirroringController:
             except Exception:
                 self.logger.exception("Error stopping mirror engine")
         self.auth.logout_all()
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+        if self.replay:
+            self.logger.info(f"Replay stats: {self.replay.get_stats()}")
         self.logger.info("Monitoring stopped")
         return True
     
@@ -366,6 +461,9 @@ class MirroringController:
                     self.mirror_engine.start()
                 except Exception:
                     self.logger.exception("Error starting mirror engine")
+            if self.recovered_trades:
+                self.executor.submit_batch(self.recovered_trades)
+                self.recovered_trades = []
         return success
     
     def disable_mirroring(self):
@@ -389,41 +487,63 @@ class MirroringController:
     def _monitoring_loop(self):
         """Main monitoring loop"""
         self.logger.info("Starting monitoring loop...")
-        # Prefer direct call to ConfigManager.get_settings()
-        check_interval = self.config.get_settings().get('check_interval', 10)
         
         while self.running:
             try:
+                if self.replay and self.replay.finished:
+                    self.logger.info(f"Replay finished: {self.replay.get_stats()}")
+                    break
+
+                # Outside the session there is nothing to detect - sleep until open
+                if not self.scheduler.in_session():
+                    self.scheduler.wait()
+                    continue
+
                 # Check for new trades
                 new_trades = self.detector.detect_new_trades()
+                self.scheduler.record_poll(activity=bool(new_trades))
+
+                # Partial fills of one source order are mirrored as one trade
+                self.aggregator.add(new_trades)
+                ready_trades = self.aggregator.pop_ready()
+
+                # A BUY and SELL of the same strike in one batch become one net order
+                ready_trades, netted_out = self.netter.net(ready_trades)
+                if netted_out:
+                    self.mirror_engine.mark_handled(netted_out)
                 
-                # Process new trades if mirroring is enabled
-                if new_trades and getattr(self.safety, 'mirroring_enabled', False):
-                    for trade in new_trades:
-                        self._process_trade_for_mirroring(trade)
+                # Hand new trades to the execution workers if mirroring is enabled
+                if ready_trades and getattr(self.safety, 'mirroring_enabled', False):
+                    self.executor.submit_batch(ready_trades)
+
+                # Fill/rejection check of placed mirror orders, only on quiet passes
+                # so it never delays a freshly detected trade
+                if not new_trades and (not self.dry_run or self.simulator):
+                    self.mirror_engine.reconcile_orders()
                 
-                # Wait before next check (use configured interval)
-                time.sleep(check_interval)
+                # Wait before next check (adaptive, market-aware interval),
+                # waking early when an aggregation window closes
+                self.scheduler.wait(max_wait=self.aggregator.seconds_until_ready())
                 
             except Exception as e:
                 self.logger.exception(f"Monitoring loop error: {e}")
-                time.sleep(min(check_interval, 10))
+                time.sleep(min(self.scheduler.max_interval, 10))
     
-    def _call_with_retry(self, func, *args, max_attempts=3, initial_delay=1, backoff=2, **kwargs):
-        """Call func with simple retry/backoff; raises last exception if all attempts fail"""
-        delay = initial_delay
-        last_exc = None
-        for attempt in range(1, max_attempts + 1):
-            try:
-                return func(*args, **kwargs)
-            except Exception as e:
-                last_exc = e
-                self.logger.warning(f"Attempt {attempt} for {getattr(func, '__name__', str(func))} failed: {e}")
-                if attempt == max_attempts:
-                    break
-                time.sleep(delay)
-                delay *= backoff
-        raise last_exc
+    def _call_with_retry(self, func, *args, max_attempts=3, **kwargs):
+        """Call func under the shared retry policy; raises last exception if all attempts fail"""
+        policy = getattr(self.auth, 'retry_policy', None) or RetryPolicy(self.config.get_settings())
+        return policy.call(getattr(func, '__name__', str(func)), func, *args, attempts=max_attempts, **kwargs)
+
+    def _on_mirror_alert(self, message):
+        """Broker-side problem with a placed mirror order (e.g. rejection)"""
+        self.logger.critical(f"🚨 {message}")
+        if self.health_monitor:
+            self.health_monitor.record_trade(False, message)
+
+    def _prepare_mirror_batch(self, trades):
+        """One bulk quote refresh covers every price check in the batch"""
+        if self.mirror_engine:
+            self.mirror_engine.prefetch_quotes(trades)
 
     def _process_trade_for_mirroring(self, trade):
         """Process a trade for mirroring with lot-based quantities"""
@@ -452,19 +572,14 @@ class MirroringController:
         if can_mirror:
             self.logger.info(f"READY TO MIRROR: {trade['symbol']} | Qty: {original_qty}→{mirrored_qty} ({lots} lots) | Price: {trade.get('order_price', 'N/A')}")
             
-            if self.dry_run:
+            if self.dry_run and not self.simulator:
                 # Do not execute real orders in dry-run mode
                 self.logger.info(f"DRY-RUN: simulated mirroring of {trade['symbol']} qty {mirrored_qty} ({lots} lots of {lot_size})")
-                # If mirror_engine exposes bookkeeping for tests/stats, update it (best-effort)
-                try:
-                    if getattr(self.mirror_engine, 'mirrored_trades', None) is not None:
-                        self.mirror_engine.mirrored_trades.append(trade)
-                except Exception:
-                    # Non-critical in dry-run
-                    self.logger.debug("mirror_engine bookkeeping not available during dry-run")
                 return
+            if self.dry_run:
+                self.logger.info(f"DRY-RUN: mirroring {trade['symbol']} to the simulated broker")
 
-            # Attempt real mirroring with retries
+            # Attempt mirroring with retries (dry runs go to the simulated broker)
             try:
                 success = self.mirror_engine.mirror_trade(trade)
                 self.health_monitor.record_trade(success)
@@ -491,6 +606,15 @@ class MirroringController:
             'safety_status': safety_status,
             'mirror_stats': mirror_stats,
             'accounts_authenticated': list(self.auth.get_all_connections().keys()),
+            'poll_stats': self.scheduler.get_stats(),
+            'aggregation_stats': self.aggregator.get_stats(),
+            'netting_stats': self.netter.get_stats(),
+            'execution_stats': self.executor.get_stats(),
+            'rate_limit_stats': self.auth.rate_limiter.get_stats() if self.auth.rate_limiter else None,
+            'connection_stats': self.auth.sessions.get_stats() if self.auth.sessions else None,
+            'retry_stats': self.auth.retry_policy.get_stats(),
+            'replay_stats': self.replay.get_stats() if self.replay else None,
+            'simulation_stats': self.simulator.get_stats() if self.simulator else None,
             'lot_sizes': self.LOT_SIZES
         }
     
@@ -542,8 +666,9 @@ def main():
             
             if command == 'start':
                 if controller.start_monitoring():
-                    interval = controller.config.get_settings().get('check_interval', 10)
-                    print(f"Monitoring STARTED - Checking for trades every {interval} seconds")
+                    scheduler = controller.scheduler
+                    print(f"Monitoring STARTED - Polling every {scheduler.min_interval}-"
+                          f"{scheduler.max_interval} seconds during market hours")
                 else:
                     print("Failed to start monitoring")
                     
@@ -4,12 +4,24 @@ import logging
 import time
 from datetime import datetime, timedelta
 
+from src.auth.session_pool import SessionPool
+from src.utils.rate_limiter import RateLimiter
+from src.utils.retry_policy import RetryPolicy
+
 class AuthManager:
     def __init__(self, config_manager):
         self.config = config_manager
         self.connections = {}  # Store SmartConnect objects for each account
         self.tokens = {}       # Store tokens for each account
         self.logger = logging.getLogger('auth_manager')
+        # Every connection handed out is throttled per account and endpoint
+        settings = config_manager.get_settings() if hasattr(config_manager, 'get_settings') else {}
+        self.rate_limiter = RateLimiter(settings) if settings.get('rate_limit_enabled', True) else None
+        self._limited = {}
+        # Keep-alive HTTP sessions: API calls reuse a warm TLS connection per account
+        self.sessions = SessionPool(settings) if settings.get('keepalive_enabled', True) else None
+        # Shared by every component so one degraded endpoint trips one breaker
+        self.retry_policy = RetryPolicy(settings)
         
     def authenticate_account(self, account_id):
         """
@@ -35,11 +47,14 @@ class AuthManager:
             )
             
             if data['status']:
+                if self.sessions:
+                    self.sessions.install(account_id, obj)
                 # Store connection and tokens
                 self.connections[account_id] = obj
                 self.tokens[account_id] = {
                     'jwt_token': data['data']['jwtToken'],
                     'refresh_token': data['data']['refreshToken'],
+                    'feed_token': data['data'].get('feedToken'),
                     'login_time': datetime.now()
                 }
                 
@@ -56,10 +71,12 @@ class AuthManager:
             return False, None, error_msg
     
     def authenticate_all_accounts(self):
-        """Authenticate both source and mirror accounts"""
+        """Authenticate all source accounts and mirror accounts"""
         results = {}
         
-        for account_id in ['source_account', 'mirror_account']:
+        source_ids = self.config.get_source_account_ids() if hasattr(self.config, 'get_source_account_ids') else ['source_account']
+        mirror_ids = self.config.get_mirror_account_ids() if hasattr(self.config, 'get_mirror_account_ids') else ['mirror_account']
+        for account_id in list(source_ids) + list(mirror_ids):
             success, connection, error = self.authenticate_account(account_id)
             results[account_id] = {
                 'success': success,
@@ -71,7 +88,14 @@ class AuthManager:
     
     def get_connection(self, account_id):
         """Get authenticated connection for an account"""
-        return self.connections.get(account_id)
+        connection = self.connections.get(account_id)
+        if connection is None or self.rate_limiter is None:
+            return connection
+        limited = self._limited.get(account_id)
+        if limited is None or limited._connection is not connection:
+            # (re)wrap when the account's session object changes
+            limited = self._limited[account_id] = self.rate_limiter.wrap(connection, account_id)
+        return limited
     
     def get_all_connections(self):
         """Get all authenticated connections"""
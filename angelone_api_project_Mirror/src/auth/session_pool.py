@@ -0,0 +1,208 @@
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+import SmartApi.smartConnect as smart_connect_module
+
+
+class _SessionRouter:
+    """
+    Stands in for the `requests` module inside SmartApi.smartConnect.
+
+    SmartConnect._request calls the module-level requests.request(), which
+    opens a fresh connection for every call. While a pooled transport is
+    active on the calling thread the request goes through its keep-alive
+    session instead; everything else falls through to `requests`.
+    """
+
+    def __init__(self, requests_module):
+        self._requests = requests_module
+        self._local = threading.local()
+
+    def __getattr__(self, name):
+        return getattr(self._requests, name)
+
+    def request(self, method, url, **kwargs):
+        session = getattr(self._local, 'session', None)
+        return (session or self._requests).request(method, url, **kwargs)
+
+
+def _install_router():
+    router = smart_connect_module.requests
+    if not isinstance(router, _SessionRouter):
+        router = smart_connect_module.requests = _SessionRouter(requests)
+    return router
+
+
+class _TimedAdapter(HTTPAdapter):
+    """HTTPAdapter whose new connections report their DNS+TCP+TLS setup time"""
+
+    def __init__(self, on_connect, **kwargs):
+        self._on_connect = on_connect
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        on_connect = self._on_connect
+
+        def timed(base):
+            def connect(conn):
+                started = time.perf_counter()
+                base.connect(conn)
+                on_connect(time.perf_counter() - started)
+            return type(f"Timed{base.__name__}", (base,), {'connect': connect})
+
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': type('TimedHTTPConnectionPool', (HTTPConnectionPool,), {'ConnectionCls': timed(HTTPConnection)}),
+            'https': type('TimedHTTPSConnectionPool', (HTTPSConnectionPool,),
+                          {'ConnectionCls': timed(HTTPSConnection)})
+        }
+
+
+class KeepAliveTransport:
+    """
+    Pooled keep-alive HTTP session for one account's SmartConnect.
+
+    install() routes the connection's API calls through the session, so the
+    TLS connection is reused between calls; warm() sends a cheap HEAD to the
+    API host to keep it open through quiet spells.
+    """
+
+    def __init__(self, account_id, pool_size=8):
+        self.account_id = account_id
+        self.root = None
+        self._router = _install_router()
+        self._lock = threading.Lock()
+        self.session = requests.Session()
+        self.session.mount('https://', _TimedAdapter(self._connected, pool_maxsize=pool_size))
+        self.session.mount('http://', _TimedAdapter(self._connected, pool_maxsize=pool_size))
+
+        self.requests = 0
+        self.new_connections = 0
+        self.setup_seconds = 0.0
+        self.max_setup_seconds = 0.0
+        self.warmups = 0
+        self.warm_connections = 0
+        self.last_used = None
+
+    def _connected(self, seconds):
+        with self._lock:
+            self.new_connections += 1
+            self.setup_seconds += seconds
+            self.max_setup_seconds = max(self.max_setup_seconds, seconds)
+
+    def install(self, connection):
+        """Send `connection`'s API calls over this transport's session"""
+        self.root = getattr(connection, 'root', None)
+        original = connection._request
+
+        def pooled_request(route, method, parameters=None):
+            self._router._local.session = self.session
+            try:
+                return original(route, method, parameters)
+            finally:
+                self._router._local.session = None
+                with self._lock:
+                    self.requests += 1
+                self.last_used = time.monotonic()
+
+        connection._request = pooled_request
+        return connection
+
+    def idle_seconds(self):
+        return float('inf') if self.last_used is None else time.monotonic() - self.last_used
+
+    def warm(self, timeout=5):
+        """Cheap request to the API host so the pooled connection stays open"""
+        if not self.root:
+            return False
+        before = self.new_connections
+        try:
+            self.session.head(self.root, timeout=timeout, allow_redirects=False)
+        except Exception:
+            return False
+        with self._lock:
+            # connections opened by warm-ups are not charged to API requests
+            self.warm_connections += self.new_connections - before
+        self.warmups += 1
+        self.last_used = time.monotonic()
+        return True
+
+    def close(self):
+        self.session.close()
+
+    def get_stats(self):
+        """Connection reuse and setup time (ms) for this account"""
+        with self._lock:
+            requests_made = self.requests or 1
+            request_connections = self.new_connections - self.warm_connections
+            return {
+                'requests': self.requests,
+                'new_connections': self.new_connections,
+                'reuse_rate': round(max(0.0, 1 - request_connections / requests_made), 3)
+                if self.requests else None,
+                'avg_setup_ms': round(self.setup_seconds / (self.new_connections or 1) * 1000, 1),
+                # connection setup cost spread over every request made
+                'setup_ms_per_request': round(self.setup_seconds / requests_made * 1000, 2),
+                'max_setup_ms': round(self.max_setup_seconds * 1000, 1),
+                'warmups': self.warmups
+            }
+
+
+class SessionPool:
+    """
+    One KeepAliveTransport per authenticated account, plus a warmer thread
+    that keeps idle connections open while `is_active()` (market hours).
+    """
+
+    def __init__(self, settings):
+        self.logger = logging.getLogger('session_pool')
+        self.pool_size = settings.get('keepalive_pool_size', 8)
+        self.warm_interval = settings.get('keepalive_warm_interval', 20)
+        self.transports = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def install(self, account_id, connection):
+        old = self.transports.get(account_id)
+        if old:
+            old.close()
+        transport = self.transports[account_id] = KeepAliveTransport(account_id, self.pool_size)
+        return transport.install(connection)
+
+    def warm_idle(self, min_idle=None):
+        """Warm every transport idle for at least `min_idle` seconds"""
+        min_idle = self.warm_interval if min_idle is None else min_idle
+        return sum(1 for t in list(self.transports.values()) if t.idle_seconds() >= min_idle and t.warm())
+
+    def start_warming(self, is_active=None):
+        if self._thread or not self.warm_interval:
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(self.warm_interval / 2):
+                try:
+                    if is_active is None or is_active():
+                        self.warm_idle()
+                except Exception as e:
+                    self.logger.warning(f"Connection warm-up failed: {e}")
+
+        self._thread = threading.Thread(target=run, name='session_warmer', daemon=True)
+        self._thread.start()
+        self.logger.info(f"Keeping API connections warm every {self.warm_interval}s")
+
+    def stop_warming(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5)
+            self._thread = None
+
+    def get_stats(self):
+        """Per-account reuse rate and setup time"""
+        return {account_id: t.get_stats() for account_id, t in self.transports.items()}
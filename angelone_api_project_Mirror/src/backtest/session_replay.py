@@ -0,0 +1,309 @@
+import gzip
+import json
+import logging
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+# SmartConnect calls worth capturing (session/login calls carry secrets and are skipped)
+RECORDED_METHODS = (
+    'tradeBook', 'orderBook', 'position', 'holding', 'getProfile',
+    'search_scrip', 'searchScrip', 'ltpData', 'getMarketData',
+    'placeOrder', 'modifyOrder', 'cancelOrder'
+)
+# Calls answered in sequence rather than by the session time they were made at
+ORDER_METHODS = ('placeOrder', 'modifyOrder', 'cancelOrder')
+
+
+def _open(path, mode):
+    """Recordings ending in .gz are gzip-compressed JSON lines"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def _args_key(args, kwargs):
+    return json.dumps([args, kwargs], sort_keys=True, default=str)
+
+
+class SessionRecorder:
+    """
+    Captures every SmartConnect call made during a live session to a JSON
+    lines file: one header line, then one line per call with its offset from
+    the start (t), duration in ms (d), account, method, arguments and
+    response (or error).
+    """
+
+    def __init__(self, path, clock=time.monotonic):
+        self.path = path
+        self.logger = logging.getLogger('session_recorder')
+        self._clock = clock
+        self._start = clock()
+        self._lock = threading.Lock()
+        self._file = _open(path, 'w')
+        self.calls_recorded = 0
+        self._write({'v': 1, 'started_at': datetime.now().isoformat()})
+        self.logger.info(f"Recording SmartConnect session to {path}")
+
+    def _write(self, entry):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(json.dumps(entry, separators=(',', ':'), default=str) + '\n')
+
+    def record(self, account_id, method, args, kwargs, started, response=None, error=None):
+        """Append one call"""
+        entry = {
+            't': round(started - self._start, 4),
+            'd': round((self._clock() - started) * 1000, 2),
+            'acc': account_id,
+            'm': method,
+            'a': list(args),
+            'k': kwargs
+        }
+        if error is not None:
+            entry['e'] = error
+        else:
+            entry['r'] = response
+        self._write(entry)
+        self.calls_recorded += 1
+
+    def wrap(self, auth_manager):
+        """Route every authenticated connection through the recorder"""
+        for account_id, connection in list(auth_manager.connections.items()):
+            if not isinstance(connection, RecordingConnection):
+                auth_manager.connections[account_id] = RecordingConnection(connection, self, account_id)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        self.logger.info(f"Recorded {self.calls_recorded} calls to {self.path}")
+
+
+class RecordingConnection:
+    """SmartConnect proxy that records RECORDED_METHODS and passes everything else through"""
+
+    def __init__(self, connection, recorder, account_id):
+        self._connection = connection
+        self._recorder = recorder
+        self._account_id = account_id
+
+    def __getattr__(self, name):
+        attr = getattr(self._connection, name)
+        if name not in RECORDED_METHODS or not callable(attr):
+            return attr
+
+        def recorded(*args, **kwargs):
+            started = self._recorder._clock()
+            try:
+                response = attr(*args, **kwargs)
+            except Exception as e:
+                self._recorder.record(self._account_id, name, args, kwargs, started, error=str(e))
+                raise
+            self._recorder.record(self._account_id, name, args, kwargs, started, response=response)
+            return response
+        return recorded
+
+
+class SessionReplay:
+    """
+    Serves a recorded session offline, at the original timing or `speed`
+    times faster.
+
+    State queries (tradeBook, ltpData, search_scrip, ...) return the latest
+    response recorded for the same arguments at or before the current replay
+    time. Order calls return the recorded responses in sequence, then
+    synthetic order ids once the recording runs out, so a replay can place
+    orders the live session never did. Each replayed placeOrder is matched
+    to the earliest unmatched source fill of the same symbol to measure
+    detection-to-order latency.
+    """
+
+    def __init__(self, path, speed=1.0, simulate_latency=True, clock=time.monotonic, sleep=time.sleep):
+        self.path = path
+        self.speed = speed
+        self.simulate_latency = simulate_latency
+        self.logger = logging.getLogger('session_replay')
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._start = None
+
+        self.started_at = None
+        # (account, method) -> {args_key: ([t, ...], [entry, ...])} ordered by t
+        self._calls = {}
+        self._sequences = {}
+        self.duration = 0.0
+        self._load()
+
+        # (t_visible, account, symbol, fill identity) for every source fill
+        self._fills = self._fill_timeline()
+        self._matched_fills = set()
+        self.synthetic_orders = 0
+        self.order_latencies_ms = []
+        self.unmatched_orders = 0
+
+    def _load(self):
+        with _open(self.path, 'r') as f:
+            header = json.loads(f.readline())
+            self.started_at = datetime.fromisoformat(header['started_at'])
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self.duration = max(self.duration, entry['t'])
+                key = (entry['acc'], entry['m'])
+                if entry['m'] in ORDER_METHODS:
+                    self._sequences.setdefault(key, []).append(entry)
+                else:
+                    by_args = self._calls.setdefault(key, {})
+                    by_args.setdefault(_args_key(entry['a'], entry['k']), []).append(entry)
+        for by_args in self._calls.values():
+            for args_key, entries in by_args.items():
+                entries.sort(key=lambda e: e['t'])
+                by_args[args_key] = ([e['t'] for e in entries], entries)
+
+    def _fill_timeline(self):
+        """First time each tradebook row became visible in the recording"""
+        first_seen = {}
+        for (account_id, method), by_args in self._calls.items():
+            if method != 'tradeBook':
+                continue
+            for _, entries in by_args.values():
+                for entry in entries:
+                    response = entry.get('r')
+                    rows = response.get('data') if isinstance(response, dict) else None
+                    for row in rows or []:
+                        identity = (account_id, json.dumps(row, sort_keys=True))
+                        if identity not in first_seen:
+                            symbol = row.get('tradingsymbol') or row.get('tradingSymbol')
+                            first_seen[identity] = (entry['t'], account_id, symbol, identity)
+        return sorted(first_seen.values(), key=lambda f: f[0])
+
+    def start(self):
+        """Start the replay clock"""
+        if self._start is None:
+            self._start = self._clock()
+            self.logger.info(f"Replaying {self.path} ({self.duration:.0f}s recorded) at {self.speed}x")
+
+    def elapsed(self):
+        """Recorded-session seconds replayed so far"""
+        if self._start is None:
+            return 0.0
+        return (self._clock() - self._start) * self.speed
+
+    def now(self):
+        """Wall-clock time inside the recorded session"""
+        return self.started_at + timedelta(seconds=self.elapsed())
+
+    def advance(self, seconds):
+        """Jump `seconds` of session time ahead instead of waiting them out"""
+        self.start()
+        with self._lock:
+            self._start -= seconds / self.speed
+
+    @property
+    def finished(self):
+        return self._start is not None and self.elapsed() > self.duration
+
+    def install(self, auth_manager, account_ids):
+        """Give every account a replay connection instead of authenticating"""
+        self.start()
+        for account_id in account_ids:
+            auth_manager.connections[account_id] = ReplayConnection(self, account_id)
+            auth_manager.tokens[account_id] = {
+                'jwt_token': '', 'refresh_token': '', 'feed_token': None,
+                'login_time': datetime.now()
+            }
+        return {account_id: {'success': True, 'error': None,
+                             'connection': auth_manager.connections[account_id]}
+                for account_id in account_ids}
+
+    def _delay(self, entry):
+        if self.simulate_latency and entry.get('d'):
+            self._sleep(entry['d'] / 1000.0 / self.speed)
+
+    def _respond(self, entry):
+        self._delay(entry)
+        if 'e' in entry:
+            raise Exception(entry['e'])
+        return entry.get('r')
+
+    def call(self, account_id, method, args, kwargs):
+        """Answer one SmartConnect call from the recording"""
+        if method in ORDER_METHODS:
+            return self._order_call(account_id, method, args, kwargs)
+
+        by_args = self._calls.get((account_id, method))
+        if not by_args:
+            return {'status': False, 'message': f'{method} not recorded for {account_id}', 'data': None}
+        recorded = by_args.get(_args_key(list(args), kwargs))
+        if recorded is None:
+            # Same call with different arguments - fall back to the most recorded variant
+            recorded = max(by_args.values(), key=lambda r: len(r[1]))
+
+        times, entries = recorded
+        i = bisect_right(times, self.elapsed())
+        return self._respond(entries[max(i - 1, 0)])
+
+    def _order_call(self, account_id, method, args, kwargs):
+        with self._lock:
+            sequence = self._sequences.get((account_id, method), [])
+            entry = sequence.pop(0) if sequence else None
+            if method == 'placeOrder':
+                params = args[0] if args else kwargs.get('orderparams', {})
+                self._match_order(account_id, (params or {}).get('tradingsymbol'))
+            if entry is None:
+                self.synthetic_orders += 1
+                order_id = f"REPLAY{self.synthetic_orders:06d}"
+        if entry is not None:
+            return self._respond(entry)
+        return {'status': True, 'message': 'SUCCESS', 'errorcode': '', 'data': {'orderid': order_id}}
+
+    def _match_order(self, account_id, symbol):
+        """Latency from the source fill becoming visible to this order (real seconds)"""
+        elapsed = self.elapsed()
+        for t_visible, source_id, fill_symbol, identity in self._fills:
+            if t_visible > elapsed:
+                break
+            if source_id == account_id or fill_symbol != symbol or identity in self._matched_fills:
+                continue
+            self._matched_fills.add(identity)
+            self.order_latencies_ms.append(round((elapsed - t_visible) / self.speed * 1000, 1))
+            return
+        self.unmatched_orders += 1
+
+    def get_stats(self):
+        """Get replay statistics"""
+        latencies = sorted(self.order_latencies_ms)
+        return {
+            'speed': self.speed,
+            'elapsed': round(self.elapsed(), 1),
+            'duration': self.duration,
+            'finished': self.finished,
+            'orders_matched': len(latencies),
+            'orders_unmatched': self.unmatched_orders,
+            'synthetic_orders': self.synthetic_orders,
+            'latency_p50_ms': latencies[len(latencies) // 2] if latencies else None,
+            'latency_p95_ms': latencies[int(len(latencies) * 0.95)] if latencies else None,
+            'latency_max_ms': latencies[-1] if latencies else None
+        }
+
+
+class ReplayConnection:
+    """Stand-in for SmartConnect that answers from a SessionReplay"""
+
+    def __init__(self, replay, account_id):
+        self._replay = replay
+        self._account_id = account_id
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def replayed(*args, **kwargs):
+            return self._replay.call(self._account_id, name, args, kwargs)
+        return replayed
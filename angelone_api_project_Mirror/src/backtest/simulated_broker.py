@@ -0,0 +1,284 @@
+import json
+import logging
+import math
+import random
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime
+
+from src.backtest.session_replay import _open
+
+
+class SimulatedBroker:
+    """
+    Dry-run broker for mirror accounts.
+
+    Order calls are answered locally after a sampled network latency.
+    Accepted orders show up in orderBook()/tradeBook() and fill after
+    `sim_fill_delay_ms` at the market price plus sampled slippage. A
+    `sim_reject_rate` share is rejected by "RMS" instead. Market prices come
+    from the account's real connection (quote calls pass through), from a
+    session recording (`sim_quotes_path`), or from the last price seen for
+    the symbol.
+    """
+
+    def __init__(self, settings, clock=time.monotonic, sleep=time.sleep, rng=None):
+        self.logger = logging.getLogger('simulated_broker')
+        self.latency_ms = settings.get('sim_latency_ms', 60)
+        self.latency_dist = settings.get('sim_latency_dist', 'lognormal')
+        self.latency_sigma = settings.get('sim_latency_sigma', 0.4)
+        self.fill_delay = settings.get('sim_fill_delay_ms', 150) / 1000.0
+        self.reject_rate = settings.get('sim_reject_rate', 0.0)
+        self.slippage_bps = settings.get('sim_slippage_bps', 2.0)
+        self.slippage_sigma_bps = settings.get('sim_slippage_sigma_bps', 5.0)
+        self.tick = 0.05
+        self._clock = clock
+        self._sleep = sleep
+        self._rng = rng or random.Random(settings.get('sim_seed'))
+        self._lock = threading.RLock()
+        self._start = clock()
+        self._orders = {}  # account_id -> {order_id: order}
+        self._prices = {}  # symbol or token -> last price seen
+        self._recorded = self._load_quotes(settings.get('sim_quotes_path'))
+        self._next_id = 0
+
+        self.orders_placed = 0
+        self.fills = 0
+        self.rejections = 0
+        self.latencies_ms = []
+        self.slippages_bps = []
+
+    def _load_quotes(self, path):
+        """symbol/token -> ([t, ...], [ltp, ...]) from a SessionRecorder file"""
+        if not path:
+            return {}
+        quotes = {}
+        with _open(path, 'r') as f:
+            f.readline()
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                data = (entry.get('r') or {}).get('data') if isinstance(entry.get('r'), dict) else None
+                if not data:
+                    continue
+                if entry['m'] == 'ltpData':
+                    for key in (data.get('tradingsymbol'), data.get('symboltoken')):
+                        if key and data.get('ltp') is not None:
+                            quotes.setdefault(str(key), []).append((entry['t'], float(data['ltp'])))
+                elif entry['m'] == 'getMarketData':
+                    for quote in data.get('fetched') or []:
+                        for key in (quote.get('tradingSymbol'), quote.get('symbolToken')):
+                            if key and quote.get('ltp') is not None:
+                                quotes.setdefault(str(key), []).append((entry['t'], float(quote['ltp'])))
+        for key, points in quotes.items():
+            points.sort()
+            quotes[key] = ([t for t, _ in points], [p for _, p in points])
+        self.logger.info(f"Loaded recorded quotes for {len(quotes)} symbols/tokens from {path}")
+        return quotes
+
+    def install(self, auth_manager, account_ids):
+        """Route the mirror accounts' order calls to the simulator"""
+        for account_id in account_ids:
+            connection = auth_manager.connections.get(account_id)
+            if not isinstance(connection, SimulatedConnection):
+                auth_manager.connections[account_id] = SimulatedConnection(self, account_id, connection)
+        self.logger.info(f"Dry run: orders for {list(account_ids)} go to the simulated broker")
+
+    # -- market model -------------------------------------------------------------
+
+    def sample_latency(self):
+        """One network round trip in seconds"""
+        if self.latency_dist == 'fixed':
+            ms = self.latency_ms
+        elif self.latency_dist == 'normal':
+            ms = self._rng.gauss(self.latency_ms, self.latency_ms * self.latency_sigma)
+        else:
+            ms = self.latency_ms * math.exp(self._rng.gauss(0, self.latency_sigma))
+        return max(0.0, ms) / 1000.0
+
+    def observe_price(self, key, price):
+        if key and price:
+            with self._lock:
+                self._prices[str(key)] = float(price)
+
+    def market_price(self, symbol, token=None):
+        for key in (symbol, token):
+            points = self._recorded.get(str(key)) if key else None
+            if points:
+                i = bisect_right(points[0], self._clock() - self._start)
+                return points[1][max(0, i - 1)]
+        with self._lock:
+            return self._prices.get(str(symbol)) or (self._prices.get(str(token)) if token else None)
+
+    def _round(self, price):
+        return round(round(price / self.tick) * self.tick, 2)
+
+    # -- order calls ----------------------------------------------------------------
+
+    def place_order(self, account_id, params):
+        latency = self.sample_latency()
+        self._sleep(latency)
+        with self._lock:
+            self._next_id += 1
+            order_id = f"SIM{self._next_id:06d}"
+            self.latencies_ms.append(latency * 1000)
+            self.orders_placed += 1
+        order = {
+            'orderid': order_id,
+            'ordertag': params.get('ordertag'),
+            'tradingsymbol': params.get('tradingsymbol'),
+            'symboltoken': params.get('symboltoken'),
+            'exchange': params.get('exchange'),
+            'transactiontype': params.get('transactiontype'),
+            'producttype': params.get('producttype'),
+            'ordertype': params.get('ordertype', 'MARKET'),
+            'price': float(params.get('price') or 0),
+            'quantity': str(params.get('quantity')),
+            'status': 'open',
+            'filledshares': '0',
+            'averageprice': 0,
+            'text': '',
+            'fill_after': self._clock() + self.fill_delay,
+            'updatetime': datetime.now().strftime('%d-%b-%Y %H:%M:%S')
+        }
+        rejected = self._rng.random() < self.reject_rate
+        if rejected:
+            order.update({'status': 'rejected', 'text': 'SIM: simulated RMS rejection'})
+        with self._lock:
+            self.rejections += rejected
+            self._orders.setdefault(account_id, {})[order_id] = order
+        return {'status': True, 'message': 'SUCCESS', 'data': {'orderid': order_id, 'uniqueorderid': order_id}}
+
+    def modify_order(self, account_id, params):
+        self._sleep(self.sample_latency())
+        with self._lock:
+            order = self._orders.get(account_id, {}).get(str(params.get('orderid')))
+            if not order or order['status'] != 'open':
+                return {'status': False, 'message': 'Order not open', 'data': None}
+            order['ordertype'] = params.get('ordertype', order['ordertype'])
+            order['price'] = float(params.get('price') or 0)
+            order['fill_after'] = max(order['fill_after'], self._clock() + self.fill_delay)
+        return {'status': True, 'message': 'SUCCESS', 'data': {'orderid': order['orderid']}}
+
+    def cancel_order(self, account_id, order_id):
+        self._sleep(self.sample_latency())
+        with self._lock:
+            order = self._orders.get(account_id, {}).get(str(order_id))
+            if not order or order['status'] != 'open':
+                return {'status': False, 'message': 'Order not open', 'data': None}
+            order['status'] = 'cancelled'
+        return {'status': True, 'message': 'SUCCESS', 'data': {'orderid': order['orderid']}}
+
+    def _advance(self, order):
+        """Fill an open order whose fill delay has passed, if the market allows"""
+        if order['status'] != 'open' or self._clock() < order['fill_after']:
+            return
+        market = self.market_price(order['tradingsymbol'], order['symboltoken'])
+        if market is None:
+            market = order['price'] or None
+        if market is None:
+            return
+        side = 1 if order['transactiontype'] == 'BUY' else -1
+        slip = self._rng.gauss(self.slippage_bps, self.slippage_sigma_bps)
+        price = self._round(market * (1 + side * slip / 1e4))
+        if order['ordertype'] == 'LIMIT':
+            if side * (price - order['price']) > 0:
+                return  # limit not marketable yet
+            price = min(price, order['price']) if side > 0 else max(price, order['price'])
+        order.update({'status': 'complete', 'averageprice': price, 'filledshares': order['quantity'],
+                      'filltime': datetime.now().strftime('%H:%M:%S')})
+        self.fills += 1
+        self.slippages_bps.append(side * (price - market) / market * 1e4)
+
+    def order_book(self, account_id):
+        with self._lock:
+            orders = list(self._orders.get(account_id, {}).values())
+            for order in orders:
+                self._advance(order)
+            rows = [{k: v for k, v in o.items() if k != 'fill_after'} for o in orders]
+        return {'status': True, 'message': 'SUCCESS', 'data': rows}
+
+    def trade_book(self, account_id):
+        book = self.order_book(account_id)['data']
+        return {'status': True, 'message': 'SUCCESS', 'data': [
+            {'orderid': o['orderid'], 'tradingsymbol': o['tradingsymbol'], 'exchange': o['exchange'],
+             'transactiontype': o['transactiontype'], 'producttype': o['producttype'],
+             'fillsize': o['filledshares'], 'fillprice': o['averageprice'], 'filltime': o.get('filltime')}
+            for o in book if o['status'] == 'complete']}
+
+    def get_stats(self):
+        """Simulated execution statistics (latency in ms, slippage in bps)"""
+        with self._lock:
+            latencies = sorted(self.latencies_ms)
+            slippages = list(self.slippages_bps)
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 1) if latencies else None
+
+        return {
+            'orders_placed': self.orders_placed,
+            'fills': self.fills,
+            'rejections': self.rejections,
+            'latency_p50_ms': percentile(0.5),
+            'latency_p95_ms': percentile(0.95),
+            'avg_slippage_bps': round(sum(slippages) / len(slippages), 2) if slippages else None
+        }
+
+
+class SimulatedConnection:
+    """
+    Mirror-account SmartConnect stand-in for dry runs: order calls go to the
+    SimulatedBroker, quote calls pass through to the real connection (their
+    prices feed the fill model), other calls pass through unchanged.
+    """
+
+    def __init__(self, broker, account_id, connection=None):
+        self._broker = broker
+        self._account_id = account_id
+        self._connection = connection
+
+    def placeOrder(self, orderparams):
+        return self._broker.place_order(self._account_id, orderparams)
+
+    def modifyOrder(self, orderparams):
+        return self._broker.modify_order(self._account_id, orderparams)
+
+    def cancelOrder(self, order_id, variety='NORMAL'):
+        return self._broker.cancel_order(self._account_id, order_id)
+
+    def orderBook(self):
+        return self._broker.order_book(self._account_id)
+
+    def tradeBook(self):
+        return self._broker.trade_book(self._account_id)
+
+    def ltpData(self, exchange, tradingsymbol, symboltoken):
+        recorded = self._broker.market_price(tradingsymbol, symboltoken)
+        if self._connection is None or self._broker._recorded:
+            if recorded is None:
+                return {'status': False, 'message': f'No simulated quote for {tradingsymbol}', 'data': None}
+            return {'status': True, 'message': 'SUCCESS',
+                    'data': {'tradingsymbol': tradingsymbol, 'symboltoken': symboltoken, 'ltp': recorded}}
+        response = self._connection.ltpData(exchange, tradingsymbol, symboltoken)
+        if response and response.get('status'):
+            ltp = (response.get('data') or {}).get('ltp')
+            self._broker.observe_price(tradingsymbol, ltp)
+            self._broker.observe_price(symboltoken, ltp)
+        return response
+
+    def getMarketData(self, mode, exchangeTokens):
+        if self._connection is None:
+            return {'status': False, 'message': 'No market data connection in simulation', 'data': None}
+        response = self._connection.getMarketData(mode, exchangeTokens)
+        if response and response.get('status'):
+            for quote in (response.get('data') or {}).get('fetched') or []:
+                self._broker.observe_price(quote.get('tradingSymbol'), quote.get('ltp'))
+                self._broker.observe_price(quote.get('symbolToken'), quote.get('ltp'))
+        return response
+
+    def __getattr__(self, name):
+        if name.startswith('_') or self._connection is None:
+            raise AttributeError(name)
+        return getattr(self._connection, name)
@@ -8,27 +8,51 @@ class ConfigManager:
         self.accounts = self.load_accounts()
         self.settings = self.load_settings()
     
+    @staticmethod
+    def _account_from_env(prefix):
+        """Account credentials from <PREFIX>_API_KEY, <PREFIX>_CLIENT_ID, ..."""
+        account_id = f"{prefix.lower()}_account"
+        return account_id, {
+            'API_KEY': os.getenv(f"{prefix}_API_KEY"),
+            'CLIENT_ID': os.getenv(f"{prefix}_CLIENT_ID"),
+            'MPIN': os.getenv(f"{prefix}_MPIN"),
+            'TOTP_TOKEN': os.getenv(f"{prefix}_TOTP_TOKEN"),
+            'name': os.getenv(f"{prefix}_NAME", account_id)
+        }
+
     def load_accounts(self):
         """
-        Load your 2 Angel One accounts
+        Load your Angel One accounts
         Replace the values with your actual credentials
+
+        Extra source traders: SOURCE_ACCOUNTS=SOURCE,SOURCE2 loads SOURCE2_*
+        credentials as 'source2_account'.
+
+        Extra mirror accounts: MIRROR_ACCOUNTS=MIRROR,MIRROR2 loads MIRROR2_*
+        credentials as 'mirror2_account'; <PREFIX>_LOT_MULTIPLIER scales the
+        quantity mirrored to that account (default 1). 'mirror_account' is
+        always included and also serves market data lookups.
         """
+        source_prefixes = [p.strip().upper() for p in
+                           os.getenv("SOURCE_ACCOUNTS", "SOURCE").split(',') if p.strip()]
+        sources = dict(self._account_from_env(prefix) for prefix in source_prefixes)
+        self.source_account_ids = list(sources)
+
+        mirror_prefixes = [p.strip().upper() for p in
+                           os.getenv("MIRROR_ACCOUNTS", "MIRROR").split(',') if p.strip()]
+        if 'MIRROR' not in mirror_prefixes:
+            mirror_prefixes.insert(0, 'MIRROR')
+        mirrors = {}
+        for prefix in mirror_prefixes:
+            account_id, account = self._account_from_env(prefix)
+            account['lot_multiplier'] = int(os.getenv(f"{prefix}_LOT_MULTIPLIER", "1"))
+            mirrors[account_id] = account
+        self.mirror_account_ids = list(mirrors)
         
         return {
-            'source_account': {
-                'API_KEY': os.getenv("SOURCE_API_KEY"),
-                'CLIENT_ID': os.getenv("SOURCE_CLIENT_ID"),
-                'MPIN': os.getenv("SOURCE_MPIN"),
-                'TOTP_TOKEN': os.getenv("SOURCE_TOTP_TOKEN"),
-                'name': os.getenv("SOURCE_NAME", "source_account")
-            },
-            'mirror_account': {
-                'API_KEY': os.getenv("MIRROR_API_KEY"),
-                'CLIENT_ID': os.getenv("MIRROR_CLIENT_ID"),
-                'MPIN': os.getenv("MIRROR_MPIN"),
-                'TOTP_TOKEN': os.getenv("MIRROR_TOTP_TOKEN"),
-                'name': os.getenv("MIRROR_NAME", "mirror_account")
-            },
+            **sources,
+            **mirrors,
+            # Fallback only - lot sizes come from the instrument master index when loaded
             'LOT_SIZE' : {
                 'NIFTY': 75,
                 'BANKNIFTY': 35,
@@ -46,9 +70,61 @@ class ConfigManager:
             'max_trade_qty': 300,
             'price_tolerance': 0.01,
             'max_retries': 3,
-            'retry_delay': 2,
+            'retry_delay': 2,  # base of the jittered exponential backoff
+            'retry_max_delay': 10,
+            'circuit_failure_threshold': 5,  # consecutive transient failures that open an endpoint's circuit
+            'circuit_reset_seconds': 10,  # open circuits fail fast this long before a trial call
             'check_interval': 10,
+            'poll_min_interval': 0.5,
+            'poll_fast_max_interval': 2,
+            'poll_fast_window': 30,
+            'poll_backoff': 1.5,
+            'max_polls_per_minute': 60,
             'processed_trades_db': 'data/processed_trades.db',
+            'order_stream_enabled': False,
+            'order_stream_url': None,  # None -> SmartAPI order-update endpoint
+            'push_safety_poll_interval': 60,
+            'persist_flush_interval_ms': 50,
+            'source_poll_workers': 4,
+            'fill_aggregation_window_ms': 150,
+            'mirror_on_placement': False,  # mirror source MARKET orders before they fill
+            'net_opposing_fills': True,  # net BUY/SELL of a symbol within one detection batch
+            'instrument_db': 'data/instruments.db',
+            'execution_workers': 4,  # mirror order workers (trades of one symbol stay in order)
+            'quote_cache_ttl_ms': 1000,  # cached LTPs older than this trigger a live ltpData call
+            'mirror_deadline_seconds': 15.0,  # abandon a mirror this long after the source fill (0 = off); keep >= check_interval
+            'reconcile_interval': 2,  # seconds between orderBook checks of pending mirror orders
+            'intent_journal_path': None,  # None -> intent_journal.log next to processed_trades_db
+            'intent_journal_fsync': True,
+            'order_mode': 'market',  # or 'limit_chase': LIMIT at source price +/- tolerance, chased
+            'chase_interval_ms': 1000,  # between fill checks / price steps of a chased LIMIT
+            'chase_steps': 3,  # LIMIT modifications before converting to MARKET
+            'keepalive_enabled': True,  # pooled keep-alive HTTP session per account
+            'keepalive_pool_size': 8,
+            'keepalive_warm_interval': 20,  # seconds idle before a warm-up request (market hours only)
+            'rate_limit_enabled': True,  # token buckets in front of every SmartConnect call
+            'rate_limits': {},  # per-endpoint requests/second overriding Angel One's published limits
+            'rate_limit_account_per_second': 20,
+            'rate_limit_order_reserve': 2,  # account tokens reads may not use, kept for orders
+            'instrument_master_url': None,  # None -> Angel One OpenAPIScripMaster.json
+            'instrument_master_file': None,  # local scrip master JSON instead of downloading
+            'record_session_path': None,  # capture SmartConnect calls for offline replay
+            'replay_session_path': None,  # run against a recording instead of the broker
+            'replay_speed': 1.0,
+            'replay_dir': 'data/replay',  # scratch trade stores of replays (one subdirectory per run)
+            'dry_run_simulation': True,  # dry-run mirror orders go to the simulated broker
+            'dry_run_dir': 'data/dry_run',  # processed/mirrored trade stores and intent journal of dry runs
+            'sim_latency_ms': 60,  # median order round trip
+            'sim_latency_dist': 'lognormal',  # lognormal, normal or fixed
+            'sim_latency_sigma': 0.4,
+            'sim_fill_delay_ms': 150,  # acceptance to fill
+            'sim_reject_rate': 0.0,  # share of orders rejected by simulated RMS
+            'sim_slippage_bps': 2.0,  # mean fill slippage against the market price
+            'sim_slippage_sigma_bps': 5.0,
+            'sim_quotes_path': None,  # session recording to take market prices from
+            'sim_seed': None,
+            'dedupe_lookback_days': 0,  # previous sessions checked via key digests
+            'dedupe_retention_days': 7,  # older raw keys are compacted to digests
             'mirror_enabled': False  # Add missing setting
         }
         
@@ -69,8 +145,60 @@ class ConfigManager:
             'PRICE_TOLERANCE': ('price_tolerance', float),
             'MAX_RETRIES': ('max_retries', int),
             'RETRY_DELAY': ('retry_delay', int),
+            'RETRY_MAX_DELAY': ('retry_max_delay', float),
+            'CIRCUIT_FAILURE_THRESHOLD': ('circuit_failure_threshold', int),
+            'CIRCUIT_RESET_SECONDS': ('circuit_reset_seconds', float),
             'CHECK_INTERVAL': ('check_interval', int),
+            'POLL_MIN_INTERVAL': ('poll_min_interval', float),
+            'POLL_FAST_MAX_INTERVAL': ('poll_fast_max_interval', float),
+            'POLL_FAST_WINDOW': ('poll_fast_window', int),
+            'POLL_BACKOFF': ('poll_backoff', float),
+            'MAX_POLLS_PER_MINUTE': ('max_polls_per_minute', int),
             'PROCESSED_TRADES_DB': ('processed_trades_db', str),
+            'ORDER_STREAM_ENABLED': ('order_stream_enabled', lambda x: x.lower() == 'true'),
+            'ORDER_STREAM_URL': ('order_stream_url', str),
+            'PUSH_SAFETY_POLL_INTERVAL': ('push_safety_poll_interval', int),
+            'PERSIST_FLUSH_INTERVAL_MS': ('persist_flush_interval_ms', int),
+            'SOURCE_POLL_WORKERS': ('source_poll_workers', int),
+            'FILL_AGGREGATION_WINDOW_MS': ('fill_aggregation_window_ms', int),
+            'MIRROR_ON_PLACEMENT': ('mirror_on_placement', lambda x: x.lower() == 'true'),
+            'NET_OPPOSING_FILLS': ('net_opposing_fills', lambda x: x.lower() == 'true'),
+            'INSTRUMENT_DB': ('instrument_db', str),
+            'QUOTE_CACHE_TTL_MS': ('quote_cache_ttl_ms', int),
+            'EXECUTION_WORKERS': ('execution_workers', int),
+            'MIRROR_DEADLINE_SECONDS': ('mirror_deadline_seconds', float),
+            'RECONCILE_INTERVAL': ('reconcile_interval', float),
+            'INTENT_JOURNAL_PATH': ('intent_journal_path', str),
+            'INTENT_JOURNAL_FSYNC': ('intent_journal_fsync', lambda x: x.lower() == 'true'),
+            'ORDER_MODE': ('order_mode', str),
+            'CHASE_INTERVAL_MS': ('chase_interval_ms', int),
+            'CHASE_STEPS': ('chase_steps', int),
+            'KEEPALIVE_ENABLED': ('keepalive_enabled', lambda x: x.lower() == 'true'),
+            'KEEPALIVE_POOL_SIZE': ('keepalive_pool_size', int),
+            'KEEPALIVE_WARM_INTERVAL': ('keepalive_warm_interval', float),
+            'RATE_LIMIT_ENABLED': ('rate_limit_enabled', lambda x: x.lower() == 'true'),
+            'RATE_LIMITS': ('rate_limits', json.loads),
+            'RATE_LIMIT_ACCOUNT_PER_SECOND': ('rate_limit_account_per_second', float),
+            'RATE_LIMIT_ORDER_RESERVE': ('rate_limit_order_reserve', int),
+            'INSTRUMENT_MASTER_URL': ('instrument_master_url', str),
+            'INSTRUMENT_MASTER_FILE': ('instrument_master_file', str),
+            'RECORD_SESSION_PATH': ('record_session_path', str),
+            'REPLAY_SESSION_PATH': ('replay_session_path', str),
+            'REPLAY_SPEED': ('replay_speed', float),
+            'REPLAY_DIR': ('replay_dir', str),
+            'DRY_RUN_SIMULATION': ('dry_run_simulation', lambda x: x.lower() == 'true'),
+            'DRY_RUN_DIR': ('dry_run_dir', str),
+            'SIM_LATENCY_MS': ('sim_latency_ms', float),
+            'SIM_LATENCY_DIST': ('sim_latency_dist', str),
+            'SIM_LATENCY_SIGMA': ('sim_latency_sigma', float),
+            'SIM_FILL_DELAY_MS': ('sim_fill_delay_ms', float),
+            'SIM_REJECT_RATE': ('sim_reject_rate', float),
+            'SIM_SLIPPAGE_BPS': ('sim_slippage_bps', float),
+            'SIM_SLIPPAGE_SIGMA_BPS': ('sim_slippage_sigma_bps', float),
+            'SIM_QUOTES_PATH': ('sim_quotes_path', str),
+            'SIM_SEED': ('sim_seed', int),
+            'DEDUPE_LOOKBACK_DAYS': ('dedupe_lookback_days', int),
+            'DEDUPE_RETENTION_DAYS': ('dedupe_retention_days', int),
             'MIRROR_ENABLED': ('mirror_enabled', lambda x: x.lower() == 'true')  # Add env mapping
         }
 
@@ -87,6 +215,14 @@ class ConfigManager:
         """Get specific account configuration"""
         return self.accounts.get(account_id)
     
+    def get_source_account_ids(self):
+        """Ids of all source accounts being followed"""
+        return self.source_account_ids
+
+    def get_mirror_account_ids(self):
+        """Ids of all mirror accounts trades are copied to"""
+        return self.mirror_account_ids
+
     def get_all_accounts(self):
         """Get all accounts"""
         return self.accounts
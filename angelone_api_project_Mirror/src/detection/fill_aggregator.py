@@ -0,0 +1,84 @@
+import logging
+import time
+
+
+class FillAggregator:
+    """
+    Groups partial fills of the same source order that arrive within
+    `fill_aggregation_window_ms` into one consolidated trade, so an order
+    filled in five pieces is mirrored with one order instead of five.
+
+    Fills without an order id, and whole orders mirrored on placement,
+    pass straight through.
+    """
+
+    def __init__(self, settings, clock=time.monotonic):
+        self.logger = logging.getLogger('fill_aggregator')
+        self.window = settings.get('fill_aggregation_window_ms', 150) / 1000.0
+        self._clock = clock
+        # (source_id, order_id) -> {'deadline': float, 'fills': [trade, ...]}
+        self._pending = {}
+        self._passthrough = []
+        self.fills_received = 0
+        self.trades_emitted = 0
+
+    def add(self, trades):
+        """Queue newly detected fills"""
+        now = self._clock()
+        for trade in trades:
+            self.fills_received += 1
+            order_id = trade.get('order_id')
+            if not order_id or trade.get('pre_fill'):
+                self._passthrough.append(trade)
+                continue
+            group_key = (trade.get('source_id'), order_id)
+            group = self._pending.get(group_key)
+            if group is None:
+                group = self._pending[group_key] = {'deadline': now + self.window, 'fills': []}
+            group['fills'].append(trade)
+
+    def seconds_until_ready(self):
+        """Seconds until the next pending group closes (None if nothing pending)"""
+        if self._passthrough:
+            return 0.0
+        if not self._pending:
+            return None
+        return max(0.0, min(g['deadline'] for g in self._pending.values()) - self._clock())
+
+    def pop_ready(self):
+        """Return consolidated trades whose aggregation window has closed"""
+        now = self._clock()
+        ready, self._passthrough = self._passthrough, []
+        for group_key in [k for k, g in self._pending.items() if g['deadline'] <= now]:
+            ready.append(self.consolidate(self._pending.pop(group_key)['fills']))
+        self.trades_emitted += len(ready)
+        ready.sort(key=lambda t: t.get('trade_time') or '')
+        return ready
+
+    def consolidate(self, fills):
+        """Merge fills of one order: summed quantity at the volume-weighted price"""
+        if len(fills) == 1:
+            return fills[0]
+
+        total_qty = sum(int(f['quantity']) for f in fills)
+        vwap = sum(float(f['order_price']) * int(f['quantity']) for f in fills) / total_qty
+        trade = dict(fills[0])
+        trade.update({
+            'quantity': total_qty,
+            'order_price': round(vwap, 2),
+            'trade_price': round(vwap, 2),
+            'trade_time': fills[-1].get('trade_time', ''),
+            'fill_keys': [f['trade_key'] for f in fills],
+            'fill_count': len(fills)
+        })
+        self.logger.info(f"Aggregated {len(fills)} fills of order {trade['order_id']} "
+                         f"-> {trade['symbol']} Qty: {total_qty} @ {trade['order_price']}")
+        return trade
+
+    def get_stats(self):
+        """Get aggregation statistics"""
+        return {
+            'fills_received': self.fills_received,
+            'trades_emitted': self.trades_emitted,
+            'pending_orders': len(self._pending)
+        }
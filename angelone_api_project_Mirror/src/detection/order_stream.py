@@ -0,0 +1,132 @@
+import json
+import logging
+import ssl
+import threading
+import time
+
+import websocket
+from SmartApi.smartWebSocketOrderUpdate import SmartWebSocketOrderUpdate
+
+
+class OrderUpdateStream:
+    """
+    Subscribes to the SmartAPI order-update WebSocket for one account and
+    hands every order update message to `on_update`.
+
+    Runs on a daemon thread and reconnects until stop() is called. The url is
+    configurable so tests can point it at a local fake server.
+    """
+
+    def __init__(self, auth_manager, account_id, on_update, url=None, reconnect_delay=2):
+        self.auth = auth_manager
+        self.account_id = account_id
+        self.on_update = on_update
+        self.url = url or SmartWebSocketOrderUpdate.WEBSOCKET_URI
+        self.reconnect_delay = reconnect_delay
+        self.logger = logging.getLogger('order_stream')
+
+        self.running = False
+        self.connected = False
+        self.messages_received = 0
+        self.reconnects = 0
+        self.last_message_time = None
+        self._wsapp = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def _headers(self):
+        account = self.auth.config.get_account(self.account_id) or {}
+        tokens = self.auth.tokens.get(self.account_id, {})
+        return {
+            'Authorization': tokens.get('jwt_token', ''),
+            'x-api-key': account.get('API_KEY') or '',
+            'x-client-code': account.get('CLIENT_ID') or '',
+            'x-feed-token': tokens.get('feed_token') or ''
+        }
+
+    def start(self):
+        """Connect in the background"""
+        if self.running:
+            return
+        self.running = True
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=f'order_stream_{self.account_id}')
+        self._thread.daemon = True
+        self._thread.start()
+        self.logger.info(f"Order update stream starting for {self.account_id}: {self.url}")
+
+    def stop(self):
+        """Close the socket and stop reconnecting"""
+        self.running = False
+        self._stop_event.set()
+        if self._wsapp:
+            try:
+                self._wsapp.close()
+            except Exception:
+                pass
+        if self._thread:
+            self._thread.join(timeout=5)
+        self.connected = False
+        self.logger.info(f"Order update stream stopped for {self.account_id}")
+
+    def _run(self):
+        while self.running:
+            try:
+                self._wsapp = websocket.WebSocketApp(
+                    self.url,
+                    header=self._headers(),
+                    on_open=self._on_open,
+                    on_message=self._on_message,
+                    on_error=self._on_error,
+                    on_close=self._on_close
+                )
+                self._wsapp.run_forever(
+                    sslopt={'cert_reqs': ssl.CERT_NONE},
+                    ping_interval=SmartWebSocketOrderUpdate.HEARTBEAT_INTERVAL_SECONDS,
+                    ping_payload=SmartWebSocketOrderUpdate.HEARTBEAT_MESSAGE
+                )
+            except Exception as e:
+                self.logger.error(f"Order update stream error: {e}")
+
+            self.connected = False
+            if self.running:
+                self.reconnects += 1
+                self.logger.warning(f"Order update stream disconnected - reconnecting in {self.reconnect_delay}s")
+                self._stop_event.wait(self.reconnect_delay)
+
+    def _on_open(self, wsapp):
+        self.connected = True
+        self.logger.info(f"Order update stream connected for {self.account_id}")
+
+    def _on_close(self, wsapp, close_status_code, close_msg):
+        self.connected = False
+
+    def _on_error(self, wsapp, error):
+        self.logger.error(f"Order update stream error: {error}")
+
+    def _on_message(self, wsapp, message):
+        if message == 'pong':
+            return
+        try:
+            update = json.loads(message)
+        except (TypeError, ValueError):
+            self.logger.debug(f"Ignoring non-JSON order stream message: {message!r}")
+            return
+
+        self.messages_received += 1
+        self.last_message_time = time.time()
+        if not isinstance(update, dict) or not update.get('orderData'):
+            return
+        try:
+            self.on_update(update)
+        except Exception as e:
+            self.logger.error(f"Error handling order update: {e}")
+
+    def get_stats(self):
+        """Get stream statistics"""
+        return {
+            'connected': self.connected,
+            'messages_received': self.messages_received,
+            'reconnects': self.reconnects,
+            'last_message_time': self.last_message_time
+        }
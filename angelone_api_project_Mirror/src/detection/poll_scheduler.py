@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from src.safety.safety_manager import SafetyManager
+
+
+class PollScheduler:
+    """
+    Decides how long the monitoring loop waits before the next tradeBook poll.
+
+    - Right after source activity it polls every `poll_min_interval` seconds,
+      backing off by `poll_backoff` per quiet poll but staying at or under
+      `poll_fast_max_interval` for `poll_fast_window` seconds.
+    - After that it keeps backing off up to `check_interval`.
+    - Outside the 9:15-15:30 weekday session it sleeps until the next open
+      (a replay hands in `skip_time`, which jumps its clock there instead).
+    - It never exceeds `max_polls_per_minute` tradeBook calls.
+    """
+
+    def __init__(self, settings, clock=time.monotonic, now_func=datetime.now, skip_time=None):
+        self.logger = logging.getLogger('poll_scheduler')
+        self.min_interval = settings.get('poll_min_interval', 0.5)
+        self.fast_max_interval = settings.get('poll_fast_max_interval', 2)
+        self.fast_window = settings.get('poll_fast_window', 30)
+        self.backoff = settings.get('poll_backoff', 1.5)
+        self.max_interval = settings.get('check_interval', 10)
+        self.max_polls_per_minute = settings.get('max_polls_per_minute', 60)
+
+        self._clock = clock
+        self._now = now_func
+        self._skip_time = skip_time
+        self._wake_event = threading.Event()
+
+        self.current_interval = self.max_interval
+        self.last_activity = None
+        self._recent_polls = deque()
+        self.total_polls = 0
+        self.throttled_waits = 0
+
+    def in_session(self, now=None):
+        """Check if a poll now could see new trades (weekday market hours)"""
+        now = now or self._now()
+        if now.weekday() >= 5:
+            return False
+        return SafetyManager.MARKET_OPEN <= now.time() <= SafetyManager.MARKET_CLOSE
+
+    def seconds_until_open(self, now=None):
+        """Seconds until the next 9:15 weekday open (0 while in session)"""
+        now = now or self._now()
+        if self.in_session(now):
+            return 0.0
+        next_open = datetime.combine(now.date(), SafetyManager.MARKET_OPEN)
+        if now >= next_open:
+            next_open += timedelta(days=1)
+        while next_open.weekday() >= 5:
+            next_open += timedelta(days=1)
+        return (next_open - now).total_seconds()
+
+    def record_poll(self, activity=False):
+        """Record a tradeBook poll; activity=True when it returned new trades"""
+        now = self._clock()
+        self.total_polls += 1
+        self._recent_polls.append(now)
+
+        if activity:
+            self.last_activity = now
+            self.current_interval = self.min_interval
+            return
+
+        ceiling = self.max_interval
+        if self.last_activity is not None and now - self.last_activity < self.fast_window:
+            ceiling = min(self.fast_max_interval, self.max_interval)
+        self.current_interval = min(self.current_interval * self.backoff, ceiling)
+
+    def _budget_delay(self, now):
+        """Seconds to wait so the rolling 60s window stays within budget"""
+        while self._recent_polls and now - self._recent_polls[0] >= 60:
+            self._recent_polls.popleft()
+        if not self.max_polls_per_minute or len(self._recent_polls) < self.max_polls_per_minute:
+            return 0.0
+        return 60 - (now - self._recent_polls[0])
+
+    def next_interval(self):
+        """Seconds to wait before the next poll"""
+        until_open = self.seconds_until_open()
+        if until_open > 0:
+            return until_open
+
+        interval = self.current_interval
+        budget_delay = self._budget_delay(self._clock())
+        if budget_delay > interval:
+            self.throttled_waits += 1
+            interval = budget_delay
+        return interval
+
+    def wait(self, max_wait=None):
+        """Sleep until the next poll is due (or max_wait); returns early on wake()"""
+        interval = self.next_interval()
+        off_hours = not self.in_session()
+        if off_hours:
+            self.logger.info(f"Outside market session - next poll in {interval / 60:.1f} min")
+        if max_wait is not None:
+            interval = min(interval, max_wait)
+        if off_hours and self._skip_time:
+            # the injected clock is not wall time - move it instead of sleeping for real
+            self._skip_time(interval)
+            return
+        self._wake_event.wait(interval)
+        self._wake_event.clear()
+
+    def wake(self):
+        """Interrupt the current wait (e.g. on shutdown)"""
+        self._wake_event.set()
+
+    def get_stats(self):
+        """Get polling statistics"""
+        return {
+            'current_interval': self.current_interval,
+            'total_polls': self.total_polls,
+            'polls_last_minute': len(self._recent_polls),
+            'throttled_waits': self.throttled_waits,
+            'in_session': self.in_session()
+        }
@@ -0,0 +1,90 @@
+from src.utils.symbol_parser import is_nifty_option
+
+
+def comparable_time(value):
+    """
+    Fill time as zero-padded 'HH:MM:SS[.ffffff]' so old `orderTimestamp`
+    ('YYYY-MM-DD HH:MM:SS'), 'DD-Mon-YYYY HH:MM:SS' and `filltime`
+    ('HH:MM:SS') values order correctly as strings; '' if unparseable
+    """
+    time_part = str(value or '').strip().split(' ')[-1].split('T')[-1]
+    parts = time_part.split(':')
+    if len(parts) != 3:
+        return ''
+    seconds, _, fraction = parts[2].partition('.')
+    try:
+        hms = f"{int(parts[0]):02d}:{int(parts[1]):02d}:{int(seconds):02d}"
+    except ValueError:
+        return ''
+    return f"{hms}.{fraction}" if fraction.isdigit() else hms
+
+
+class TradeBookBatch:
+    """
+    Column view of a raw tradebook response, built in one pass.
+
+    Fill times, symbols, quantities and trade_keys are pulled out as lists
+    (old `orderTimestamp` and new `filltime` rows alike) so cursor, NIFTY and
+    dedupe filtering run over whole columns. Only the surviving row indices
+    are handed back for full parsing. Cursor comparisons use `times`, the
+    fill times normalised by comparable_time(); keys keep the raw values.
+    """
+
+    # format -> (fill time, symbol, quantity) fields
+    OLD_FIELDS = ('orderTimestamp', 'tradingSymbol', 'quantity')
+    NEW_FIELDS = ('filltime', 'tradingsymbol', 'fillsize')
+
+    def __init__(self, rows):
+        self.rows = rows
+        old = ['orderTimestamp' in row for row in rows]
+        if all(old) or not any(old):
+            time_f, symbol_f, qty_f = self.OLD_FIELDS if old and old[0] else self.NEW_FIELDS
+            self.fill_times = [row.get(time_f) or '' for row in rows]
+            self.symbols = [row.get(symbol_f) for row in rows]
+            self.quantities = [row.get(qty_f) for row in rows]
+        else:
+            fields = [self.OLD_FIELDS if is_old else self.NEW_FIELDS for is_old in old]
+            self.fill_times = [row.get(f[0]) or '' for row, f in zip(rows, fields)]
+            self.symbols = [row.get(f[1]) for row, f in zip(rows, fields)]
+            self.quantities = [row.get(f[2]) for row, f in zip(rows, fields)]
+        # Same format as TradeDetector.raw_trade_key
+        self.keys = [f"{t}_{s}_{q}" for t, s, q in zip(self.fill_times, self.symbols, self.quantities)]
+        self.times = [comparable_time(t) for t in self.fill_times]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def ahead_of(self, cursor_time, cursor_keys):
+        """Indices of rows past the high-water mark (rows without a fill time are kept)"""
+        if cursor_time is None:
+            return list(range(len(self.rows)))
+        cursor_time = comparable_time(cursor_time)
+        times, keys = self.times, self.keys
+        return [i for i in range(len(times))
+                if not times[i] or times[i] > cursor_time
+                or (times[i] == cursor_time and keys[i] not in cursor_keys)]
+
+    def advance_cursor(self, indices, cursor_time, cursor_keys):
+        """
+        High-water mark after `indices`, which must only be rows that were
+        accepted (or were already processed); returns (time, keys, moved)
+        """
+        times = [self.times[i] for i in indices if self.times[i] and self.symbols[i]]
+        if not times:
+            return cursor_time, cursor_keys, False
+        latest = max(times)
+        if cursor_time is not None:
+            cursor_time = comparable_time(cursor_time)
+            if latest < cursor_time:
+                return cursor_time, cursor_keys, False
+        at_latest = {self.keys[i] for i in indices if self.times[i] == latest and self.symbols[i]}
+        if latest == cursor_time:
+            if at_latest <= cursor_keys:
+                return cursor_time, cursor_keys, False
+            return cursor_time, cursor_keys | at_latest, True
+        return latest, at_latest, True
+
+    def nifty_options(self, indices):
+        """Keep NIFTY-option rows; each distinct symbol is classified once"""
+        nifty = {s: is_nifty_option(s) for s in {self.symbols[i] for i in indices}}
+        return [i for i in indices if nifty[self.symbols[i]]]
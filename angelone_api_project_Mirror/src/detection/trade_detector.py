@@ -4,72 +4,252 @@ from datetime import datetime
 import json
 import os
 import sqlite3
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.detection.order_stream import OrderUpdateStream
+from src.detection.trade_book_batch import TradeBookBatch, comparable_time
+from src.utils.write_behind import WriteBehindQueue
+from src.utils.key_store import DayPartitionedKeyStore
+from src.utils.retry_policy import policy_for
+from src.utils.symbol_parser import parse_symbol
 
 class TradeDetector:
-    def __init__(self, config_manager, auth_manager):
+    # The original single source; its trade_keys stay un-prefixed
+    PRIMARY_SOURCE = 'source_account'
+    # Order states after which a source order will not fill any further
+    TERMINAL_ORDER_STATUSES = ('complete', 'rejected', 'cancelled')
+
+    def __init__(self, config_manager, auth_manager, db_path=None):
         self.config = config_manager
         self.auth = auth_manager
         self.logger = logging.getLogger('trade_detector')
-        # Persistent processed trades (SQLite)
-        db_path = self.config.get_settings().get('processed_trades_db', 'processed_trades.db')
+        # Shared breakers: a degraded source endpoint fails fast instead of timing out every poll
+        self.retry = policy_for(auth_manager, self.config.get_settings())
+        # Persistent processed trades (SQLite; replays keep their own)
+        db_path = db_path or self.config.get_settings().get('processed_trades_db', 'processed_trades.db')
         db_dir = os.path.dirname(db_path) or '.'
         if db_dir and not os.path.exists(db_dir):
             os.makedirs(db_dir, exist_ok=True)
         self._db_path = db_path
 
         # Add error handling for DB connection
+        self._conn = None
         try:
             self._conn = sqlite3.connect(self._db_path, check_same_thread=False)
             self._ensure_table()
         except sqlite3.Error as e:
             self.logger.error(f"Database initialization failed: {e}")
-            # Fallback to in-memory
-            self.processed_trades = set()
+            # Fallback to in-memory (the key store works without a connection)
 
+        # Only the current trading session's keys are kept in memory
         self.processed_trades = self._load_processed_trades()
         self.last_check_time = None
+
+        # Key/cursor writes go through a background writer so the detection
+        # path never waits on a commit; the in-memory state is authoritative
+        self._writer = WriteBehindQueue(
+            self._db_path,
+            flush_interval_ms=self.config.get_settings().get('persist_flush_interval_ms', 50),
+            name='trade_detector_writer'
+        )
+
+        # Source accounts to follow; tradebooks are polled concurrently
+        settings = self.config.get_settings()
+        self.source_accounts = self._load_source_accounts()
+        self.poll_workers = settings.get('source_poll_workers', 4)
+        self._poll_pool = None
+
+        # Per-account high-water mark over the tradebook: latest fill time seen
+        # plus the trade_keys observed at exactly that time (1s resolution)
+        self._cursors = {acc: self._load_cursor(acc) for acc in self.source_accounts}
+
+        # Fingerprint of each account's last tradebook; an unchanged book is
+        # not walked at all (hit/miss counters are updated under self._lock)
+        self._book_fingerprints = {}
+        self.fingerprint_hits = 0
+        self.fingerprint_misses = 0
+
+        # Push detection (order-update WebSocket); tradeBook polling becomes
+        # a slow safety net while an account's stream is connected
+        self.order_streams = {}
+        self.push_listener = None
+        self.push_safety_poll_interval = settings.get('push_safety_poll_interval', 60)
+        self._pushed_trades = queue.Queue()
+        self._last_poll_times = {}
+        self.pushed_trade_count = 0
+        self._lock = threading.Lock()
+        # order_id -> (pushed_qty, polled_qty, ahead_qty) so a fill seen on
+        # both paths, or already mirrored on placement, is only emitted once
+        self._order_fills = self._load_order_fills()
+
+        # Mirror source MARKET orders as soon as they are placed (orderBook /
+        # order stream), then correct once the source fill is known
+        self.mirror_on_placement = settings.get('mirror_on_placement', False)
+        self.placement_mirror_count = 0
+        self.placement_correction_count = 0
     
     def _ensure_table(self):
         cur = self._conn.cursor()
         cur.execute("""
             CREATE TABLE IF NOT EXISTS processed_trades (
-                trade_key TEXT PRIMARY KEY,
-                first_seen TIMESTAMP
+                trade_key TEXT,
+                first_seen TIMESTAMP,
+                session_date TEXT,
+                PRIMARY KEY (session_date, trade_key)
             )
         """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS detector_cursor (
+                account_id TEXT PRIMARY KEY,
+                session_date TEXT,
+                fill_time TEXT,
+                fill_keys TEXT
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS order_fill_progress (
+                order_id TEXT PRIMARY KEY,
+                session_date TEXT,
+                pushed_qty INTEGER,
+                polled_qty INTEGER,
+                ahead_qty INTEGER DEFAULT 0
+            )
+        """)
+        columns = [r[1] for r in cur.execute("PRAGMA table_info(order_fill_progress)")]
+        if 'ahead_qty' not in columns:
+            cur.execute("ALTER TABLE order_fill_progress ADD COLUMN ahead_qty INTEGER DEFAULT 0")
         self._conn.commit()
 
     def _load_processed_trades(self):
-        cur = self._conn.cursor()
-        cur.execute("SELECT trade_key FROM processed_trades")
-        rows = cur.fetchall()
-        return set(r[0] for r in rows)
+        settings = self.config.get_settings()
+        return DayPartitionedKeyStore(
+            self._conn, 'processed_trades', 'first_seen',
+            lookback_days=settings.get('dedupe_lookback_days', 0),
+            retention_days=settings.get('dedupe_retention_days', 7)
+        )
 
     def _persist_trade_key(self, trade_key):
         try:
-            cur = self._conn.cursor()
-            cur.execute(
-                "INSERT OR IGNORE INTO processed_trades (trade_key, first_seen) VALUES (?, ?)",
-                (trade_key, datetime.now().isoformat())
+            self._writer.submit(
+                "INSERT OR IGNORE INTO processed_trades (trade_key, first_seen, session_date) VALUES (?, ?, ?)",
+                (trade_key, datetime.now().isoformat(), self.processed_trades.session_date)
             )
-            self._conn.commit()
         except Exception as e:
             self.logger.error(f"Failed to persist trade_key {trade_key}: {e}")
             # don't raise - persistence failure shouldn't block detection
             return
-    def get_source_connection(self):
-        """Get authenticated connection for source account"""
-        return self.auth.get_connection('source_account')
+
+    def _load_source_accounts(self):
+        get_ids = getattr(self.config, 'get_source_account_ids', None)
+        accounts = list(get_ids()) if get_ids else []
+        return accounts or [self.PRIMARY_SOURCE]
+
+    def namespaced_key(self, account_id, key):
+        """Per-source dedupe namespace (the primary source keeps bare keys)"""
+        return key if account_id == self.PRIMARY_SOURCE else f"{account_id}:{key}"
+
+    def _load_cursor(self, account_id):
+        """Load today's tradebook high-water mark (a new session starts empty)"""
+        try:
+            cur = self._conn.cursor()
+            cur.execute(
+                "SELECT session_date, fill_time, fill_keys FROM detector_cursor WHERE account_id = ?",
+                (account_id,)
+            )
+            row = cur.fetchone()
+        except Exception as e:
+            self.logger.warning(f"Could not load detector cursor: {e}")
+            return None, set()
+
+        if not row or row[0] != datetime.now().date().isoformat():
+            return None, set()
+        # cursors written before times were normalised may hold a raw timestamp
+        return comparable_time(row[1]) or None, set(json.loads(row[2] or '[]'))
+
+    def _persist_cursor(self, account_id):
+        cursor_time, cursor_keys = self._cursors[account_id]
+        try:
+            self._writer.submit(
+                "INSERT OR REPLACE INTO detector_cursor (account_id, session_date, fill_time, fill_keys) "
+                "VALUES (?, ?, ?, ?)",
+                (account_id, datetime.now().date().isoformat(),
+                 cursor_time, json.dumps(sorted(cursor_keys)))
+            )
+        except Exception as e:
+            self.logger.error(f"Failed to persist detector cursor: {e}")
+
+    def _load_order_fills(self):
+        try:
+            today = datetime.now().date().isoformat()
+            cur = self._conn.cursor()
+            cur.execute("DELETE FROM order_fill_progress WHERE session_date < ?", (today,))
+            self._conn.commit()
+            cur.execute(
+                "SELECT order_id, pushed_qty, polled_qty, COALESCE(ahead_qty, 0) "
+                "FROM order_fill_progress WHERE session_date = ?",
+                (today,)
+            )
+            return {r[0]: (r[1], r[2], r[3]) for r in cur.fetchall()}
+        except Exception as e:
+            self.logger.warning(f"Could not load order fill progress: {e}")
+            return {}
+
+    def _claim_order_fill(self, order_id, pushed_total=None, polled_qty=None, ahead_qty=None):
+        """
+        Record quantity seen for an order on the push or poll path, or
+        mirrored ahead of the fill on placement.
+        Returns: quantity not yet covered by any path (0 if already seen)
+        """
+        with self._lock:
+            pushed, polled, ahead = self._order_fills.get(order_id, (0, 0, 0))
+            covered = max(pushed, polled, ahead)
+            if pushed_total is not None:
+                pushed = max(pushed, pushed_total)
+            if polled_qty:
+                polled += polled_qty
+            if ahead_qty:
+                ahead = max(ahead, ahead_qty)
+            self._order_fills[order_id] = (pushed, polled, ahead)
+            try:
+                self._writer.submit(
+                    "INSERT OR REPLACE INTO order_fill_progress "
+                    "(order_id, session_date, pushed_qty, polled_qty, ahead_qty) VALUES (?, ?, ?, ?, ?)",
+                    (order_id, datetime.now().date().isoformat(), pushed, polled, ahead)
+                )
+            except Exception as e:
+                self.logger.error(f"Failed to persist fill progress for {order_id}: {e}")
+            return max(pushed, polled, ahead) - covered
+
+    def is_behind_cursor(self, fill_time, trade_key, account_id=PRIMARY_SOURCE):
+        """Check if a raw fill is at or below the high-water mark (already seen)"""
+        cursor_time, cursor_keys = self._cursors.get(account_id, (None, set()))
+        fill_time = comparable_time(fill_time)
+        if not fill_time or cursor_time is None:
+            return False
+        if fill_time < cursor_time:
+            return True
+        return fill_time == cursor_time and trade_key in cursor_keys
+
+    def _reset_cursors(self):
+        self._cursors = {acc: (None, set()) for acc in self.source_accounts}
+        self._book_fingerprints = {}
+
+    def get_source_connection(self, account_id=PRIMARY_SOURCE):
+        """Get authenticated connection for a source account"""
+        return self.auth.get_connection(account_id)
     
-    def fetch_trade_book(self):
-        """Fetch trade book from source account"""
+    def fetch_trade_book(self, account_id=PRIMARY_SOURCE):
+        """Fetch trade book from a source account"""
         try:
-            connection = self.get_source_connection()
+            connection = self.get_source_connection(account_id)
             if not connection:
-                self.logger.error("No connection to source account")
+                self.logger.error(f"No connection to source account {account_id}")
                 return None
             
-            trade_data = connection.tradeBook()
+            # one attempt - the next poll is the retry
+            trade_data = self.retry.call('tradeBook', connection.tradeBook, account_id=account_id, attempts=1)
             
             # Handle case where trade_data might be None
             if trade_data is None:
@@ -82,6 +262,210 @@ class TradeDetector:
             self.logger.error(f"Error fetching trade book: {e}")
             return None
     
+    def fetch_order_book(self, account_id=PRIMARY_SOURCE):
+        """Fetch order book from a source account"""
+        try:
+            connection = self.get_source_connection(account_id)
+            if not connection:
+                self.logger.error(f"No connection to source account {account_id}")
+                return None
+            return self.retry.call('orderBook', connection.orderBook, account_id=account_id, attempts=1)
+        except Exception as e:
+            self.logger.error(f"Error fetching order book: {e}")
+            return None
+
+    @staticmethod
+    def book_fingerprint(trades, tail=3):
+        """Cheap identity of a tradebook: row count plus a digest of the last rows"""
+        return len(trades), hash(json.dumps(trades[-tail:], sort_keys=True, default=str))
+
+    @staticmethod
+    def raw_trade_key(trade):
+        """Build trade_key straight from a raw tradebook row (no full parse)"""
+        if 'orderTimestamp' in trade:
+            return f"{trade['orderTimestamp']}_{trade['tradingSymbol']}_{trade['quantity']}"
+        return f"{trade.get('filltime', '')}_{trade['tradingsymbol']}_{trade['fillsize']}"
+
+    def start_order_stream(self, listener=None):
+        """Start push detection from every source account's order-update stream"""
+        settings = self.config.get_settings()
+        self.push_listener = listener
+        for account_id in self.source_accounts:
+            stream = OrderUpdateStream(
+                self.auth, account_id,
+                lambda update, account_id=account_id: self.on_order_update(update, account_id),
+                url=settings.get('order_stream_url')
+            )
+            self.order_streams[account_id] = stream
+            stream.start()
+
+    def stop_order_stream(self):
+        for stream in self.order_streams.values():
+            stream.stop()
+
+    def _stream_connected(self, account_id):
+        stream = self.order_streams.get(account_id)
+        return bool(stream and stream.connected)
+
+    @staticmethod
+    def _time_part(timestamp):
+        """'25-Oct-2023 11:21:18' -> '11:21:18' (tradebook filltime format)"""
+        return (timestamp or '').split(' ')[-1]
+
+    def order_update_to_fill(self, update, account_id=PRIMARY_SOURCE):
+        """
+        Convert an order-update message into a tradebook-style fill row for
+        the quantity filled since the last update. Returns None if nothing new.
+        """
+        order = update.get('orderData') or {}
+        order_id = order.get('orderid')
+        symbol = order.get('tradingsymbol', '')
+        try:
+            filled = int(float(order.get('filledshares') or 0))
+        except (TypeError, ValueError):
+            return None
+        if not order_id or filled <= 0 or not self.is_nifty_option(symbol):
+            return None
+
+        fill_qty = self._claim_order_fill(self.namespaced_key(account_id, order_id), pushed_total=filled)
+        if fill_qty <= 0:
+            return None
+
+        return {
+            'orderid': order_id,
+            'filltime': order.get('filltime') or self._time_part(
+                order.get('exchorderupdatetime') or order.get('updatetime')),
+            'tradingsymbol': symbol,
+            'fillsize': fill_qty,
+            'fillprice': order.get('averageprice') or order.get('price') or 0,
+            'transactiontype': order.get('transactiontype', ''),
+            'producttype': order.get('producttype', ''),
+            'exchange': order.get('exchange', '')
+        }
+
+    def _order_price(self, order, account_id):
+        """Reference price for an unfilled order: its own price, else the source LTP"""
+        for field in ('averageprice', 'price'):
+            try:
+                price = float(order.get(field) or 0)
+            except (TypeError, ValueError):
+                price = 0
+            if price > 0:
+                return price
+        try:
+            response = self.get_source_connection(account_id).ltpData(
+                order.get('exchange', 'NFO'), order.get('tradingsymbol'), order.get('symboltoken'))
+            return float(((response or {}).get('data') or {}).get('ltp') or 0)
+        except Exception as e:
+            self.logger.warning(f"No LTP for {order.get('tradingsymbol')}: {e}")
+            return 0.0
+
+    def _source_order_trade(self, order, account_id, key_suffix, side, quantity, price):
+        order_time = order.get('exchorderupdatetime') or order.get('updatetime') or ''
+        return {
+            'trade_key': self.namespaced_key(account_id, f"{order['orderid']}_{key_suffix}"),
+            'order_id': order['orderid'],
+            'symbol': order['tradingsymbol'],
+            'quantity': quantity,
+            'order_type': side,
+            'product_type': order.get('producttype', ''),
+            'order_price': price,
+            'trade_price': price,
+            'order_time': order_time,
+            'trade_time': self._time_part(order_time),
+            'exchange': order.get('exchange', ''),
+            'status': key_suffix,
+            'source_id': account_id
+        }
+
+    def source_order_to_trades(self, order, account_id=PRIMARY_SOURCE):
+        """
+        Placement mode: turn a source order row (orderBook or order stream)
+        into a mirror-ahead trade when an open MARKET order first appears,
+        or a correcting trade when an order mirrored ahead ends with less
+        filled than was mirrored (partial fill, rejection, cancellation).
+        """
+        order_id = order.get('orderid')
+        symbol = order.get('tradingsymbol', '')
+        if not order_id or not self.is_nifty_option(symbol):
+            return []
+        order_key = self.namespaced_key(account_id, order_id)
+        status = (order.get('status') or order.get('orderstatus') or '').lower()
+        try:
+            quantity = int(float(order.get('quantity') or 0))
+            filled = int(float(order.get('filledshares') or 0))
+        except (TypeError, ValueError):
+            return []
+
+        pushed, polled, ahead = self._order_fills.get(order_key, (0, 0, 0))
+        if status in self.TERMINAL_ORDER_STATUSES:
+            excess = max(pushed, polled, ahead) - filled if ahead else 0
+            if excess <= 0:
+                return []
+            side = 'SELL' if order.get('transactiontype', '').upper() == 'BUY' else 'BUY'
+            trade = self._source_order_trade(order, account_id, 'correction', side, excess,
+                                             self._order_price(order, account_id))
+            if not self._accept_trade(trade):
+                return []
+            self.placement_correction_count += 1
+            self.logger.warning(f"PLACEMENT CORRECTION: source order {order_id} {status} with "
+                                f"{filled}/{quantity} filled - reversing {excess} {symbol}")
+            return [trade]
+
+        # Only unfilled-yet MARKET orders are worth mirroring ahead of the fill
+        if ahead or quantity <= 0 or order.get('ordertype', '').upper() != 'MARKET':
+            return []
+        price = self._order_price(order, account_id)
+        if price <= 0:
+            return []
+        remaining = self._claim_order_fill(order_key, ahead_qty=quantity)
+        if remaining <= 0:
+            return []
+        trade = self._source_order_trade(order, account_id, 'placed',
+                                         order.get('transactiontype', ''), remaining, price)
+        trade['pre_fill'] = True
+        if not self._accept_trade(trade):
+            return []
+        self.placement_mirror_count += 1
+        self.logger.info(f"MIRRORING ON PLACEMENT: source order {order_id} ({status}) {symbol} x{remaining}")
+        return [trade]
+
+    def _poll_order_book(self, account_id=PRIMARY_SOURCE):
+        """Placement mode without an order stream: scan the source orderBook"""
+        order_data = self.fetch_order_book(account_id)
+        if not order_data or not order_data.get('status'):
+            return []
+        new_trades = []
+        for order in order_data.get('data') or []:
+            new_trades += self.source_order_to_trades(order, account_id)
+        return new_trades
+
+    def _push_trade(self, parsed_trade):
+        self.pushed_trade_count += 1
+        self._pushed_trades.put(parsed_trade)
+        if self.push_listener:
+            self.push_listener()
+
+    def on_order_update(self, update, account_id=PRIMARY_SOURCE):
+        """Handle an order-update stream message (runs on the stream thread)"""
+        if self.mirror_on_placement:
+            for trade in self.source_order_to_trades(update.get('orderData') or {}, account_id):
+                self._push_trade(trade)
+
+        fill = self.order_update_to_fill(update, account_id)
+        if not fill:
+            return
+        parsed_trade = self.parse_trade(fill)
+        if not parsed_trade:
+            return
+        # Pushed fills are keyed per order so they never collide with the
+        # tradebook key of the same fill; order-level progress dedupes them
+        parsed_trade['trade_key'] = self.namespaced_key(
+            account_id, f"{parsed_trade['trade_key']}_{fill['orderid']}")
+        parsed_trade['source_id'] = account_id
+        if self._accept_trade(parsed_trade):
+            self._push_trade(parsed_trade)
+
     def parse_trade(self, trade):
         """Parse trade details into standardized format"""
         try:
@@ -89,7 +473,8 @@ class TradeDetector:
             if 'orderTimestamp' in trade:
                 # Old format
                 return {
-                    'trade_key': f"{trade['orderTimestamp']}_{trade['tradingSymbol']}_{trade['quantity']}",
+                    'trade_key': self.raw_trade_key(trade),
+                    'order_id': trade.get('orderId', ''),
                     'symbol': trade['tradingSymbol'],
                     'quantity': trade['quantity'],
                     'order_type': trade['orderType'],
@@ -104,7 +489,8 @@ class TradeDetector:
             else:
                 # New format (what you're getting)
                 return {
-                    'trade_key': f"{trade.get('filltime', '')}_{trade['tradingsymbol']}_{trade['fillsize']}",
+                    'trade_key': self.raw_trade_key(trade),
+                    'order_id': trade.get('orderid', ''),
                     'symbol': trade['tradingsymbol'],
                     'quantity': trade['fillsize'],
                     'order_type': trade['transactiontype'],  # BUY/SELL
@@ -125,24 +511,101 @@ class TradeDetector:
         return trade_key not in self.processed_trades
     
     def is_nifty_option(self, symbol):
-        """Improved NIFTY option validation"""
-        if not symbol:
-            return False
-        try:
-            # More robust NIFTY detection
-            return ('NIFTY' in symbol.upper() and 
-                   any(x in symbol.upper() for x in ['CE', 'PE', 'CALL', 'PUT']))
-        except:
-            return False
+        """NIFTY-family option check using the structured symbol parser"""
+        info = parse_symbol(symbol)
+        return bool(info and info.is_nifty_option)
     
+    def _accept_trade(self, parsed_trade):
+        """Shared dedupe path for polled and pushed fills; True if the trade is new"""
+        trade_key = parsed_trade['trade_key']
+        with self._lock:
+            if not (self.is_nifty_option(parsed_trade['symbol']) and self.is_new_trade(trade_key)):
+                return False
+            # Mark as processed (in-memory + persistent)
+            self.processed_trades.add(trade_key)
+        self._persist_trade_key(trade_key)
+
+        self.logger.info(f"NEW TRADE DETECTED: {parsed_trade['symbol']} "
+                         f"Qty: {parsed_trade['quantity']} "
+                         f"Price: {parsed_trade['order_price']}")
+        return True
+
+    def _mark_processed(self, trade_key):
+        with self._lock:
+            self.processed_trades.add(trade_key)
+        self._persist_trade_key(trade_key)
+
+    def _drain_pushed_trades(self):
+        trades = []
+        while True:
+            try:
+                trades.append(self._pushed_trades.get_nowait())
+            except queue.Empty:
+                return trades
+
+    def _poll_due(self, account_id):
+        """While an account's order stream is up, tradeBook is only a slow safety net"""
+        if not self._stream_connected(account_id):
+            return True
+        last_poll = self._last_poll_times.get(account_id)
+        return last_poll is None or time.monotonic() - last_poll >= self.push_safety_poll_interval
+
+    def _order_book_due(self, account_id):
+        """Placement mode polls orderBook unless the order stream already delivers orders"""
+        return self.mirror_on_placement and not self._stream_connected(account_id)
+
+    def _poll_source(self, account_id):
+        # orderBook first, so fills of orders mirrored ahead reconcile against them
+        new_trades = self._poll_order_book(account_id) if self._order_book_due(account_id) else []
+        if self._poll_due(account_id):
+            new_trades += self._poll_trade_book(account_id)
+        return new_trades
+
+    def _get_poll_pool(self):
+        if self._poll_pool is None:
+            self._poll_pool = ThreadPoolExecutor(
+                max_workers=max(1, min(self.poll_workers, len(self.source_accounts))),
+                thread_name_prefix='source_poll'
+            )
+        return self._poll_pool
+
     def detect_new_trades(self):
         """
-        Detect new trades from source account
+        Detect new trades from all source accounts
+        Returns: list of new trades merged in fill-time order, tagged with source_id
+        """
+        # New trading day: fill times restart, so does every dedupe partition
+        if self.processed_trades.roll():
+            self._reset_cursors()
+            with self._lock:
+                self._order_fills.clear()
+
+        new_trades = self._drain_pushed_trades()
+        if new_trades:
+            self.logger.info(f"Received {len(new_trades)} new trades from order stream")
+
+        due = [acc for acc in self.source_accounts if self._poll_due(acc) or self._order_book_due(acc)]
+        if len(due) == 1:
+            new_trades += self._poll_source(due[0])
+        elif due:
+            # Poll all tradebooks at once so latency doesn't grow with sources
+            for trades in self._get_poll_pool().map(self._poll_source, due):
+                new_trades += trades
+        else:
+            self.last_check_time = datetime.now()
+
+        new_trades.sort(key=lambda t: t.get('trade_time') or '')
+        return new_trades
+
+    def _poll_trade_book(self, account_id=PRIMARY_SOURCE):
+        """
+        Detect new trades by polling one source account's tradebook
         Returns: list of new trades
         """
         try:
-            self.logger.info("Checking for new trades...")
-            trade_data = self.fetch_trade_book()
+            self.logger.info(f"Checking for new trades ({account_id})...")
+            self._last_poll_times[account_id] = time.monotonic()
+            trade_data = self.fetch_trade_book(account_id)
             
             # Better error handling for None response
             if trade_data is None:
@@ -164,64 +627,147 @@ class TradeDetector:
             if len(trades) == 0:
                 self.logger.info("Trade book is empty (no trades yet)")
                 return []
+
+            # Same book as last poll - nothing new to walk or parse
+            fingerprint = self.book_fingerprint(trades)
+            unchanged = fingerprint == self._book_fingerprints.get(account_id)
+            # sources are polled from pool threads - the counters share the detector lock
+            with self._lock:
+                if unchanged:
+                    self.fingerprint_hits += 1
+                else:
+                    self.fingerprint_misses += 1
+            if unchanged:
+                self.last_check_time = datetime.now()
+                self.logger.debug(f"Trade book unchanged ({account_id})")
+                return []
                 
             new_trades = []
-            
-            for trade in trades:
-                parsed_trade = self.parse_trade(trade)
+
+            # Column-wise filtering: cursor, NIFTY options, unseen keys. Only
+            # the surviving rows are parsed into trade dicts
+            batch = TradeBookBatch(trades)
+            cursor_time, cursor_keys = self._cursors.get(account_id, (None, set()))
+            ahead = batch.ahead_of(cursor_time, cursor_keys)
+            candidates, settled = [], []
+            for i in batch.nifty_options(ahead):
+                if self.is_new_trade(self.namespaced_key(account_id, batch.keys[i])):
+                    candidates.append(i)
+                else:
+                    settled.append(i)
+
+            for i in candidates:
+                parsed_trade = self.parse_trade(trades[i])
                 if not parsed_trade:
                     continue
+
+                parsed_trade['trade_key'] = self.namespaced_key(account_id, parsed_trade['trade_key'])
+                parsed_trade['source_id'] = account_id
+
+                # Reconcile against quantity already received from the order
+                # stream or mirrored ahead on placement
+                if ((account_id in self.order_streams or self.mirror_on_placement) and
+                        parsed_trade['order_id'] and
+                        self.is_nifty_option(parsed_trade['symbol']) and
+                        self.is_new_trade(parsed_trade['trade_key'])):
+                    remaining = self._claim_order_fill(
+                        self.namespaced_key(account_id, parsed_trade['order_id']),
+                        polled_qty=int(parsed_trade['quantity']))
+                    if remaining <= 0:
+                        self._mark_processed(parsed_trade['trade_key'])
+                        settled.append(i)
+                        self.logger.debug(f"Fill {parsed_trade['trade_key']} already seen on order stream")
+                        continue
+                    if remaining < int(parsed_trade['quantity']):
+                        parsed_trade['quantity'] = remaining
                 
                 # Check if it's a NIFTY option and new trade
-                if (self.is_nifty_option(parsed_trade['symbol']) and 
-                    self.is_new_trade(parsed_trade['trade_key'])):
-                    
-                    # Mark as processed (in-memory + persistent)
-                    self.processed_trades.add(parsed_trade['trade_key'])
-                    self._persist_trade_key(parsed_trade['trade_key'])
+                if self._accept_trade(parsed_trade):
                     new_trades.append(parsed_trade)
-                    
-                    self.logger.info(f"NEW TRADE DETECTED: {parsed_trade['symbol']} "
-                                   f"Qty: {parsed_trade['quantity']} "
-                                   f"Price: {parsed_trade['order_price']}")
-            
+                    settled.append(i)
+
+            # The high-water mark only moves over rows that were accepted (or
+            # processed before), so a row that failed mid-poll is seen again
+            cursor_time, cursor_keys, cursor_moved = batch.advance_cursor(settled, cursor_time, cursor_keys)
+            self._cursors[account_id] = (cursor_time, cursor_keys)
+            if set(candidates) <= set(settled):
+                self._book_fingerprints[account_id] = fingerprint
+            else:
+                # an unsettled row must be walked again even if the book does not change
+                self._book_fingerprints.pop(account_id, None)
+            if cursor_moved:
+                self._persist_cursor(account_id)
+            # One transaction per poll cycle
+            self._writer.flush(wait=False)
+
             self.last_check_time = datetime.now()
             
             if new_trades:
-                self.logger.info(f"Found {len(new_trades)} new trades")
+                self.logger.info(f"Found {len(new_trades)} new trades ({account_id})")
             else:
-                self.logger.info("No new trades found")
+                self.logger.info(f"No new trades found ({account_id})")
                 
             return new_trades
             
         except Exception as e:
-            self.logger.error(f"Error detecting trades: {e}")
+            self.logger.error(f"Error detecting trades ({account_id}): {e}")
             return []
     
     def get_detection_stats(self):
         """Get statistics about trade detection"""
         return {
             'total_processed_trades': len(self.processed_trades),
+            'session_date': self.processed_trades.session_date,
+            'lookback_keys': len(self.processed_trades.lookback),
             'last_check_time': self.last_check_time,
-            'source_account_connected': bool(self.get_source_connection())
+            'cursor_fill_time': self._cursors.get(self.PRIMARY_SOURCE, (None,))[0],
+            'source_cursors': {acc: cursor[0] for acc, cursor in self._cursors.items()},
+            'pushed_trades': self.pushed_trade_count,
+            'fingerprint_hits': self.fingerprint_hits,
+            'fingerprint_misses': self.fingerprint_misses,
+            'placement_mirrors': self.placement_mirror_count,
+            'placement_corrections': self.placement_correction_count,
+            'order_stream': {acc: s.get_stats() for acc, s in self.order_streams.items()} or None,
+            'persistence': self._writer.get_stats(),
+            'source_account_connected': bool(self.get_source_connection()),
+            'source_connections': {acc: bool(self.get_source_connection(acc)) for acc in self.source_accounts}
         }
     
     def clear_processed_trades(self):
         """Clear processed trades history (for testing)"""
         try:
+            self._writer.flush()
             cur = self._conn.cursor()
             cur.execute("DELETE FROM processed_trades")
+            cur.execute("DELETE FROM detector_cursor")
+            cur.execute("DELETE FROM order_fill_progress")
             self._conn.commit()
             self.processed_trades.clear()
+            self._reset_cursors()
+            self._order_fills.clear()
             self.logger.info("Cleared processed trades history (persistent DB cleared)")
         except Exception as e:
             self.logger.error(f"Failed to clear processed trades DB: {e}")
             # fallback to in-memory clear
             self.processed_trades.clear()
+            self._reset_cursors()
             self.logger.info("Cleared processed trades history (in-memory)")
 
+    def flush(self):
+        """Wait until all queued key/cursor writes are on disk"""
+        return self._writer.flush()
+
+    def close(self):
+        """Flush pending writes and release the DB (shutdown)"""
+        self.stop_order_stream()
+        if self._poll_pool:
+            self._poll_pool.shutdown(wait=False)
+        self._writer.close()
+
     def __del__(self):
         try:
+            if hasattr(self, '_writer'):
+                self._writer.close()
             if hasattr(self, '_conn') and self._conn:
                 self._conn.close()
         except Exception:
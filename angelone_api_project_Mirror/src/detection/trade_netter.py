@@ -0,0 +1,96 @@
+import logging
+
+
+class TradeNetter:
+    """
+    Collapses opposing trades on the same symbol (and product type) within
+    one detection batch into a single trade for the net quantity, or drops
+    them when they net to zero, so a source scalp between two polls does not
+    cost two mirror orders.
+
+    Same-side-only groups pass through unchanged.
+    """
+
+    def __init__(self, settings):
+        self.logger = logging.getLogger('trade_netter')
+        self.enabled = settings.get('net_opposing_fills', True)
+        self.groups_netted = 0
+        self.groups_flat = 0
+        self.trades_removed = 0
+
+    def net(self, trades):
+        """
+        Net a batch of trades
+        Returns: (trades to mirror, trade_keys netted away to nothing)
+        """
+        if not self.enabled or len(trades) < 2:
+            return trades, []
+
+        groups = {}
+        for trade in trades:
+            groups.setdefault((trade.get('symbol'), trade.get('product_type', '')), []).append(trade)
+
+        netted, dropped_keys = [], []
+        for (symbol, _), group in groups.items():
+            sides = {str(t.get('order_type', '')).upper() for t in group}
+            if len(group) == 1 or not {'BUY', 'SELL'} <= sides:
+                netted += group
+                continue
+
+            net_trade = self.net_group(group)
+            keys = [k for t in group for k in self._keys(t)]
+            self.trades_removed += len(group) - (1 if net_trade else 0)
+            if net_trade is None:
+                self.groups_flat += 1
+                dropped_keys += keys
+                self.logger.info(f"NETTED OUT {symbol}: {self._describe(group)} is flat - "
+                                 f"skipping {len(group)} trades ({', '.join(keys)})")
+                continue
+
+            self.groups_netted += 1
+            netted.append(net_trade)
+            self.logger.info(f"NETTED {symbol}: {self._describe(group)} -> "
+                             f"{net_trade['order_type']} {net_trade['quantity']} ({', '.join(keys)})")
+
+        netted.sort(key=lambda t: t.get('trade_time') or '')
+        return netted, dropped_keys
+
+    @staticmethod
+    def _keys(trade):
+        return trade.get('fill_keys') or [trade['trade_key']]
+
+    @staticmethod
+    def _describe(group):
+        return ' '.join(f"{t['order_type']} {t['quantity']}" for t in group)
+
+    def net_group(self, group):
+        """Net opposing trades of one symbol; None when they cancel out"""
+        signed = [(t, int(t['quantity']) * (1 if str(t['order_type']).upper() == 'BUY' else -1)) for t in group]
+        net_qty = sum(q for _, q in signed)
+        if net_qty == 0:
+            return None
+
+        side = 'BUY' if net_qty > 0 else 'SELL'
+        dominant = [t for t, q in signed if (q > 0) == (net_qty > 0)]
+        dominant_qty = sum(int(t['quantity']) for t in dominant)
+        vwap = sum(float(t['order_price']) * int(t['quantity']) for t in dominant) / dominant_qty
+
+        trade = dict(dominant[0])
+        trade.update({
+            'quantity': abs(net_qty),
+            'order_type': side,
+            'order_price': round(vwap, 2),
+            'trade_price': round(vwap, 2),
+            'trade_time': max(t.get('trade_time') or '' for t in group),
+            'netted_keys': [k for t in group for k in self._keys(t)]
+        })
+        return trade
+
+    def get_stats(self):
+        """Get netting statistics"""
+        return {
+            'enabled': self.enabled,
+            'groups_netted': self.groups_netted,
+            'groups_flat': self.groups_flat,
+            'trades_removed': self.trades_removed
+        }
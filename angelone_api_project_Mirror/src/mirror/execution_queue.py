@@ -0,0 +1,132 @@
+import logging
+import queue
+import threading
+import time
+import zlib
+
+
+class ExecutionQueue:
+    """
+    Runs mirror orders off the detection thread.
+
+    Detection hands over batches with submit_batch() and returns at once. A
+    dispatcher thread runs the optional `prepare` hook on each batch (e.g. a
+    bulk quote refresh) and shards trades by symbol onto `execution_workers`
+    worker threads, so trades of one symbol are executed in detection order
+    while different symbols proceed in parallel.
+    """
+
+    _STOP = object()
+
+    def __init__(self, handler, settings, prepare=None, clock=time.monotonic):
+        self.handler = handler
+        self.prepare = prepare
+        self.workers = max(1, settings.get('execution_workers', 4))
+        self.logger = logging.getLogger('execution_queue')
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._inbound = queue.Queue()
+        self._shards = [queue.Queue() for _ in range(self.workers)]
+        self._threads = []
+        self.running = False
+
+        self.in_flight = 0
+        self.executed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_service = 0.0
+        self.max_service = 0.0
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._threads = [threading.Thread(target=self._dispatch, name='execution_dispatcher', daemon=True)]
+        self._threads += [threading.Thread(target=self._work, args=(shard,), name=f'execution_worker_{i}',
+                                           daemon=True)
+                          for i, shard in enumerate(self._shards)]
+        for thread in self._threads:
+            thread.start()
+        self.logger.info(f"Execution queue started with {self.workers} workers")
+
+    def stop(self, timeout=30):
+        """Finish queued trades, then stop the threads"""
+        if not self.running:
+            return
+        self._inbound.put(self._STOP)
+        deadline = self._clock() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - self._clock()))
+        self.running = False
+        self.logger.info(f"Execution queue stopped ({self.depth()} trades left unexecuted)")
+
+    def submit_batch(self, trades):
+        """Queue a batch of trades for execution (never blocks)"""
+        if trades:
+            self._inbound.put((list(trades), self._clock()))
+
+    def _shard_for(self, trade):
+        return self._shards[zlib.crc32(str(trade.get('symbol', '')).encode()) % self.workers]
+
+    def _dispatch(self):
+        while True:
+            item = self._inbound.get()
+            if item is self._STOP:
+                for shard in self._shards:
+                    shard.put(self._STOP)
+                return
+            trades, enqueued_at = item
+            if self.prepare:
+                try:
+                    self.prepare(trades)
+                except Exception as e:
+                    self.logger.warning(f"Batch preparation failed: {e}")
+            for trade in trades:
+                self._shard_for(trade).put((trade, enqueued_at))
+
+    def _work(self, shard):
+        while True:
+            item = shard.get()
+            if item is self._STOP:
+                return
+            trade, enqueued_at = item
+            started = self._clock()
+            with self._lock:
+                self.in_flight += 1
+            ok = True
+            try:
+                self.handler(trade)
+            except Exception as e:
+                ok = False
+                self.logger.exception(f"Mirror execution failed for {trade.get('symbol')}: {e}")
+            finished = self._clock()
+            with self._lock:
+                self.in_flight -= 1
+                self.executed += 1
+                self.failed += 0 if ok else 1
+                wait, service = started - enqueued_at, finished - started
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+                self.total_service += service
+                self.max_service = max(self.max_service, service)
+
+    def depth(self):
+        """Trades queued or executing (an undispatched batch counts once)"""
+        queued = sum(shard.qsize() for shard in self._shards)
+        batches = self._inbound.qsize()
+        return queued + batches + self.in_flight
+
+    def get_stats(self):
+        """Get queue statistics (times in ms)"""
+        executed = self.executed or 1
+        return {
+            'depth': self.depth(),
+            'in_flight': self.in_flight,
+            'executed': self.executed,
+            'failed': self.failed,
+            'avg_wait_ms': round(self.total_wait / executed * 1000, 1),
+            'max_wait_ms': round(self.max_wait * 1000, 1),
+            'avg_service_ms': round(self.total_service / executed * 1000, 1),
+            'max_service_ms': round(self.max_service * 1000, 1)
+        }
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime
+
+
+class IntentJournal:
+    """
+    Append-only journal of mirror orders in flight.
+
+    An "intent" record is made durable before placeOrder and an "ack"
+    (order id) or "done" record follows the broker's answer. Intents with
+    neither are what a crash left in flight; they are resolved against the
+    order book on the next start via their order tag. Acks are kept for the
+    rest of their trading day, so a restart still knows which trades were
+    mirrored even if their mirrored_trades row never reached disk.
+
+    Writes use group commit: concurrent callers share one write + fsync, so
+    parallel workers pay for a single disk sync between them.
+    """
+
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self.logger = logging.getLogger('intent_journal')
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._acked = {}  # intent_id -> ack record (with its trading day)
+        self._open = self._replay()
+        self._file = open(path, 'a', encoding='utf-8')
+        self._cond = threading.Condition()
+        self._buffer = []
+        self._seq = 0
+        self._durable = 0
+        self._flushing = False
+
+        self.records = 0
+        self.commits = 0
+        self.commit_seconds = 0.0
+
+    @staticmethod
+    def order_tag(intent_id):
+        """Short deterministic tag sent as the order's ordertag"""
+        return 'MR' + hashlib.sha1(intent_id.encode()).hexdigest()[:16]
+
+    def _replay(self):
+        """intent_id -> intent record for intents without an ack/done record"""
+        open_intents = {}
+        if not os.path.exists(self.path):
+            return open_intents
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # a torn last line from a crash mid-write
+                    continue
+                if record.get('op') == 'intent':
+                    open_intents[record['id']] = record
+                elif record.get('op') == 'ack':
+                    intent = open_intents.pop(record['id'], None) or {}
+                    self._acked[record['id']] = dict(
+                        record, acc=record.get('acc') or intent.get('acc'),
+                        day=record.get('day') or self._day(intent.get('t')))
+                else:
+                    open_intents.pop(record.get('id'), None)
+                    self._acked.pop(record.get('id'), None)
+        if open_intents:
+            self.logger.warning(f"{len(open_intents)} mirror order intents were in flight at last shutdown")
+        return open_intents
+
+    @staticmethod
+    def _day(timestamp=None):
+        return (datetime.fromtimestamp(timestamp).date() if timestamp else date.today()).isoformat()
+
+    def _append(self, record):
+        """Write a record and return once it is on disk"""
+        line = json.dumps(record, separators=(',', ':'), default=str) + '\n'
+        with self._cond:
+            self._buffer.append(line)
+            self._seq += 1
+            seq = self._seq
+            while self._durable < seq:
+                if self._flushing:
+                    self._cond.wait()
+                    continue
+                # Become the leader: write everything buffered so far in one go
+                self._flushing = True
+                lines, upto = self._buffer, self._seq
+                self._buffer = []
+                self._cond.release()
+                started = time.perf_counter()
+                try:
+                    self._file.write(''.join(lines))
+                    self._file.flush()
+                    if self.fsync:
+                        os.fsync(self._file.fileno())
+                except Exception:
+                    self._cond.acquire()
+                    self._buffer[:0] = lines
+                    self._flushing = False
+                    self._cond.notify_all()
+                    raise
+                self._cond.acquire()
+                self._flushing = False
+                self._durable = upto
+                self.records += len(lines)
+                self.commits += 1
+                self.commit_seconds += time.perf_counter() - started
+                self._cond.notify_all()
+
+    def intent(self, intent_id, account_id, trade):
+        """Record an order about to be placed; returns its order tag"""
+        tag = self.order_tag(intent_id)
+        record = {'op': 'intent', 'id': intent_id, 'acc': account_id, 'tag': tag,
+                  'trade': trade, 't': time.time()}
+        self._append(record)
+        with self._cond:
+            self._open[intent_id] = record
+        return tag
+
+    def ack(self, intent_id, order_id):
+        """The broker accepted the order"""
+        self.resolve(intent_id, 'ack', order_id)
+
+    def resolve(self, intent_id, outcome, order_id=None):
+        """Close an intent: 'ack', or why no order exists ('failed', 'expired', 'lost')"""
+        with self._cond:
+            account_id = (self._open.get(intent_id) or {}).get('acc')
+        record = {'op': 'ack' if outcome == 'ack' else 'done', 'id': intent_id,
+                  'outcome': outcome, 'order_id': order_id}
+        if outcome == 'ack':
+            record.update(acc=account_id, day=self._day())
+        self._append(record)
+        with self._cond:
+            self._open.pop(intent_id, None)
+            if outcome == 'ack':
+                self._acked[intent_id] = record
+            else:
+                self._acked.pop(intent_id, None)
+
+    def pending(self):
+        """Intents without an outcome (left in flight by a crash)"""
+        with self._cond:
+            return list(self._open.values())
+
+    def acked(self, day=None):
+        """Ack records of `day` (default today): orders known to be at the broker"""
+        day = day or self._day()
+        with self._cond:
+            return [record for record in self._acked.values() if record.get('day') == day]
+
+    def compact(self, day=None):
+        """Rewrite the journal keeping open intents and the acks of `day` (default today)"""
+        day = day or self._day()
+        with self._cond:
+            while self._flushing:
+                self._cond.wait()
+            self._acked = {k: r for k, r in self._acked.items() if r.get('day') == day}
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for record in list(self._open.values()) + list(self._acked.values()):
+                    f.write(json.dumps(record, separators=(',', ':'), default=str) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(tmp_path, self.path)
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        with self._cond:
+            self._file.close()
+
+    def get_stats(self):
+        """Get journal statistics (commit time in microseconds)"""
+        commits = self.commits or 1
+        return {
+            'open_intents': len(self._open),
+            'acked_intents': len(self._acked),
+            'records': self.records,
+            'group_commits': self.commits,
+            'avg_commit_us': round(self.commit_seconds / commits * 1e6, 1),
+            'avg_records_per_commit': round(self.records / commits, 2)
+        }
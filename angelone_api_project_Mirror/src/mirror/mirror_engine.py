@@ -1,19 +1,51 @@
 import logging
+import math
 import time
 import threading
 import sqlite3
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from datetime import datetime
 
+from src.mirror.intent_journal import IntentJournal
+from src.mirror.order_reconciler import OrderReconciler
+from src.mirror.quote_cache import QuoteCache
+from src.mirror.trade_deadline import TradeDeadline
+from src.utils.retry_policy import PERMANENT, classify, policy_for
+from src.utils.write_behind import WriteBehindQueue
+from src.utils.key_store import DayPartitionedKeyStore
+from src.utils.symbol_parser import underlying_of
+
 class MirrorEngine:
-    def __init__(self, config_manager, auth_manager, safety_manager):
+    # The original single mirror account; its mirrored_trades keys stay un-prefixed
+    PRIMARY_MIRROR = 'mirror_account'
+
+    def __init__(self, config_manager, auth_manager, safety_manager, instruments=None, now_func=datetime.now,
+                 db_path=None):
         self.config = config_manager
+        self._now = now_func
         self.auth = auth_manager
         self.safety = safety_manager
+        # Local scrip master index; search_scrip is only the fallback
+        self.instruments = instruments
+        # Bulk-refreshed LTPs for price checks; symbol -> (exchange, net qty) mirrored today
+        self.quotes = QuoteCache(auth_manager, config_manager.get_settings())
+        self.positions = {}
+
+        # Mirror accounts: every trade is fanned out to all of them concurrently
+        get_ids = getattr(config_manager, 'get_mirror_account_ids', None)
+        mirror_ids = get_ids() if get_ids else None
+        self.mirror_accounts = list(mirror_ids) if isinstance(mirror_ids, (list, tuple)) else [self.PRIMARY_MIRROR]
+        self.lot_multipliers = {}
+        for account_id in self.mirror_accounts:
+            account = config_manager.get_account(account_id) if hasattr(config_manager, 'get_account') else None
+            multiplier = (account or {}).get('lot_multiplier', 1) if isinstance(account, dict) else 1
+            self.lot_multipliers[account_id] = int(multiplier or 1)
+        self.account_stats = {}
+        self._fanout_pool = None
         self.logger = logging.getLogger('mirror_engine')
         self.mirroring_enabled = False
-        self.mirrored_trades = set()
         # simple in-memory lock to prevent double execution races
         self._lock = threading.Lock()
         
@@ -22,8 +54,29 @@ class MirrorEngine:
         self.price_tolerance = settings.get('price_tolerance', 0.01)  # 1% default
         self.max_retries = settings.get('max_retries', 3)
         self.retry_delay = settings.get('retry_delay', 2)
-        # DB for persistence (use processed_trades DB by default)
-        db_path = settings.get('processed_trades_db', 'data/processed_trades.db')
+        # classification, jittered backoff and circuit breakers for broker calls
+        self.retry = policy_for(auth_manager, settings)
+        # A mirror landing this long after the source fill is abandoned (None/0 disables)
+        # Default outlasts the slowest poll (check_interval) so backed-off detections still go out
+        self.deadline_seconds = settings.get('mirror_deadline_seconds', 15.0)
+        if self.deadline_seconds and self.deadline_seconds < settings.get('check_interval', 10):
+            self.logger.warning(f"mirror_deadline_seconds ({self.deadline_seconds}s) is shorter than "
+                                f"check_interval - trades found after a poll backoff will expire")
+        self.deadline_aborts = {}  # stage -> count
+        self.last_deadline_abort = None
+        # 'market', or 'limit_chase': LIMIT at source price +/- tolerance, stepped
+        # toward the market every chase_interval_ms, MARKET after chase_steps
+        self.order_mode = settings.get('order_mode', 'market')
+        self.chase_interval = settings.get('chase_interval_ms', 1000) / 1000.0
+        self.chase_steps = settings.get('chase_steps', 3)
+        self.chase_conversions = 0
+        # running chases, stepped on timer threads: (account_id, order_id) -> chase state
+        self._chases = {}
+        self._chase_done = threading.Condition()
+        self._closed = False
+        # DB for persistence (use processed_trades DB by default; a dry run keeps its own)
+        journal_path = None if db_path else settings.get('intent_journal_path')
+        db_path = db_path or settings.get('processed_trades_db', 'data/processed_trades.db')
         db_dir = os.path.dirname(db_path) or '.'
         try:
             os.makedirs(db_dir, exist_ok=True)
@@ -31,13 +84,32 @@ class MirrorEngine:
             pass
         self._db_path = db_path
         self._db_conn = None
+        self._writer = None
         try:
             self._db_conn = sqlite3.connect(self._db_path, check_same_thread=False)
             self._ensure_table()
-            # load existing mirrored trades into memory
-            self.mirrored_trades.update(self._load_persisted_mirrors())
+            # batched background commits - the order path never waits on disk
+            self._writer = WriteBehindQueue(
+                self._db_path,
+                flush_interval_ms=settings.get('persist_flush_interval_ms', 50),
+                name='mirror_engine_writer'
+            )
         except Exception as e:
             self.logger.warning(f"Could not open DB for mirrored trades persistence: {e}")
+        # load this session's mirrored trades into memory
+        self.mirrored_trades = self._load_persisted_mirrors()
+        # accepted mirror orders are followed to fill/rejection via batched orderBook polls
+        self.reconciler = OrderReconciler(auth_manager, settings, writer=self._writer, on_fill=self._on_fill)
+        self._restore_pending_orders()
+        # intent/ack journal: a crash between placeOrder and persistence is resolved on restart
+        self.journal = None
+        try:
+            self.journal = IntentJournal(
+                journal_path or os.path.join(db_dir, 'intent_journal.log'),
+                fsync=settings.get('intent_journal_fsync', True))
+        except Exception as e:
+            self.logger.warning(f"Could not open intent journal: {e}")
+        self._seed_acked_intents()
 
         # simple in-memory lock to prevent double execution races
         self._lock = threading.Lock()
@@ -67,7 +139,7 @@ class MirrorEngine:
             self.logger.error("Price tolerance check failed")
             return False
 
-    def get_current_market_price(self, symbol, token=None):
+    def get_current_market_price(self, symbol, token=None, deadline=None):
         """
         Get current LTP for the symbol using Angel One API
         Args:
@@ -85,30 +157,30 @@ class MirrorEngine:
 
             # Get token if not provided
             if not token:
-                token = self.get_symbol_token(symbol)
+                token = self.get_symbol_token(symbol, deadline=deadline)
                 if not token:
                     self.logger.error(f"Could not get token for {symbol}")
                     return None
 
+            # Fresh bulk-fetched quote if we have one
+            cached = self.quotes.get(token)
+            if cached is not None:
+                return cached
+
+            if deadline and deadline.expired():
+                return None
             # Call LTP API with retry
-            for attempt in range(self.max_retries):
-                try:
-                    ltp_response = connection.ltpData(
-                        exchange='NFO',  # Options are on NFO
-                        tradingsymbol=symbol,
-                        symboltoken=token
-                    )
-                    if ltp_response and ltp_response.get('status'):
-                        return float(ltp_response['data']['ltp'])
-                    else:
-                        error = ltp_response.get('message', 'Unknown error')
-                        self.logger.warning(f"LTP attempt {attempt + 1} failed: {error}")
-                        if attempt < self.max_retries - 1:
-                            time.sleep(self.retry_delay)
-                except Exception as e:
-                    self.logger.warning(f"LTP API error (attempt {attempt + 1}): {e}")
-                    if attempt < self.max_retries - 1:
-                        time.sleep(self.retry_delay)
+            ltp_response = self.retry.call(
+                'ltpData', connection.ltpData, account_id=self.PRIMARY_MIRROR, attempts=self.max_retries,
+                deadline=deadline,
+                exchange='NFO',  # Options are on NFO
+                tradingsymbol=symbol,
+                symboltoken=token
+            )
+            if ltp_response and ltp_response.get('status'):
+                ltp = float(ltp_response['data']['ltp'])
+                self.quotes.put(token, ltp)
+                return ltp
 
             self.logger.error(f"All LTP attempts failed for {symbol}")
             return None
@@ -117,7 +189,52 @@ class MirrorEngine:
             self.logger.error(f"Error getting market price: {e}")
             return None
     
-    def place_angel_one_order(self, connection, trade):
+    def prefetch_quotes(self, trades):
+        """
+        Refresh quotes for a detection batch plus every open mirror position
+        in bulk, so per-trade price checks are served from the cache
+        """
+        if self.instruments is None:
+            return 0
+        wanted = {t['symbol']: t.get('exchange') or 'NFO' for t in trades}
+        wanted.update({symbol: pos[0] for symbol, pos in self.positions.items()})
+        tokens_by_exchange = {}
+        for symbol, exchange in wanted.items():
+            token = self.instruments.token_for(symbol)
+            if token:
+                tokens_by_exchange.setdefault(exchange, []).append(token)
+        return self.quotes.refresh(tokens_by_exchange) if tokens_by_exchange else 0
+
+    def _record_position(self, trade):
+        side = 1 if str(trade.get('order_type', '')).upper() == 'BUY' else -1
+        symbol = trade['symbol']
+        qty = self.positions.get(symbol, (None, 0))[1] + side * int(trade['quantity'])
+        if qty:
+            self.positions[symbol] = (trade.get('exchange') or 'NFO', qty)
+        else:
+            self.positions.pop(symbol, None)
+
+    def _deadline_for(self, trade):
+        """
+        Latency budget for a trade; None for placement corrections, which fix
+        exposure and must go out however late. Intents re-queued after a crash
+        keep their fill-time budget, so a long restart expires them.
+        """
+        if trade.get('status') == 'correction':
+            return None
+        return TradeDeadline(self.deadline_seconds, trade.get('trade_time'), now=self._now())
+
+    def _check_deadline(self, deadline, stage, trade):
+        """Abort reason once the trade's deadline has passed (recorded in stats), else None"""
+        reason = deadline.check(stage) if deadline else None
+        if reason:
+            with self._lock:
+                self.deadline_aborts[stage] = self.deadline_aborts.get(stage, 0) + 1
+                self.last_deadline_abort = f"{trade.get('trade_key')}: {reason}"
+            self.logger.warning(f"ABANDONED {trade.get('symbol')}: {reason}")
+        return reason
+
+    def place_angel_one_order(self, connection, trade, deadline=None, order_tag=None):
         """
         Place actual order using Angel One API
         Args:
@@ -125,10 +242,15 @@ class MirrorEngine:
             trade: Normalized trade dict with symbol, quantity, etc.
         Returns:
             dict: Angel One order response with status and orderid
+                  ('expired': True when the deadline passed before placement)
         """
         try:
+            reason = self._check_deadline(deadline, 'token lookup', trade)
+            if reason:
+                return {'status': False, 'message': reason, 'expired': True}
+
             # Get token once and reuse (if available)
-            symbol_token = self.get_symbol_token(trade['symbol'])
+            symbol_token = self.get_symbol_token(trade['symbol'], deadline=deadline)
             if not symbol_token:
                 # proceed without token (some clients accept tradingsymbol only)
                 self.logger.warning(f"Could not get token for {trade['symbol']}, proceeding without symboltoken")
@@ -140,14 +262,23 @@ class MirrorEngine:
                 **({'symboltoken': symbol_token} if symbol_token else {}),
                 'transactiontype': trade['order_type'],  # BUY/SELL
                 'exchange': trade.get('exchange', 'NFO'),  # Default NFO for options
-                'ordertype': 'MARKET',  # Always MARKET for mirroring
+                'ordertype': 'MARKET',
                 'producttype': trade.get('product_type', 'INTRADAY'),  # Default INTRADAY
                 'duration': 'DAY',
                 'quantity': str(trade['quantity']),  # API expects string
+                # lets crash recovery find the order in the order book
+                **({'ordertag': order_tag} if order_tag else {}),
             }
+            limit_price = self.limit_price(trade) if self.order_mode == 'limit_chase' else None
+            if limit_price:
+                order_params.update({'ordertype': 'LIMIT', 'price': str(limit_price)})
             
+            reason = self._check_deadline(deadline, 'quote', trade)
+            if reason:
+                return {'status': False, 'message': reason, 'expired': True}
+
             # Optional price validation
-            current_price = self.get_current_market_price(trade['symbol'], token=symbol_token)
+            current_price = self.get_current_market_price(trade['symbol'], token=symbol_token, deadline=deadline)
             if current_price and not self.is_within_price_tolerance(trade['order_price'], current_price):
                 self.logger.warning(
                     f"Price deviation: Source={trade['order_price']:.2f}, "
@@ -155,13 +286,24 @@ class MirrorEngine:
                 )
                 # Continue with order - logging is sufficient since using MARKET orders
             
+            reason = self._check_deadline(deadline, 'placement', trade)
+            if reason:
+                return {'status': False, 'message': reason, 'expired': True}
+
             # Place order with connection
             self.logger.info(
                 f"Placing order: {order_params['transactiontype']} {trade['symbol']} x"
                 f"{order_params['quantity']} ({order_params['producttype']})"
             )
-            order_response = connection.placeOrder(order_params)
-            
+            try:
+                order_response = connection.placeOrder(order_params)
+            except Exception as e:
+                # timeouts and dropped connections leave the order's fate unknown
+                self.logger.error(f"Order placement error: {e}")
+                return {'status': False, 'message': str(e), 'ambiguous': True}
+            if not order_response:
+                return {'status': False, 'message': 'No response to placeOrder', 'ambiguous': True}
+
             if order_response.get('status'):
                 self.logger.info(
                     f"Order placed successfully: ID {order_response['data']['orderid']}"
@@ -172,61 +314,54 @@ class MirrorEngine:
             self.logger.error(f"Order placement error: {e}")
             return {'status': False, 'message': str(e)}
     
-    def get_symbol_token(self, symbol):
+    def get_symbol_token(self, symbol, deadline=None):
         """
         Get symbol token using Angel One search_scrip API
         Works for both NIFTY and BANKNIFTY options
         """
+        if self.instruments is not None:
+            try:
+                token = self.instruments.token_for(symbol)
+                if token:
+                    return token
+            except Exception as e:
+                self.logger.warning(f"Instrument index lookup failed for {symbol}: {e}")
+
         try:
             connection = self.auth.get_connection('mirror_account')
             if not connection:
                 self.logger.error("No connection for symbol lookup")
                 return None
 
-            # ✅ IMPROVED: Extract base symbol for search
-            if 'BANKNIFTY' in symbol:
-                search_term = 'BANKNIFTY'
-            elif 'NIFTY' in symbol:
-                search_term = 'NIFTY'
-            elif 'FINNIFTY' in symbol:
-                search_term = 'FINNIFTY'
-            else:
-                search_term = symbol  # Fallback to full symbol
+            # Search by underlying (fallback to full symbol)
+            search_term = underlying_of(symbol) or symbol
             
             self.logger.info(f"Searching for symbol: {symbol} using term: {search_term}")
             
+            if deadline and deadline.expired():
+                return None
             # Search with retry
-            for attempt in range(self.max_retries):
-                try:
-                    # ✅ FIXED: search_scrip (with underscore)
-                    search_response = connection.search_scrip(
-                        exchange='NFO',
-                        searchscrip=search_term
-                    )
-                    
-                    if search_response and search_response.get('status'):
-                        # Find exact symbol match in the results
-                        for item in search_response.get('data', []):
-                            if item.get('symbol') == symbol:
-                                token = item['token']
-                                self.logger.info(f"Found token {token} for {symbol}")
-                                return token
-                        
-                        # If exact match not found, log available symbols for debugging
-                        available_symbols = [item.get('symbol', '') for item in search_response.get('data', [])]
-                        self.logger.warning(f"Symbol {symbol} not found in search results. Available: {available_symbols[:5]}...")  # Show first 5
-                        return None
-                    else:
-                        error = search_response.get('message', 'Unknown error')
-                        self.logger.warning(f"Search attempt {attempt + 1} failed: {error}")
-                        if attempt < self.max_retries - 1:
-                            time.sleep(self.retry_delay)
-                            
-                except Exception as e:
-                    self.logger.warning(f"Search API error (attempt {attempt + 1}): {e}")
-                    if attempt < self.max_retries - 1:
-                        time.sleep(self.retry_delay)
-            
+            # ✅ FIXED: search_scrip (with underscore)
+            search_response = self.retry.call(
+                'search_scrip', connection.search_scrip, account_id=self.PRIMARY_MIRROR,
+                attempts=self.max_retries, deadline=deadline,
+                exchange='NFO',
+                searchscrip=search_term
+            )
+
+            if search_response and search_response.get('status'):
+                # Find exact symbol match in the results
+                for item in search_response.get('data', []):
+                    if item.get('symbol') == symbol:
+                        token = item['token']
+                        self.logger.info(f"Found token {token} for {symbol}")
+                        return token
+
+                # If exact match not found, log available symbols for debugging
+                available_symbols = [item.get('symbol', '') for item in search_response.get('data', [])]
+                self.logger.warning(f"Symbol {symbol} not found in search results. Available: {available_symbols[:5]}...")  # Show first 5
+                return None
+
             self.logger.error(f"All search attempts failed for {symbol}")
             return None
             
@@ -234,10 +369,20 @@ class MirrorEngine:
             self.logger.error(f"Error getting symbol token: {e}")
             return None
     
+    def account_key(self, account_id, trade_key):
+        """Per-account dedupe key (the primary mirror account keeps bare keys)"""
+        return trade_key if account_id == self.PRIMARY_MIRROR else f"{account_id}:{trade_key}"
+
+    def _get_fanout_pool(self):
+        if self._fanout_pool is None:
+            self._fanout_pool = ThreadPoolExecutor(max_workers=len(self.mirror_accounts),
+                                                   thread_name_prefix='mirror_fanout')
+        return self._fanout_pool
+
     def mirror_trade(self, trade):
         """
-        Mirror a single trade to target account with price validation
-        Returns: True if successful
+        Mirror a single trade to every mirror account with price validation
+        Returns: True if every account was mirrored successfully
         """
         if not self.mirroring_enabled:
             self.logger.warning("Mirroring disabled - trade not executed")
@@ -248,59 +393,369 @@ class MirrorEngine:
             self.logger.error("Trade missing trade_key")
             return False
 
+        self.logger.info(f"ATTEMPTING TO MIRROR: {trade['symbol']} "
+                         f"Qty: {trade['quantity']} @ {trade['order_price']}")
+        deadline = self._deadline_for(trade)
+
+        # Check price tolerance once for all accounts (if we can get current price)
+        try:
+            current_price = None if deadline is not None and deadline.expired() else \
+                self.get_current_market_price(trade['symbol'], deadline=deadline)
+            if current_price and not self.is_within_price_tolerance(trade['order_price'], current_price):
+                self.logger.warning(f"Price out of tolerance: Source={trade['order_price']}, Current={current_price}")
+                # proceed but log warning
+        except Exception as e:
+            self.logger.warning(f"Price check failed: {e}")
+
+        # Every account gets the order at the same time, not one after another
+        if len(self.mirror_accounts) == 1:
+            results = [self._mirror_to_account(self.mirror_accounts[0], trade, deadline)]
+        else:
+            results = list(self._get_fanout_pool().map(
+                lambda account_id: self._mirror_to_account(account_id, trade, deadline), self.mirror_accounts))
+        return all(results)
+
+    def _mirror_to_account(self, account_id, trade, deadline=None):
+        """Place one trade on one mirror account (runs on a fan-out thread)"""
+        trade_key = self.account_key(account_id, trade['trade_key'])
+
         # Prevent double-execution using in-memory reservation with a lock
         with self._lock:
+            self.mirrored_trades.roll()
             if self.is_already_mirrored(trade_key):
                 self.logger.info(f"Trade {trade_key} already mirrored - skipping")
                 return True
             # reserve immediately to avoid race re-entry
             self.mirrored_trades.add(trade_key)
 
+        started = time.monotonic()
         try:
-            self.logger.info(f"ATTEMPTING TO MIRROR: {trade['symbol']} "
-                           f"Qty: {trade['quantity']} @ {trade['order_price']}")
-
             # Get mirror account connection
-            mirror_conn = self.auth.get_connection('mirror_account')
+            mirror_conn = self.auth.get_connection(account_id)
             if not mirror_conn:
-                self.logger.error("No connection to mirror account")
+                self.logger.error(f"No connection to mirror account {account_id}")
                 # rollback reservation
                 with self._lock:
                     self.mirrored_trades.discard(trade_key)
+                self._record_account_result(account_id, False, started, "No connection")
                 return False
 
-            # Check price tolerance (if we can get current price)
-            current_price = self.get_current_market_price(trade['symbol'])
-            if current_price and not self.is_within_price_tolerance(trade['order_price'], current_price):
-                self.logger.warning(f"Price out of tolerance: Source={trade['order_price']}, Current={current_price}")
-                # proceed but log warning
+            multiplier = self.lot_multipliers.get(account_id, 1)
+            account_trade = dict(trade, quantity=int(trade['quantity']) * multiplier)
+
+            # On disk before the order leaves, so a crash can neither lose nor repeat it
+            # (the tag also lets an ambiguous send be looked up in the order book)
+            order_tag = (self.journal.intent(trade_key, account_id, trade) if self.journal
+                         else IntentJournal.order_tag(trade_key))
 
             # Place actual order with retry logic
+            error_msg = None
+            unresolved = False
             for attempt in range(self.max_retries):
-                self.logger.info(f"Mirror attempt {attempt + 1}/{self.max_retries}")
+                reason = self._check_deadline(deadline, 'retry' if attempt else 'dispatch', trade)
+                if reason:
+                    # a stale trade stays reserved - it must not be mirrored later either
+                    self._resolve_intent(trade_key, 'expired')
+                    latency_ms = self._record_account_result(account_id, False, started, reason)
+                    self._persist_mirrored_trade(trade_key, None, account_id, 'expired', latency_ms, reason)
+                    return False
+
+                if not self.retry.allow(account_id, 'placeOrder'):
+                    # broker degraded for this account - fail fast instead of queueing timeouts
+                    error_msg = f"placeOrder circuit open for {account_id}"
+                    self.logger.error(f"{error_msg} - not sending {trade['symbol']}")
+                    break
+
+                self.logger.info(f"Mirror attempt {attempt + 1}/{self.max_retries} ({account_id})")
 
-                order_response = self.place_angel_one_order(mirror_conn, trade)
+                order_response = self.place_angel_one_order(mirror_conn, account_trade, deadline=deadline,
+                                                            order_tag=order_tag)
+                if order_response.get('expired'):
+                    self._resolve_intent(trade_key, 'expired')
+                    error_msg = order_response.get('message')
+                    latency_ms = self._record_account_result(account_id, False, started, error_msg)
+                    self._persist_mirrored_trade(trade_key, None, account_id, 'expired', latency_ms, error_msg)
+                    return False
 
+                kind = classify(order_response)
+                self.retry.record(account_id, 'placeOrder', kind, attempt)
                 if order_response.get('status'):
-                    self.logger.info(f"SUCCESSFULLY MIRRORED: {trade['symbol']}")
-                    return True
+                    order_id = (order_response.get('data') or {}).get('orderid')
+                    return self._order_accepted(account_id, mirror_conn, trade, account_trade, trade_key,
+                                                order_id, started, deadline)
                 else:
                     error_msg = order_response.get('message', 'Unknown error')
-                    self.logger.warning(f"Mirror attempt {attempt + 1} failed: {error_msg}")
+                    self.logger.warning(f"Mirror attempt {attempt + 1} failed ({account_id}, {kind}): {error_msg}")
+                    if order_response.get('ambiguous'):
+                        # the request may have reached the broker - check before failing or re-sending
+                        row = self._find_tagged_order(account_id, order_tag)
+                        if row:
+                            self.logger.warning(f"Order for {trade_key} reached {account_id} despite "
+                                                f"'{error_msg}' - not re-sending")
+                            return self._order_accepted(account_id, mirror_conn, trade, account_trade, trade_key,
+                                                        row.get('orderid'), started, deadline)
+                        if row is None:
+                            unresolved = True
+                            break
+                    if kind == PERMANENT:
+                        break  # the broker would reject every retry the same way
                     if attempt < self.max_retries - 1:
-                        time.sleep(self.retry_delay)
+                        self.retry.sleep(attempt, deadline)
 
-            self.logger.error(f"FAILED TO MIRROR after {self.max_retries} attempts: {trade['symbol']}")
+            if unresolved:
+                # intent stays open: recover_intents settles it against the order book on the next start
+                error_msg = f"placeOrder outcome unknown ({error_msg}) and order book unavailable"
+                self.logger.error(f"NOT RETRYING {trade['symbol']} ({account_id}): {error_msg}")
+                latency_ms = self._record_account_result(account_id, False, started, error_msg)
+                self._persist_mirrored_trade(trade_key, None, account_id, 'unknown', latency_ms, error_msg)
+                return False
+
+            self.logger.error(f"FAILED TO MIRROR: {trade['symbol']} ({account_id}): {error_msg}")
             # leave trade_key reserved to avoid reattempts by default
+            self._resolve_intent(trade_key, 'failed')
+            latency_ms = self._record_account_result(account_id, False, started, error_msg)
+            self._persist_mirrored_trade(trade_key, None, account_id, 'failed', latency_ms, error_msg)
             return False
 
         except Exception as e:
-            self.logger.error(f"Mirror execution error: {e}")
+            self.logger.error(f"Mirror execution error ({account_id}): {e}")
             # ensure reservation is cleared so future attempts can retry
             with self._lock:
                 self.mirrored_trades.discard(trade_key)
+            self._record_account_result(account_id, False, started, str(e))
             return False
 
+    def _order_accepted(self, account_id, mirror_conn, trade, account_trade, trade_key, order_id, started,
+                        deadline=None):
+        """Book-keeping for an order the broker holds; returns True"""
+        self._resolve_intent(trade_key, 'ack', order_id)
+        latency_ms = self._record_account_result(account_id, True, started)
+        self._persist_mirrored_trade(trade_key, order_id, account_id, 'placed', latency_ms,
+                                     order_mode=self.order_mode)
+        self.reconciler.track(account_id, trade_key, order_id, trade['symbol'], side=trade['order_type'],
+                              source_price=trade.get('order_price'), order_mode=self.order_mode,
+                              session_date=self.mirrored_trades.session_date, exchange=trade.get('exchange'))
+        self.logger.info(f"SUCCESSFULLY MIRRORED: {trade['symbol']} x{account_trade['quantity']} "
+                         f"to {account_id} in {latency_ms:.0f}ms")
+        if self.order_mode == 'limit_chase':
+            self._start_chase(account_id, mirror_conn, order_id, account_trade, trade_key, deadline)
+        # a netted trade stands in for every source trade folded into it
+        self.mark_handled((k for k in trade.get('netted_keys', []) if k != trade['trade_key']),
+                          account_ids=[account_id])
+        return True
+
+    def _find_tagged_order(self, account_id, order_tag):
+        """Order-book row carrying `order_tag`; False if absent, None if the book can't be read"""
+        book = self.reconciler.fetch_order_book(account_id)
+        if book is None:
+            return None
+        return next((row for row in book if row.get('ordertag') == order_tag), False)
+
+    def _tick_size(self, symbol):
+        instrument = self.instruments.get(symbol) if self.instruments is not None else None
+        return (instrument or {}).get('tick_size') or 0.05
+
+    def _round_to_tick(self, price, tick, side):
+        """Round to the exchange tick, never past the limit (down for BUY, up for SELL)"""
+        ticks = price / tick
+        ticks = math.floor(ticks + 1e-9) if side == 'BUY' else math.ceil(ticks - 1e-9)
+        return round(max(ticks, 1) * tick, 2)
+
+    def limit_price(self, trade):
+        """Source price plus tolerance for a BUY (minus for a SELL), on the tick grid"""
+        try:
+            source_price = float(trade.get('order_price') or 0)
+        except (TypeError, ValueError):
+            return None
+        if source_price <= 0:
+            return None
+        side = str(trade['order_type']).upper()
+        price = source_price * (1 + self.price_tolerance if side == 'BUY' else 1 - self.price_tolerance)
+        return self._round_to_tick(price, self._tick_size(trade['symbol']), side)
+
+    def _start_chase(self, account_id, connection, order_id, trade, trade_key, deadline=None):
+        """Chase an accepted LIMIT on timer threads, so the execution worker moves on"""
+        chase = {'account_id': account_id, 'connection': connection, 'order_id': order_id, 'trade': trade,
+                 'trade_key': trade_key, 'deadline': deadline, 'price': self.limit_price(trade),
+                 'token': self.get_symbol_token(trade['symbol']), 'steps': 0,
+                 'session_date': self.mirrored_trades.session_date}
+        with self._chase_done:
+            self._chases[(account_id, str(order_id))] = chase
+        self._schedule_chase(chase)
+
+    def _schedule_chase(self, chase):
+        timer = threading.Timer(self.chase_interval, self._chase_step, args=(chase,))
+        timer.daemon = True
+        chase['timer'] = timer
+        timer.start()
+
+    def _chase_step(self, chase):
+        """
+        One step of a LIMIT chase: stop once the order is final, cancel it once
+        the trade's deadline has passed, else move the LIMIT toward the market
+        (MARKET after chase_steps) and schedule the next step
+        """
+        account_id, order_id, trade = chase['account_id'], chase['order_id'], chase['trade']
+        try:
+            book = self.reconciler.fetch_order_book(account_id)
+            row = next((r for r in book or [] if str(r.get('orderid')) == str(order_id)), None)
+            if row is not None:
+                self.reconciler.update(account_id, order_id, row)
+            if not self.reconciler.is_pending(account_id, order_id):
+                return self._end_chase(chase)
+
+            params = {
+                'variety': 'NORMAL', 'orderid': order_id, 'tradingsymbol': trade['symbol'],
+                **({'symboltoken': chase['token']} if chase['token'] else {}),
+                'exchange': trade.get('exchange', 'NFO'), 'producttype': trade.get('product_type', 'INTRADAY'),
+                'duration': 'DAY', 'quantity': str(trade['quantity'])
+            }
+            if self._check_deadline(chase['deadline'], 'chase', trade):
+                # too late to land the mirror at all - pull the resting LIMIT
+                response = self.retry.call('cancelOrder', chase['connection'].cancelOrder, order_id, 'NORMAL',
+                                           account_id=account_id, attempts=self.max_retries)
+                if not response or not response.get('status'):
+                    self.logger.warning(f"Cancel of expired order {order_id} failed: "
+                                        f"{(response or {}).get('message')}")
+                return self._end_chase(chase)
+
+            chase['steps'] += 1
+            side, tick = str(trade['order_type']).upper(), self._tick_size(trade['symbol'])
+            if chase['steps'] > self.chase_steps:
+                params.update({'ordertype': 'MARKET', 'price': '0'})
+                with self._lock:
+                    self.chase_conversions += 1
+                self.logger.warning(f"Converting {trade['symbol']} order {order_id} to MARKET after "
+                                    f"{self.chase_steps} chase steps ({account_id})")
+            else:
+                price = chase['price']
+                market = self.get_current_market_price(trade['symbol'], token=chase['token'])
+                # close a growing share of the gap to the LTP, at least one tick per step
+                target = price + (market - price) * chase['steps'] / self.chase_steps if market else price
+                target = max(target, price + tick) if side == 'BUY' else min(target, price - tick)
+                chase['price'] = self._round_to_tick(target, tick, side)
+                params.update({'ordertype': 'LIMIT', 'price': str(chase['price'])})
+                self.logger.info(f"Chasing {trade['symbol']} order {order_id}: LIMIT {chase['price']} "
+                                 f"(step {chase['steps']}/{self.chase_steps}, LTP {market})")
+            response = self.retry.call('modifyOrder', chase['connection'].modifyOrder, params,
+                                       account_id=account_id, attempts=self.max_retries, deadline=chase['deadline'])
+            if not response or not response.get('status'):
+                self.logger.warning(f"Modify of order {order_id} failed: {(response or {}).get('message')}")
+        except Exception as e:
+            self.logger.warning(f"Chase step for order {order_id} ({account_id}) failed: {e}")
+        if chase['steps'] > self.chase_steps or self._closed:
+            return self._end_chase(chase)
+        self._schedule_chase(chase)
+
+    def _end_chase(self, chase):
+        if self._writer:
+            self._writer.submit(
+                "UPDATE mirrored_trades SET chase_steps = ? WHERE session_date = ? AND trade_key = ?",
+                (chase['steps'], chase['session_date'], chase['trade_key']))
+        with self._chase_done:
+            self._chases.pop((chase['account_id'], str(chase['order_id'])), None)
+            self._chase_done.notify_all()
+
+    def wait_for_chases(self, timeout=None):
+        """Block until running LIMIT chases end; True if none is left"""
+        with self._chase_done:
+            return self._chase_done.wait_for(lambda: not self._chases, timeout)
+
+    def _on_fill(self, account_id, order_id, entry, filled_qty):
+        """Reconciler callback: only a confirmed fill changes the open position"""
+        if entry.get('symbol') and filled_qty:
+            with self._lock:
+                self._record_position({'symbol': entry['symbol'], 'order_type': entry.get('side'),
+                                       'quantity': filled_qty, 'exchange': entry.get('exchange')})
+
+    def _resolve_intent(self, trade_key, outcome, order_id=None):
+        if self.journal:
+            try:
+                self.journal.resolve(trade_key, outcome, order_id)
+            except Exception as e:
+                self.logger.warning(f"Intent journal write failed for {trade_key}: {e}")
+
+    def _seed_acked_intents(self):
+        """
+        Today's acked intents count as mirrored even when their write-behind
+        mirrored_trades row was lost in a crash
+        """
+        if not self.journal:
+            return
+        seeded = 0
+        for record in self.journal.acked(self.mirrored_trades.session_date):
+            intent_id = record['id']
+            if intent_id in self.mirrored_trades:
+                continue
+            account_id = record.get('acc') or self.PRIMARY_MIRROR
+            self.mirrored_trades.add(intent_id)
+            self._persist_mirrored_trade(intent_id, record.get('order_id'), account_id, 'placed')
+            self.reconciler.track(account_id, intent_id, record.get('order_id'),
+                                  session_date=self.mirrored_trades.session_date)
+            seeded += 1
+        if seeded:
+            self.logger.warning(f"Restored {seeded} acked mirror orders missing from mirrored_trades")
+
+    def recover_intents(self):
+        """
+        Resolve intents a crash left in flight against the mirror accounts'
+        order books (matched by order tag)
+        Returns: source trades whose order never reached the broker
+        """
+        if not self.journal:
+            return []
+        pending = self.journal.pending()
+        if not pending:
+            self.journal.compact(self.mirrored_trades.session_date)
+            return []
+
+        books = {}
+        lost = {}
+        for intent in pending:
+            intent_id, account_id = intent['id'], intent.get('acc') or self.PRIMARY_MIRROR
+            if account_id not in books:
+                book = self.reconciler.fetch_order_book(account_id)
+                books[account_id] = {row.get('ordertag'): row for row in book or []} if book is not None else None
+            book = books[account_id]
+            if book is None:
+                # can't tell - keep it reserved and decide on the next start
+                with self._lock:
+                    self.mirrored_trades.add(intent_id)
+                continue
+
+            row = book.get(intent['tag'])
+            if row:
+                order_id = row.get('orderid')
+                self.logger.warning(f"Recovered in-flight mirror order {order_id} for {intent_id}")
+                with self._lock:
+                    self.mirrored_trades.add(intent_id)
+                self._persist_mirrored_trade(intent_id, order_id, account_id, 'placed')
+                self.reconciler.track(account_id, intent_id, order_id, intent['trade'].get('symbol'),
+                                      session_date=self.mirrored_trades.session_date)
+                self.journal.resolve(intent_id, 'ack', order_id)
+            else:
+                self.logger.warning(f"Mirror order for {intent_id} never reached {account_id} - re-queueing")
+                with self._lock:
+                    self.mirrored_trades.discard(intent_id)
+                self.journal.resolve(intent_id, 'lost')
+                lost.setdefault(intent['trade']['trade_key'], intent['trade'])
+        self.journal.compact(self.mirrored_trades.session_date)
+        return list(lost.values())
+
+    def _record_account_result(self, account_id, success, started, error=None):
+        """Per-account counters and latency; returns latency in ms"""
+        latency_ms = (time.monotonic() - started) * 1000
+        with self._lock:
+            stats = self.account_stats.setdefault(account_id, {
+                'mirrored': 0, 'failed': 0, 'last_latency_ms': None, 'avg_latency_ms': None, 'last_error': None})
+            stats['mirrored' if success else 'failed'] += 1
+            count = stats['mirrored'] + stats['failed']
+            stats['avg_latency_ms'] = round(((stats['avg_latency_ms'] or 0) * (count - 1) + latency_ms) / count, 1)
+            stats['last_latency_ms'] = round(latency_ms, 1)
+            if error:
+                stats['last_error'] = error
+        return latency_ms
+
     # Persistence helpers
     def _ensure_table(self):
         if not self._db_conn:
@@ -308,36 +763,129 @@ class MirrorEngine:
         cur = self._db_conn.cursor()
         cur.execute("""
             CREATE TABLE IF NOT EXISTS mirrored_trades (
-                trade_key TEXT PRIMARY KEY,
+                trade_key TEXT,
                 mirrored_at TIMESTAMP,
-                order_id TEXT
+                order_id TEXT,
+                session_date TEXT,
+                account_id TEXT,
+                status TEXT,
+                latency_ms REAL,
+                error TEXT,
+                fill_price REAL,
+                filled_qty INTEGER,
+                reconciled_at TIMESTAMP,
+                order_mode TEXT,
+                chase_steps INTEGER,
+                time_to_fill_ms REAL,
+                PRIMARY KEY (session_date, trade_key)
             )
         """)
+        columns = [r[1] for r in cur.execute("PRAGMA table_info(mirrored_trades)")]
+        for column, column_type in (('session_date', 'TEXT'), ('account_id', 'TEXT'), ('status', 'TEXT'),
+                                    ('latency_ms', 'REAL'), ('error', 'TEXT'), ('fill_price', 'REAL'),
+                                    ('filled_qty', 'INTEGER'), ('reconciled_at', 'TIMESTAMP'),
+                                    ('order_mode', 'TEXT'), ('chase_steps', 'INTEGER'),
+                                    ('time_to_fill_ms', 'REAL')):
+            if column not in columns:
+                cur.execute(f"ALTER TABLE mirrored_trades ADD COLUMN {column} {column_type}")
         self._db_conn.commit()
 
-    def _persist_mirrored_trade(self, trade_key, order_id=None):
-        if not self._db_conn:
+    def _persist_mirrored_trade(self, trade_key, order_id=None, account_id=PRIMARY_MIRROR,
+                                status=None, latency_ms=None, error=None, order_mode=None):
+        if not self._writer:
             return
-        cur = self._db_conn.cursor()
-        cur.execute("INSERT OR IGNORE INTO mirrored_trades (trade_key, mirrored_at, order_id) VALUES (?, ?, ?)",
-                    (trade_key, datetime.now().isoformat(), order_id))
-        self._db_conn.commit()
+        self._writer.submit(
+            "INSERT OR IGNORE INTO mirrored_trades "
+            "(trade_key, mirrored_at, order_id, session_date, account_id, status, latency_ms, error, order_mode) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (trade_key, datetime.now().isoformat(), order_id, self.mirrored_trades.session_date,
+             account_id, status, round(latency_ms, 1) if latency_ms is not None else None, error, order_mode)
+        )
 
-    def _load_persisted_mirrors(self):
+    def mark_handled(self, trade_keys, order_id=None, account_ids=None):
+        """Record source trades as handled without placing an order for them"""
+        trade_keys = list(trade_keys)
+        for account_id in account_ids or self.mirror_accounts:
+            keys = [self.account_key(account_id, k) for k in trade_keys]
+            with self._lock:
+                self.mirrored_trades.update(keys)
+            for trade_key in keys:
+                self._persist_mirrored_trade(trade_key, order_id, account_id, 'handled')
+
+    def flush(self):
+        """Wait until queued mirrored-trade writes are on disk"""
+        if self._writer:
+            self._writer.flush()
+
+    def close(self):
+        """Flush pending writes and stop the background writer (shutdown)"""
+        self._closed = True
+        with self._chase_done:
+            chases = list(self._chases.values())
+        for chase in chases:
+            # resting orders stay with the broker; restart resumes reconciling them
+            if chase.get('timer'):
+                chase['timer'].cancel()
+            self._end_chase(chase)
+        if self._fanout_pool:
+            self._fanout_pool.shutdown(wait=False)
+        if self._writer:
+            self._writer.close()
+        if self.journal:
+            self.journal.close()
+
+    def _restore_pending_orders(self):
+        """Resume reconciling this session's orders that were not final at shutdown"""
         if not self._db_conn:
-            return set()
-        cur = self._db_conn.cursor()
+            return
         try:
-            cur.execute('SELECT trade_key FROM mirrored_trades')
-            rows = cur.fetchall()
-            return set(r[0] for r in rows)
-        except Exception:
-            return set()
+            rows = self._db_conn.execute(
+                "SELECT account_id, trade_key, order_id FROM mirrored_trades "
+                "WHERE session_date = ? AND order_id IS NOT NULL AND status IN ('placed', 'open')",
+                (self.mirrored_trades.session_date,)).fetchall()
+        except Exception as e:
+            self.logger.warning(f"Could not restore pending mirror orders: {e}")
+            return
+        for account_id, trade_key, order_id in rows:
+            self.reconciler.track(account_id or self.PRIMARY_MIRROR, trade_key, order_id,
+                                  session_date=self.mirrored_trades.session_date)
+        if rows:
+            self.logger.info(f"Resumed reconciliation of {len(rows)} pending mirror orders")
+
+    def reconcile_orders(self, force=False):
+        """Batched fill/rejection check of accepted mirror orders (rate-limited internally)"""
+        try:
+            return self.reconciler.reconcile(force=force)
+        except Exception as e:
+            self.logger.warning(f"Order reconciliation failed: {e}")
+            return 0
+
+    def _load_persisted_mirrors(self):
+        settings = self.config.get_settings()
+        return DayPartitionedKeyStore(
+            self._db_conn, 'mirrored_trades', 'mirrored_at',
+            lookback_days=settings.get('dedupe_lookback_days', 0),
+            retention_days=settings.get('dedupe_retention_days', 7)
+        )
     
     def get_mirror_stats(self):
         """Get mirroring statistics"""
         return {
             'mirroring_enabled': self.mirroring_enabled,
             'total_mirrored': len(self.mirrored_trades),
+            'persistence': self._writer.get_stats() if self._writer else None,
+            'quote_cache': self.quotes.get_stats(),
+            'mirror_accounts': self.mirror_accounts,
+            'accounts': self.account_stats,
+            'deadline': {
+                'budget_seconds': self.deadline_seconds,
+                'aborts': dict(self.deadline_aborts),
+                'last_abort': self.last_deadline_abort
+            },
+            'order_mode': self.order_mode,
+            'chase_conversions': self.chase_conversions,
+            'reconciliation': self.reconciler.get_stats(),
+            'intent_journal': self.journal.get_stats() if self.journal else None,
+            'open_positions': len(self.positions),
             'last_mirror_attempt': getattr(self, 'last_attempt', None)
         }
\ No newline at end of file
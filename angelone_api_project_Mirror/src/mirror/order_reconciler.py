@@ -0,0 +1,208 @@
+import logging
+import threading
+import time
+from datetime import datetime
+
+
+class OrderReconciler:
+    """
+    Tracks mirror orders from acceptance to a final state.
+
+    placeOrder returning status True only means the broker accepted the
+    order. Every accepted order id is tracked here, and reconcile() pulls
+    each mirror account's orderBook() once for all of its pending orders,
+    writing status, filled quantity, average price and rejection text back to
+    mirrored_trades. Rejections raise an alert through `on_alert`; fills are
+    reported through `on_fill`.
+
+    Fills also feed per-order-mode execution quality (time to fill and
+    slippage against the source price), so MARKET and chased-LIMIT
+    mirroring can be compared.
+    """
+
+    TERMINAL_STATUSES = ('complete', 'rejected', 'cancelled')
+
+    def __init__(self, auth_manager, settings, writer=None, on_alert=None, on_fill=None, clock=time.monotonic):
+        self.auth = auth_manager
+        self.writer = writer
+        self.on_alert = on_alert
+        self.on_fill = on_fill
+        self.interval = settings.get('reconcile_interval', 2)
+        self.logger = logging.getLogger('order_reconciler')
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pending = {}  # account_id -> {order_id: order entry}
+        self._last_run = None
+        self._quality = {}  # order mode -> [fills, total time to fill, total slippage bps, priced fills]
+
+        self.polls = 0
+        self.filled = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.poll_errors = 0
+        self.last_rejection = None
+
+    def track(self, account_id, trade_key, order_id, symbol=None, side=None, source_price=None,
+              order_mode='market', placed_at=None, session_date=None, exchange=None):
+        """Follow an accepted order until it reaches a final state"""
+        if not order_id:
+            return
+        entry = {'trade_key': trade_key, 'symbol': symbol, 'side': side, 'exchange': exchange,
+                 'source_price': source_price, 'order_mode': order_mode, 'placed_at': placed_at if placed_at is not None else self._clock(),
+                 # trade keys repeat across days; rows are addressed by (session_date, trade_key)
+                 'session_date': session_date or datetime.now().date().isoformat()}
+        with self._lock:
+            self._pending.setdefault(account_id, {})[str(order_id)] = entry
+
+    def is_pending(self, account_id, order_id):
+        with self._lock:
+            return str(order_id) in self._pending.get(account_id, {})
+
+    def pending_count(self):
+        with self._lock:
+            return sum(len(orders) for orders in self._pending.values())
+
+    def reconcile(self, force=False):
+        """
+        One orderBook() call per mirror account with pending orders
+        Returns: number of orders that reached a final state
+        """
+        now = self._clock()
+        if not force and self._last_run is not None and now - self._last_run < self.interval:
+            return 0
+        self._last_run = now
+
+        with self._lock:
+            pending = {account_id: dict(orders) for account_id, orders in self._pending.items() if orders}
+
+        settled = 0
+        for account_id, orders in pending.items():
+            book = self.fetch_order_book(account_id)
+            if book is None:
+                continue
+            for row in book:
+                order_id = str(row.get('orderid', ''))
+                if order_id in orders:
+                    settled += self._apply(account_id, order_id, orders[order_id], row)
+        return settled
+
+    def update(self, account_id, order_id, row):
+        """Apply an order-book row fetched elsewhere; True once the order is final"""
+        with self._lock:
+            entry = self._pending.get(account_id, {}).get(str(order_id))
+        return bool(entry) and self._apply(account_id, str(order_id), entry, row) == 1
+
+    def fetch_order_book(self, account_id):
+        """Rows of an account's orderBook(), or None if it could not be read"""
+        connection = self.auth.get_connection(account_id)
+        if not connection:
+            return None
+        try:
+            response = connection.orderBook()
+        except Exception as e:
+            self.poll_errors += 1
+            self.logger.warning(f"orderBook failed for {account_id}: {e}")
+            return None
+        self.polls += 1
+        if not response or not response.get('status'):
+            self.poll_errors += 1
+            self.logger.warning(f"orderBook failed for {account_id}: {(response or {}).get('message')}")
+            return None
+        return response.get('data') or []
+
+    def _apply(self, account_id, order_id, entry, row):
+        """Write one order's state back; returns 1 if it is now final"""
+        trade_key, symbol = entry['trade_key'], entry['symbol']
+        status = str(row.get('orderstatus') or row.get('status') or '').lower()
+        reason = row.get('text') or None
+        try:
+            fill_price = float(row.get('averageprice') or 0) or None
+        except (TypeError, ValueError):
+            fill_price = None
+        try:
+            filled_qty = int(float(row.get('filledshares') or 0))
+        except (TypeError, ValueError):
+            filled_qty = 0
+
+        if self.writer:
+            self.writer.submit(
+                "UPDATE mirrored_trades SET status = ?, fill_price = ?, filled_qty = ?, "
+                "error = COALESCE(?, error), reconciled_at = ? WHERE session_date = ? AND trade_key = ?",
+                (status or 'open', fill_price, filled_qty,
+                 reason if status in ('rejected', 'cancelled') else None,
+                 datetime.now().isoformat(), entry['session_date'], trade_key))
+
+        if status not in self.TERMINAL_STATUSES:
+            return 0
+        with self._lock:
+            if self._pending.get(account_id, {}).pop(order_id, None) is None:
+                return 0  # settled by another caller meanwhile
+
+        if status == 'complete':
+            self.filled += 1
+            time_to_fill_ms = self._record_fill(trade_key, entry, fill_price)
+            self.logger.info(f"Mirror order {order_id} ({account_id}) filled {filled_qty} @ {fill_price} "
+                             f"after {time_to_fill_ms:.0f}ms ({entry['order_mode']})")
+            if self.on_fill:
+                try:
+                    self.on_fill(account_id, order_id, entry, filled_qty)
+                except Exception as e:
+                    self.logger.warning(f"Fill callback failed: {e}")
+        elif status == 'rejected':
+            self.rejected += 1
+            self.last_rejection = f"{account_id} {symbol or trade_key} order {order_id}: {reason or 'no reason given'}"
+            self.logger.error(f"MIRROR ORDER REJECTED: {self.last_rejection}")
+            if self.on_alert:
+                try:
+                    self.on_alert(f"Mirror order rejected - {self.last_rejection}")
+                except Exception as e:
+                    self.logger.warning(f"Alert callback failed: {e}")
+        else:
+            self.cancelled += 1
+            self.logger.warning(f"Mirror order {order_id} ({account_id}) cancelled after {filled_qty} filled")
+        return 1
+
+    def _record_fill(self, trade_key, entry, fill_price):
+        """Time to fill and slippage of a completed order; returns time to fill (ms)"""
+        time_to_fill_ms = (self._clock() - entry['placed_at']) * 1000
+        slippage_bps = None
+        if fill_price and entry['source_price']:
+            direction = -1 if str(entry['side']).upper() == 'SELL' else 1
+            # positive = paid more (or sold for less) than the source trader
+            slippage_bps = (fill_price - entry['source_price']) / entry['source_price'] * 1e4 * direction
+        with self._lock:
+            quality = self._quality.setdefault(entry['order_mode'], [0, 0.0, 0.0, 0])
+            quality[0] += 1
+            quality[1] += time_to_fill_ms
+            if slippage_bps is not None:
+                quality[2] += slippage_bps
+                quality[3] += 1
+        if self.writer:
+            self.writer.submit(
+                "UPDATE mirrored_trades SET time_to_fill_ms = ? WHERE session_date = ? AND trade_key = ?",
+                (round(time_to_fill_ms, 1), entry['session_date'], trade_key))
+        return time_to_fill_ms
+
+    def get_execution_quality(self):
+        """Fills, average time to fill (ms) and slippage (bps) per order mode"""
+        with self._lock:
+            return {
+                mode: {
+                    'fills': q[0],
+                    'avg_time_to_fill_ms': round(q[1] / q[0], 1) if q[0] else None,
+                    'avg_slippage_bps': round(q[2] / q[3], 2) if q[3] else None
+                } for mode, q in self._quality.items()
+            }
+
+    def get_stats(self):
+        """Get reconciliation statistics"""
+        return {
+            'pending': self.pending_count(),
+            'order_book_polls': self.polls,
+            'poll_errors': self.poll_errors,
+            'filled': self.filled,
+            'rejected': self.rejected,
+            'cancelled': self.cancelled,
+            'last_rejection': self.last_rejection,
+            'execution_quality': self.get_execution_quality()
+        }
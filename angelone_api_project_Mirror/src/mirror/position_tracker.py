@@ -1,18 +1,25 @@
 import logging
 
+from src.utils.retry_policy import policy_for
+from src.utils.symbol_parser import parse_symbol
+
 class PositionTracker:
     def __init__(self, config_manager, auth_manager):
         self.config = config_manager
         self.auth = auth_manager
         self.logger = logging.getLogger('position_tracker')
         self.previous_holdings = {}
+        settings = config_manager.get_settings()
+        self.max_retries = settings.get('max_retries', 3)
+        self.retry = policy_for(auth_manager, settings)
         
     def get_current_holdings(self, account_id):
         """Get current holdings for an account"""
         try:
             connection = self.auth.get_connection(account_id)
             if connection:
-                holdings_data = connection.holding()
+                holdings_data = self.retry.call('holding', connection.holding, account_id=account_id,
+                                                attempts=self.max_retries)
                 if holdings_data and holdings_data.get('status'):
                     return self.parse_holdings(holdings_data['data'])
             return {}
@@ -44,7 +51,8 @@ class PositionTracker:
     
     def is_nifty_option(self, symbol):
         """Check if symbol is a NIFTY option (your focus)"""
-        return 'NIFTY' in symbol and ('CE' in symbol or 'PE' in symbol)
+        info = parse_symbol(symbol)
+        return bool(info and info.is_nifty_option)
     
     def detect_exits(self, current_holdings):
         """Detect positions that were exited"""
@@ -0,0 +1,88 @@
+import logging
+import threading
+import time
+
+
+class QuoteCache:
+    """
+    Short-lived LTP cache keyed by symbol token.
+
+    refresh() fetches many tokens per call through the market-data quote
+    endpoint (getMarketData, LTP mode); price checks read from the cache and
+    only go to the broker themselves when the cached quote is older than
+    `quote_cache_ttl_ms`.
+    """
+
+    # Angel One accepts up to 50 tokens per getMarketData request
+    MAX_TOKENS_PER_REQUEST = 50
+
+    def __init__(self, auth_manager, settings, account_id='mirror_account', clock=time.monotonic):
+        self.auth = auth_manager
+        self.account_id = account_id
+        self.ttl = settings.get('quote_cache_ttl_ms', 1000) / 1000.0
+        self.logger = logging.getLogger('quote_cache')
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._quotes = {}  # token -> (ltp, fetched_at)
+        self.hits = 0
+        self.misses = 0
+        self.bulk_requests = 0
+        self.tokens_refreshed = 0
+
+    def get(self, token):
+        """Cached LTP if fresher than the TTL, else None"""
+        with self._lock:
+            quote = self._quotes.get(str(token))
+            if quote and self._clock() - quote[1] <= self.ttl:
+                self.hits += 1
+                return quote[0]
+            self.misses += 1
+            return None
+
+    def put(self, token, ltp):
+        with self._lock:
+            self._quotes[str(token)] = (float(ltp), self._clock())
+
+    def refresh(self, tokens_by_exchange):
+        """
+        Bulk-refresh quotes: {'NFO': [token, ...], ...}
+        Returns: number of tokens refreshed
+        """
+        connection = self.auth.get_connection(self.account_id)
+        if not connection:
+            return 0
+
+        refreshed = 0
+        for exchange, tokens in tokens_by_exchange.items():
+            tokens = sorted({str(t) for t in tokens if t})
+            for i in range(0, len(tokens), self.MAX_TOKENS_PER_REQUEST):
+                chunk = tokens[i:i + self.MAX_TOKENS_PER_REQUEST]
+                try:
+                    response = connection.getMarketData('LTP', {exchange: chunk})
+                except Exception as e:
+                    self.logger.warning(f"Bulk quote request failed for {len(chunk)} tokens: {e}")
+                    continue
+                self.bulk_requests += 1
+                if not response or not response.get('status'):
+                    self.logger.warning(f"Bulk quote request failed: {(response or {}).get('message')}")
+                    continue
+                fetched_at = self._clock()
+                with self._lock:
+                    for quote in (response.get('data') or {}).get('fetched') or []:
+                        try:
+                            self._quotes[str(quote['symbolToken'])] = (float(quote['ltp']), fetched_at)
+                            refreshed += 1
+                        except (KeyError, TypeError, ValueError):
+                            continue
+        self.tokens_refreshed += refreshed
+        return refreshed
+
+    def get_stats(self):
+        """Get cache statistics"""
+        return {
+            'cached_tokens': len(self._quotes),
+            'hits': self.hits,
+            'misses': self.misses,
+            'bulk_requests': self.bulk_requests,
+            'tokens_refreshed': self.tokens_refreshed
+        }
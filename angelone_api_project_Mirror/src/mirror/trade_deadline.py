@@ -0,0 +1,56 @@
+import time
+from datetime import datetime
+
+
+class TradeDeadline:
+    """
+    Latency budget for mirroring one trade, measured from the source fill.
+
+    The fill time ('HH:MM:SS' or 'DD-Mon-YYYY HH:MM:SS') is taken as today's
+    wall-clock time; what is left of the budget at construction is then
+    tracked on the monotonic clock. Trades without a usable fill time get the
+    full budget from the moment they reach the mirror engine.
+    """
+
+    TIME_FORMATS = ('%H:%M:%S', '%H:%M:%S.%f')
+
+    def __init__(self, budget_seconds, fill_time=None, now=None, clock=time.monotonic):
+        self.budget = budget_seconds or None
+        self._clock = clock
+        now = now or datetime.now()
+        filled_at = self.parse_fill_time(fill_time, now)
+        # A fill stamped in the future (clock skew) is treated as just now
+        self.age_at_start = max(0.0, (now - filled_at).total_seconds()) if filled_at else 0.0
+        self._started = clock()
+
+    @classmethod
+    def parse_fill_time(cls, fill_time, now):
+        """Fill timestamp -> datetime on `now`'s date, or None"""
+        time_part = str(fill_time or '').strip().split(' ')[-1]
+        for fmt in cls.TIME_FORMATS:
+            try:
+                parsed = datetime.strptime(time_part, fmt).time()
+            except ValueError:
+                continue
+            return datetime.combine(now.date(), parsed)
+        return None
+
+    def age(self):
+        """Seconds since the source fill"""
+        return self.age_at_start + self._clock() - self._started
+
+    def remaining(self):
+        """Seconds left in the budget (infinite when there is no deadline)"""
+        if self.budget is None:
+            return float('inf')
+        return self.budget - self.age()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def check(self, stage):
+        """None while within budget, else the reason the mirror is abandoned"""
+        if not self.expired():
+            return None
+        return (f"deadline exceeded before {stage} "
+                f"({self.age():.1f}s after source fill, budget {self.budget:g}s)")
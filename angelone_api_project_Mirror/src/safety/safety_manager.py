@@ -1,13 +1,21 @@
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time
+
+from src.utils.symbol_parser import parse_symbol
 
 class SafetyManager:
-    def __init__(self, config_manager):
+    # Market hours: 9:15 AM to 3:30 PM
+    MARKET_OPEN = time(9, 15)
+    MARKET_CLOSE = time(15, 30)
+
+    def __init__(self, config_manager, now_func=datetime.now):
         self.config = config_manager
+        self._now = now_func
         self.logger = logging.getLogger('safety_manager')
         self.mirroring_enabled = False
         self.emergency_stop = False
         self.last_safety_check = None
+        self._was_market_hours = None
         
     def enable_mirroring(self):
         """Enable mirroring (manual control)"""
@@ -68,23 +76,21 @@ class SafetyManager:
     
     def is_market_hours(self):
         """Check if current time is within market hours"""
-        now = datetime.now()
-        current_time = now.time()
-        
-        # Market hours: 9:15 AM to 3:30 PM
-        market_open = now.replace(hour=9, minute=15, second=0, microsecond=0).time()
-        market_close = now.replace(hour=15, minute=30, second=0, microsecond=0).time()
-        
-        is_market_hours = market_open <= current_time <= market_close
-        if not is_market_hours:
+        current_time = self._now().time()
+        is_market_hours = self.MARKET_OPEN <= current_time <= self.MARKET_CLOSE
+
+        # Only log when the session state flips, not on every check
+        if not is_market_hours and self._was_market_hours is not False:
             self.logger.warning(f"Outside market hours: {current_time}")
+        self._was_market_hours = is_market_hours
         
         return is_market_hours
     
     def is_valid_trade_type(self, trade):
         """Validate trade type (NIFTY options only)"""
         symbol = trade.get('symbol', '')
-        is_valid = 'NIFTY' in symbol and ('CE' in symbol or 'PE' in symbol)
+        info = parse_symbol(symbol)
+        is_valid = bool(info and info.is_nifty_option)
         
         if not is_valid:
             self.logger.warning(f"Invalid trade type: {symbol}")
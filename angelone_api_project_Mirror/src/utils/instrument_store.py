@@ -0,0 +1,186 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import urllib.request
+from datetime import date, datetime
+
+from src.utils.symbol_parser import parse_symbol
+
+SCRIP_MASTER_URL = 'https://margincalculator.angelbroking.com/OpenAPI_File/files/OpenAPIScripMaster.json'
+
+
+class InstrumentStore:
+    """
+    Local index over Angel One's scrip master, SQLite-backed.
+
+    The master is downloaded at most once per day (or read from a local file)
+    and kept in `instruments`, indexed by tradingsymbol and by
+    (underlying, expiry, strike, instrument_type). Token and lot-size lookups
+    are indexed queries, memoised per symbol until the next reload.
+    """
+
+    def __init__(self, db_path, source_url=SCRIP_MASTER_URL, local_file=None, segments=('NFO', 'BFO')):
+        self.logger = logging.getLogger('instrument_store')
+        self.source_url = source_url
+        self.local_file = local_file
+        self.segments = set(segments or ())
+        db_dir = os.path.dirname(db_path) or '.'
+        os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._ensure_table()
+
+    def _ensure_table(self):
+        cur = self._conn.cursor()
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS instruments (
+                token TEXT,
+                symbol TEXT,
+                name TEXT,
+                expiry TEXT,
+                strike REAL,
+                instrument_type TEXT,
+                lot_size INTEGER,
+                tick_size REAL,
+                exchange TEXT,
+                PRIMARY KEY (exchange, symbol)
+            )
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_instruments_symbol ON instruments (symbol)")
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_instruments_contract
+            ON instruments (name, expiry, strike, instrument_type)
+        """)
+        cur.execute("CREATE TABLE IF NOT EXISTS instrument_meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+
+    @property
+    def loaded_date(self):
+        row = self._conn.execute("SELECT value FROM instrument_meta WHERE key = 'loaded_date'").fetchone()
+        return row[0] if row else None
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM instruments").fetchone()[0]
+
+    def ensure_loaded(self, force=False):
+        """Load today's scrip master unless it is already in the index"""
+        today = date.today().isoformat()
+        if not force and self.loaded_date == today and len(self):
+            return False
+        self.load(self._fetch())
+        return True
+
+    def _fetch(self):
+        if self.local_file:
+            with open(self.local_file, encoding='utf-8') as f:
+                return json.load(f)
+        self.logger.info(f"Downloading scrip master from {self.source_url}")
+        with urllib.request.urlopen(self.source_url, timeout=60) as response:
+            return json.loads(response.read())
+
+    @staticmethod
+    def _row(item):
+        """Scrip master entry -> instruments row (strike is quoted in paise)"""
+        symbol = item.get('symbol', '')
+        if symbol[-2:] in ('CE', 'PE') and item.get('instrumenttype', '').startswith('OPT'):
+            instrument_type = symbol[-2:]
+        elif item.get('instrumenttype', '').startswith('FUT'):
+            instrument_type = 'FUT'
+        else:
+            instrument_type = None
+        expiry = item.get('expiry') or ''
+        try:
+            expiry = datetime.strptime(expiry, '%d%b%Y').date().isoformat() if expiry else None
+        except ValueError:
+            expiry = None
+        try:
+            strike = float(item.get('strike') or 0) / 100
+        except ValueError:
+            strike = 0.0
+        return (item.get('token'), symbol, item.get('name'), expiry,
+                strike if strike > 0 else None, instrument_type,
+                int(float(item.get('lotsize') or 0)) or None,
+                float(item.get('tick_size') or 0) / 100 or None, item.get('exch_seg'))
+
+    def load(self, items):
+        """Replace the index with scrip master entries (one transaction)"""
+        rows = [self._row(item) for item in items
+                if not self.segments or item.get('exch_seg') in self.segments]
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM instruments")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO instruments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO instrument_meta (key, value) VALUES ('loaded_date', ?)",
+                    (date.today().isoformat(),))
+            self._cache.clear()
+        self.logger.info(f"Indexed {len(rows)} instruments")
+        return len(rows)
+
+    def get(self, symbol):
+        """Instrument row for a tradingsymbol (dict) or None"""
+        cached = self._cache.get(symbol)
+        if cached is not None or symbol in self._cache:
+            return cached
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT token, symbol, name, expiry, strike, instrument_type, lot_size, tick_size, exchange "
+                "FROM instruments WHERE symbol = ? LIMIT 1", (symbol,))
+            row = cur.fetchone()
+        instrument = dict(zip((c[0] for c in cur.description), row)) if row else None
+        self._cache[symbol] = instrument
+        return instrument
+
+    def find(self, underlying, expiry, strike, instrument_type):
+        """
+        Look a contract up by its parts. `expiry` is a date, or (year, month)
+        for a monthly contract (the last expiry in that month).
+        """
+        if isinstance(expiry, tuple):
+            expiry_clause, expiry_arg = "expiry LIKE ?", f"{expiry[0]:04d}-{expiry[1]:02d}-%"
+        else:
+            expiry_clause, expiry_arg = "expiry = ?", expiry.isoformat() if expiry else None
+        strike_clause = "strike = ?" if strike is not None else "strike IS ?"
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT symbol FROM instruments WHERE name = ? AND {expiry_clause} AND {strike_clause} "
+                f"AND instrument_type = ? ORDER BY expiry DESC LIMIT 1",
+                (underlying, expiry_arg, strike, instrument_type)).fetchone()
+        return self.get(row[0]) if row else None
+
+    def token_for(self, symbol):
+        """Symbol token, falling back to a lookup by contract parts"""
+        instrument = self.get(symbol)
+        if instrument is None:
+            info = parse_symbol(symbol)
+            if info and info.expiry:
+                instrument = self.find(info.underlying, info.expiry, info.strike, info.instrument_type)
+        return instrument['token'] if instrument else None
+
+    def lot_size(self, symbol):
+        """Lot size for a tradingsymbol, or for an underlying's nearest expiry"""
+        instrument = self.get(symbol)
+        if instrument and instrument['lot_size']:
+            return instrument['lot_size']
+        info = parse_symbol(symbol)
+        return self.underlying_lot_size(info.underlying if info else symbol)
+
+    def underlying_lot_size(self, underlying):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT lot_size FROM instruments WHERE name = ? AND lot_size IS NOT NULL "
+                "AND (expiry IS NULL OR expiry >= ?) ORDER BY expiry LIMIT 1",
+                (underlying, date.today().isoformat())).fetchone()
+        return row[0] if row else None
+
+    def lot_sizes(self, underlyings):
+        """{underlying: lot size} for the underlyings the index knows"""
+        sizes = {name: self.underlying_lot_size(name) for name in underlyings}
+        return {name: size for name, size in sizes.items() if size}
+
+    def close(self):
+        self._conn.close()
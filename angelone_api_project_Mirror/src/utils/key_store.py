@@ -0,0 +1,218 @@
+import hashlib
+import logging
+import re
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+
+# Time-of-day keys (`filltime_symbol_size`, optionally namespaced by account)
+# repeat every day; only keys carrying a date or order id identify a trade across days
+_TIME_OF_DAY_KEY = re.compile(r'^(?:[A-Za-z_]\w*:)*\d{1,2}:\d{2}:\d{2}_[^_]+_[^_]+$')
+
+
+def is_cross_day_key(key):
+    """True if `key` cannot recur on a later trading day for a different trade"""
+    return not _TIME_OF_DAY_KEY.match(key)
+
+
+class KeyDigestSet:
+    """
+    Compact read-mostly membership set: keys are stored as sorted 64-bit
+    blake2b digests (8 bytes per key) and looked up with a binary search.
+    """
+
+    def __init__(self, digests=()):
+        self._digests = array('Q', sorted(set(digests)))
+
+    @staticmethod
+    def digest(key):
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+    @classmethod
+    def from_keys(cls, keys):
+        return cls(cls.digest(k) for k in keys)
+
+    @classmethod
+    def from_bytes(cls, blob):
+        digests = array('Q')
+        digests.frombytes(blob)
+        return cls(digests)
+
+    def to_bytes(self):
+        return self._digests.tobytes()
+
+    def merge(self, other):
+        return KeyDigestSet(list(self._digests) + list(other._digests))
+
+    def __contains__(self, key):
+        d = self.digest(key)
+        i = bisect_left(self._digests, d)
+        return i < len(self._digests) and self._digests[i] == d
+
+    def __len__(self):
+        return len(self._digests)
+
+
+class DayPartitionedKeyStore:
+    """
+    Set-like view of a dedupe table partitioned by trading day.
+
+    Only the current session's keys are loaded as strings. Keys from the
+    previous `lookback_days` sessions are held in a KeyDigestSet and only
+    consulted for keys that are unique across days (`cross_day`). Rows older
+    than `retention_days` are compacted into one digest blob per day in
+    `trade_key_digests` and deleted from the main table.
+    """
+
+    def __init__(self, conn, table, time_column, lookback_days=0, retention_days=7, today=None,
+                 cross_day=is_cross_day_key):
+        self.conn = conn
+        self.cross_day = cross_day
+        self.table = table
+        self.time_column = time_column
+        self.lookback_days = lookback_days
+        self.retention_days = retention_days
+        self.logger = logging.getLogger(f'key_store.{table}')
+        self.session_date = today or datetime.now().date().isoformat()
+
+        self.keys = set()
+        self.lookback = KeyDigestSet()
+        if self.conn is not None:
+            try:
+                self._migrate()
+                self.compact()
+                self.keys = self._load_session_keys()
+                self.lookback = self._load_lookback()
+            except Exception as e:
+                self.logger.error(f"Could not load {table} keys: {e}")
+
+    def _migrate(self):
+        """Add the session_date partition column to pre-existing tables"""
+        cur = self.conn.cursor()
+        columns = [r[1] for r in cur.execute(f"PRAGMA table_info({self.table})")]
+        if 'session_date' not in columns:
+            cur.execute(f"ALTER TABLE {self.table} ADD COLUMN session_date TEXT")
+            self.logger.info(f"Partitioned {self.table} by session_date")
+        # also covers a column an owner added before this store saw the table
+        cur.execute(f"UPDATE {self.table} SET session_date = substr({self.time_column}, 1, 10) "
+                    f"WHERE session_date IS NULL")
+        info = list(cur.execute(f"PRAGMA table_info({self.table})"))
+        if [r[1] for r in sorted(info, key=lambda r: r[5]) if r[5]] != ['session_date', 'trade_key']:
+            self._rekey(cur, info)
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_session ON {self.table} (session_date)")
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS trade_key_digests (
+                store TEXT,
+                session_date TEXT,
+                key_count INTEGER,
+                digests BLOB,
+                PRIMARY KEY (store, session_date)
+            )
+        """)
+        self.conn.commit()
+
+    def _rekey(self, cur, info):
+        """Rebuild the table keyed by (session_date, trade_key) so a key can recur on a later day"""
+        columns = ', '.join(r[1] for r in info)
+        definitions = ', '.join(
+            f"{r[1]} {r[2]}" + (f" DEFAULT {r[4]}" if r[4] is not None else '') for r in info)
+        cur.execute(f"DROP TABLE IF EXISTS {self.table}_rekeyed")
+        cur.execute(f"CREATE TABLE {self.table}_rekeyed ({definitions}, PRIMARY KEY (session_date, trade_key))")
+        cur.execute(f"INSERT OR IGNORE INTO {self.table}_rekeyed ({columns}) SELECT {columns} FROM {self.table}")
+        cur.execute(f"DROP TABLE {self.table}")
+        cur.execute(f"ALTER TABLE {self.table}_rekeyed RENAME TO {self.table}")
+        self.logger.info(f"Re-keyed {self.table} by (session_date, trade_key)")
+
+    def _days_before(self, days):
+        return (datetime.fromisoformat(self.session_date) - timedelta(days=days)).date().isoformat()
+
+    def compact(self):
+        """Fold rows older than the retention window into per-day digest blobs"""
+        cutoff = self._days_before(self.retention_days)
+        cur = self.conn.cursor()
+        cur.execute(
+            f"SELECT session_date, trade_key FROM {self.table} WHERE session_date < ? ORDER BY session_date",
+            (cutoff,)
+        )
+        by_day = {}
+        for day, key in cur.fetchall():
+            by_day.setdefault(day, []).append(key)
+        if not by_day:
+            return 0
+
+        for day, keys in by_day.items():
+            digests = KeyDigestSet.from_keys(keys)
+            cur.execute("SELECT digests FROM trade_key_digests WHERE store = ? AND session_date = ?",
+                        (self.table, day))
+            row = cur.fetchone()
+            if row:
+                digests = digests.merge(KeyDigestSet.from_bytes(row[0]))
+            cur.execute(
+                "INSERT OR REPLACE INTO trade_key_digests (store, session_date, key_count, digests) VALUES (?, ?, ?, ?)",
+                (self.table, day, len(digests), digests.to_bytes())
+            )
+        cur.execute(f"DELETE FROM {self.table} WHERE session_date < ?", (cutoff,))
+        self.conn.commit()
+
+        compacted = sum(len(k) for k in by_day.values())
+        self.logger.info(f"Compacted {compacted} {self.table} keys from {len(by_day)} days before {cutoff}")
+        return compacted
+
+    def _load_session_keys(self):
+        cur = self.conn.cursor()
+        cur.execute(f"SELECT trade_key FROM {self.table} WHERE session_date = ?", (self.session_date,))
+        return set(r[0] for r in cur.fetchall())
+
+    def _load_lookback(self):
+        if not self.lookback_days:
+            return KeyDigestSet()
+        start = self._days_before(self.lookback_days)
+        cur = self.conn.cursor()
+        cur.execute(
+            f"SELECT trade_key FROM {self.table} WHERE session_date >= ? AND session_date < ?",
+            (start, self.session_date)
+        )
+        lookback = KeyDigestSet.from_keys(r[0] for r in cur.fetchall())
+        cur.execute(
+            "SELECT digests FROM trade_key_digests WHERE store = ? AND session_date >= ? AND session_date < ?",
+            (self.table, start, self.session_date)
+        )
+        for (blob,) in cur.fetchall():
+            lookback = lookback.merge(KeyDigestSet.from_bytes(blob))
+        return lookback
+
+    def roll(self, today=None):
+        """Start a new session when the trading day changes; True if it did"""
+        today = today or datetime.now().date().isoformat()
+        if today == self.session_date:
+            return False
+        previous = self.keys
+        self.session_date = today
+        self.keys = set()
+        if self.lookback_days:
+            self.lookback = self.lookback.merge(KeyDigestSet.from_keys(previous))
+        self.logger.info(f"New trading session {today} for {self.table}")
+        return True
+
+    # set-like interface
+    def __contains__(self, key):
+        return key in self.keys or (len(self.lookback) > 0 and self.cross_day(key) and key in self.lookback)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def add(self, key):
+        self.keys.add(key)
+
+    def update(self, keys):
+        self.keys.update(keys)
+
+    def discard(self, key):
+        self.keys.discard(key)
+
+    def clear(self):
+        self.keys.clear()
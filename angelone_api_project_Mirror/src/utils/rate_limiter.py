@@ -0,0 +1,183 @@
+import logging
+import threading
+import time
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `capacity`"""
+
+    def __init__(self, rate, capacity=None, now=0.0):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = now
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now, reserve=0.0):
+        """Seconds until a token can be taken while leaving `reserve` behind"""
+        self._refill(now)
+        missing = 1.0 + reserve - self.tokens
+        return 0.0 if missing <= 0 else missing / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1.0
+
+
+class AccountLimiter:
+    """
+    Buckets for one account: one per endpoint plus an account-wide one.
+    Order calls skip ahead of waiting reads, and reads may not use the
+    account bucket's last `order_reserve` tokens.
+    """
+
+    def __init__(self, limits, account_rate, order_reserve, clock):
+        self.limits = limits
+        self.order_reserve = order_reserve
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._buckets = {}
+        self._account = TokenBucket(account_rate, now=clock())
+        self._orders_waiting = 0
+
+    def _bucket(self, method):
+        bucket = self._buckets.get(method)
+        if bucket is None and method in self.limits:
+            bucket = self._buckets[method] = TokenBucket(self.limits[method], now=self._clock())
+        return bucket
+
+    def acquire(self, method, is_order):
+        """Block until the call may go out; returns seconds waited"""
+        started = self._clock()
+        throttled = False
+        with self._cond:
+            if is_order:
+                self._orders_waiting += 1
+            try:
+                while True:
+                    now = self._clock()
+                    bucket = self._bucket(method)
+                    wait = self._account.wait_time(now, reserve=0 if is_order else self.order_reserve)
+                    if bucket is not None:
+                        wait = max(wait, bucket.wait_time(now))
+                    if not is_order and self._orders_waiting:
+                        # let queued orders through first; they notify when done
+                        throttled = True
+                        self._cond.wait(max(wait, 0.05))
+                        continue
+                    if wait <= 0:
+                        self._account.take(now)
+                        if bucket is not None:
+                            bucket.take(now)
+                        return now - started if throttled else 0.0
+                    throttled = True
+                    self._cond.wait(wait)
+            finally:
+                if is_order:
+                    self._orders_waiting -= 1
+                    self._cond.notify_all()
+
+
+class RateLimiter:
+    """
+    Token-bucket throttle in front of SmartConnect calls, per account and
+    per endpoint, using Angel One's published per-second limits. Calls wait
+    for a token instead of running into broker rate-limit errors; order
+    placement has priority over reads.
+    """
+
+    # Angel One SmartAPI requests per second
+    DEFAULT_LIMITS = {
+        'placeOrder': 20,
+        'modifyOrder': 20,
+        'cancelOrder': 20,
+        'orderBook': 1,
+        'tradeBook': 1,
+        'ltpData': 10,
+        'getMarketData': 10,
+        'searchScrip': 1,
+        'search_scrip': 1,
+        'holding': 1,
+        'allholding': 1,
+        'position': 1,
+        'rmsLimit': 2,
+        'getCandleData': 3,
+        'individual_order_details': 10
+    }
+    ORDER_METHODS = ('placeOrder', 'modifyOrder', 'cancelOrder')
+
+    def __init__(self, settings, clock=time.monotonic):
+        self.logger = logging.getLogger('rate_limiter')
+        self.limits = dict(self.DEFAULT_LIMITS, **(settings.get('rate_limits') or {}))
+        self.account_rate = settings.get('rate_limit_account_per_second', 20)
+        self.order_reserve = settings.get('rate_limit_order_reserve', 2)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._accounts = {}
+        self._stats = {}  # (account_id, method) -> [calls, throttled, total_wait, max_wait]
+
+    def _account(self, account_id):
+        with self._lock:
+            limiter = self._accounts.get(account_id)
+            if limiter is None:
+                limiter = self._accounts[account_id] = AccountLimiter(
+                    self.limits, self.account_rate, self.order_reserve, self._clock)
+            return limiter
+
+    def acquire(self, account_id, method):
+        """Wait for a token for `method` on `account_id`; returns seconds waited"""
+        waited = self._account(account_id).acquire(method, method in self.ORDER_METHODS)
+        with self._lock:
+            stats = self._stats.setdefault((account_id, method), [0, 0, 0.0, 0.0])
+            stats[0] += 1
+            if waited > 0:
+                stats[1] += 1
+                stats[2] += waited
+                stats[3] = max(stats[3], waited)
+        if waited > 0.5:
+            self.logger.info(f"Throttled {method} on {account_id} for {waited * 1000:.0f}ms")
+        return waited
+
+    def wrap(self, connection, account_id):
+        return RateLimitedConnection(connection, self, account_id)
+
+    def get_stats(self):
+        """Get throttling statistics (wait times in ms)"""
+        with self._lock:
+            items = list(self._stats.items())
+        return {
+            'calls': sum(s[0] for _, s in items),
+            'throttled_calls': sum(s[1] for _, s in items),
+            'throttle_wait_ms': round(sum(s[2] for _, s in items) * 1000, 1),
+            'by_endpoint': {
+                f"{account_id}.{method}": {
+                    'calls': s[0],
+                    'throttled': s[1],
+                    'total_wait_ms': round(s[2] * 1000, 1),
+                    'max_wait_ms': round(s[3] * 1000, 1)
+                } for (account_id, method), s in items
+            }
+        }
+
+
+class RateLimitedConnection:
+    """SmartConnect proxy that takes a rate-limit token before every API call"""
+
+    def __init__(self, connection, limiter, account_id):
+        self._connection = connection
+        self._limiter = limiter
+        self._account_id = account_id
+
+    def __getattr__(self, name):
+        attr = getattr(self._connection, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        def limited(*args, **kwargs):
+            self._limiter.acquire(self._account_id, name)
+            return attr(*args, **kwargs)
+        return limited
@@ -0,0 +1,227 @@
+import logging
+import random
+import re
+import threading
+import time
+
+import requests
+from SmartApi.smartExceptions import (DataException, InputException, NetworkException, OrderException,
+                                      PermissionException, TokenException)
+
+OK = 'ok'
+RETRYABLE = 'retryable'
+PERMANENT = 'permanent'
+
+# Angel One error codes worth another attempt (server-side hiccups)
+RETRYABLE_CODES = ('AB1004', 'AB2000', 'AB2001')
+RETRYABLE_PATTERN = re.compile(
+    r'try after|timed? ?out|temporar|exceeding access rate|too many requests|rate limit|'
+    r'connection|network|unavailable|bad gateway|gateway|reset by peer', re.IGNORECASE)
+# Rejections the broker will repeat however often we ask
+PERMANENT_PATTERN = re.compile(
+    r'insufficient|margin|invalid|not found|blocked|not allowed|exceeds|freeze|price band|circuit limit|'
+    r'token expired|session expired|not login', re.IGNORECASE)
+
+
+def classify(response=None, error=None):
+    """
+    OK, RETRYABLE or PERMANENT for one broker call.
+
+    Network errors and server-side failures are RETRYABLE; rejections
+    that will not change on a retry (margin, invalid symbol or params,
+    expired session) are PERMANENT. Unrecognised failures are retried.
+    """
+    if error is not None:
+        if isinstance(error, (InputException, OrderException, PermissionException, TokenException)):
+            return PERMANENT
+        if isinstance(error, (NetworkException, DataException, requests.exceptions.RequestException,
+                              ConnectionError, TimeoutError)):
+            return RETRYABLE
+        return PERMANENT if PERMANENT_PATTERN.search(str(error)) else RETRYABLE
+    if response is None:
+        return RETRYABLE
+    if not isinstance(response, dict) or 'status' not in response or response.get('status'):
+        return OK
+    code = str(response.get('errorcode') or '')
+    message = str(response.get('message') or '')
+    if code in RETRYABLE_CODES or RETRYABLE_PATTERN.search(message):
+        return RETRYABLE
+    if code or PERMANENT_PATTERN.search(message):
+        return PERMANENT
+    return RETRYABLE
+
+
+def policy_for(auth_manager, settings):
+    """The account manager's shared policy (one set of breakers), else a new one"""
+    policy = getattr(auth_manager, 'retry_policy', None)
+    return policy if isinstance(policy, RetryPolicy) else RetryPolicy(settings)
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive retryable failures and fails calls
+    fast for `reset_seconds`; then lets one trial call through (half-open)
+    and closes again on its success.
+    """
+
+    def __init__(self, threshold, reset_seconds, clock):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started = None
+        self.opens = 0
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if self._clock() - self.opened_at >= self.reset_seconds else 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            now = self._clock()
+            # a trial whose outcome never came back (abandoned call) frees up after reset_seconds
+            if state == 'half_open' and (self.trial_started is None
+                                         or now - self.trial_started >= self.reset_seconds):
+                self.trial_started = now
+                return True
+            return False
+
+    def record(self, kind):
+        """Outcome of an allowed call; permanent rejections still mean the broker is up"""
+        with self._lock:
+            self.trial_started = None
+            if kind != RETRYABLE:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    self.opens += 1
+                self.opened_at = self._clock()
+
+
+class RetryPolicy:
+    """
+    One retry policy for broker calls: error classification, jittered
+    exponential backoff and a circuit breaker per account and endpoint, so
+    hopeless calls are not retried and calls to a degraded endpoint fail
+    fast instead of queueing up timeouts.
+    """
+
+    def __init__(self, settings, clock=time.monotonic, sleep=time.sleep, rng=None):
+        self.logger = logging.getLogger('retry_policy')
+        self.base_delay = settings.get('retry_delay', 2)
+        self.max_delay = settings.get('retry_max_delay', 10)
+        self.threshold = settings.get('circuit_failure_threshold', 5)
+        self.reset_seconds = settings.get('circuit_reset_seconds', 10)
+        self._clock = clock
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._breakers = {}
+        self._stats = {}  # endpoint key -> [calls, retries, permanent, fast_fails]
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff before retry number `attempt + 1`"""
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def sleep(self, attempt, deadline=None):
+        """Back off, never past a trade's deadline"""
+        delay = self.backoff(attempt)
+        if deadline is not None:
+            delay = min(delay, max(0.0, deadline.remaining()))
+        if delay > 0:
+            self._sleep(delay)
+
+    def breaker(self, account_id, endpoint):
+        key = f"{account_id}.{endpoint}" if account_id else endpoint
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(self.threshold, self.reset_seconds, self._clock)
+            return breaker
+
+    def _count(self, account_id, endpoint, index):
+        key = f"{account_id}.{endpoint}" if account_id else endpoint
+        with self._lock:
+            self._stats.setdefault(key, [0, 0, 0, 0])[index] += 1
+
+    def allow(self, account_id, endpoint):
+        """False while the endpoint's circuit is open (counted as a fast fail)"""
+        if self.breaker(account_id, endpoint).allow():
+            return True
+        self._count(account_id, endpoint, 3)
+        return False
+
+    def record(self, account_id, endpoint, kind, attempt=0):
+        """Feed one call's outcome to the breaker and stats"""
+        self.breaker(account_id, endpoint).record(kind)
+        self._count(account_id, endpoint, 0)
+        if attempt:
+            self._count(account_id, endpoint, 1)
+        if kind == PERMANENT:
+            self._count(account_id, endpoint, 2)
+
+    def call(self, endpoint, func, *args, account_id=None, attempts=3, deadline=None, **kwargs):
+        """
+        func(*args, **kwargs) with retries for retryable failures only.
+        Returns the last response (a status False response with
+        'circuit_open': True if the circuit is open); the last exception is
+        raised once attempts are used up.
+        """
+        response, error = None, None
+        for attempt in range(max(1, attempts)):
+            if attempt and deadline is not None and deadline.expired():
+                break
+            if not self.allow(account_id, endpoint):
+                message = f"{endpoint} circuit open for {account_id or 'broker'} - failing fast"
+                self.logger.warning(message)
+                return {'status': False, 'message': message, 'circuit_open': True}
+            try:
+                response, error = func(*args, **kwargs), None
+            except Exception as e:
+                response, error = None, e
+            kind = classify(response, error)
+            self.record(account_id, endpoint, kind, attempt)
+            if kind == OK:
+                return response
+            detail = error if error is not None else (response or {}).get('message', 'no response')
+            self.logger.warning(f"{endpoint} attempt {attempt + 1}/{attempts} failed ({kind}): {detail}")
+            if kind == PERMANENT:
+                break
+            if attempt < attempts - 1:
+                self.sleep(attempt, deadline)
+        if error is not None:
+            raise error
+        return response
+
+    def get_stats(self):
+        """Retries, permanent failures and circuit state per account and endpoint"""
+        with self._lock:
+            stats = {key: list(s) for key, s in self._stats.items()}
+            breakers = dict(self._breakers)
+        return {
+            'calls': sum(s[0] for s in stats.values()),
+            'retries': sum(s[1] for s in stats.values()),
+            'permanent_failures': sum(s[2] for s in stats.values()),
+            'fast_fails': sum(s[3] for s in stats.values()),
+            'open_circuits': [key for key, b in breakers.items() if b.state != 'closed'],
+            'by_endpoint': {
+                key: {
+                    'calls': s[0],
+                    'retries': s[1],
+                    'permanent': s[2],
+                    'fast_fails': s[3],
+                    'circuit': breakers[key].state if key in breakers else 'closed',
+                    'circuit_opens': breakers[key].opens if key in breakers else 0
+                } for key, s in stats.items()
+            }
+        }
@@ -0,0 +1,97 @@
+import re
+from collections import namedtuple
+from datetime import date
+from functools import lru_cache
+
+_MONTHS = {m: i for i, m in enumerate(
+    ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC'], start=1)}
+
+# Angel One derivatives: <UNDERLYING><DDMONYY><STRIKE><CE|PE> or <UNDERLYING><DDMONYY>FUT
+_DAILY_EXPIRY = re.compile(
+    r'^(?P<underlying>[A-Z&-]+?)(?P<day>\d{2})(?P<month>[A-Z]{3})(?P<year>\d{2})'
+    r'(?:(?P<strike>\d+(?:\.\d+)?)(?P<opt>CE|PE)|(?P<fut>FUT))$')
+# NSE monthly style: <UNDERLYING><YY><MON><STRIKE><CE|PE> (e.g. NIFTY25NOV23400CE)
+_MONTHLY_EXPIRY = re.compile(
+    r'^(?P<underlying>[A-Z&-]+?)(?P<year>\d{2})(?P<month>[A-Z]{3})'
+    r'(?:(?P<strike>\d+(?:\.\d+)?)(?P<opt>CE|PE)|(?P<fut>FUT))$')
+_PLAIN = re.compile(r'^[A-Z&-]+$')
+
+
+class SymbolInfo(namedtuple('SymbolInfo', 'symbol underlying expiry strike instrument_type')):
+    """
+    Parsed tradingsymbol. expiry is a date (or (year, month) for monthly-style
+    symbols), strike a float, instrument_type 'CE', 'PE', 'FUT' or None for
+    plain symbols.
+    """
+    __slots__ = ()
+
+    @property
+    def is_option(self):
+        return self.instrument_type in ('CE', 'PE')
+
+    @property
+    def is_future(self):
+        return self.instrument_type == 'FUT'
+
+    @property
+    def is_nifty_option(self):
+        """NIFTY-family index option (NIFTY, BANKNIFTY, FINNIFTY, MIDCPNIFTY...)"""
+        return self.is_option and 'NIFTY' in self.underlying
+
+
+def _from_match(symbol, match, daily):
+    month = _MONTHS.get(match.group('month'))
+    if not month:
+        return None
+    year = 2000 + int(match.group('year'))
+    if daily:
+        try:
+            expiry = date(year, month, int(match.group('day')))
+        except ValueError:
+            return None
+    else:
+        expiry = (year, month)
+    strike = match.group('strike')
+    return SymbolInfo(symbol, match.group('underlying'), expiry,
+                      float(strike) if strike else None,
+                      match.group('opt') or match.group('fut'))
+
+
+@lru_cache(maxsize=4096)
+def parse_symbol(symbol):
+    """
+    Parse an Angel One tradingsymbol into a SymbolInfo (cached per symbol).
+    Returns None for empty or unrecognisable symbols.
+    """
+    if not symbol or not isinstance(symbol, str):
+        return None
+    symbol = symbol.strip().upper()
+
+    daily = _DAILY_EXPIRY.match(symbol)
+    monthly = _MONTHLY_EXPIRY.match(symbol)
+    parsed_daily = _from_match(symbol, daily, True) if daily else None
+    parsed_monthly = _from_match(symbol, monthly, False) if monthly else None
+
+    # 'NIFTY25NOV23400CE' also matches DDMONYY with strike 400; index strikes
+    # have 4+ digits, so prefer the monthly reading in that case
+    if parsed_daily and parsed_monthly and parsed_daily.is_option:
+        if parsed_daily.strike < 1000 <= parsed_monthly.strike:
+            return parsed_monthly
+    if parsed_daily or parsed_monthly:
+        return parsed_daily or parsed_monthly
+
+    if _PLAIN.match(symbol):
+        return SymbolInfo(symbol, symbol, None, None, None)
+    return None
+
+
+def underlying_of(symbol):
+    """Underlying name for a symbol ('' if unparseable)"""
+    info = parse_symbol(symbol)
+    return info.underlying if info else ''
+
+
+def is_nifty_option(symbol):
+    """True for NIFTY-family index options"""
+    info = parse_symbol(symbol)
+    return bool(info and info.is_nifty_option)
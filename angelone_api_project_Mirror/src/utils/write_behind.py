@@ -0,0 +1,127 @@
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+
+class WriteBehindQueue:
+    """
+    Background SQLite writer: callers enqueue statements and return
+    immediately, a writer thread commits them in batches (one transaction
+    per flush request or every `flush_interval_ms`).
+
+    In-memory state stays authoritative - this only makes it durable.
+    """
+
+    _FLUSH = object()
+    _STOP = object()
+
+    def __init__(self, db_path, flush_interval_ms=50, name='write_behind'):
+        self.db_path = db_path
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.logger = logging.getLogger(name)
+        self._queue = queue.Queue()
+        self.batches_written = 0
+        self.rows_written = 0
+        self.errors = 0
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name=name)
+        self._thread.daemon = True
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, sql, params=()):
+        """Queue a write; never blocks on disk"""
+        if self._closed:
+            self.logger.warning("Write-behind queue closed - dropping write")
+            return
+        self._queue.put((sql, params))
+
+    def flush(self, wait=True, timeout=5):
+        """Commit everything queued so far (optionally waiting for it)"""
+        if self._closed:
+            return True
+        done = threading.Event()
+        self._queue.put((self._FLUSH, done))
+        return done.wait(timeout) if wait else True
+
+    def close(self, timeout=5):
+        """Flush pending writes and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        # the exit hook would keep every closed queue alive for the life of the process
+        atexit.unregister(self.close)
+        self._queue.put((self._STOP, None))
+        self._thread.join(timeout)
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            while True:
+                item = self._queue.get()
+                batch, waiters, stop = [], [], False
+                deadline = time.monotonic() + self.flush_interval
+
+                # Collect until the interval expires or a flush/stop arrives
+                while True:
+                    if item[0] is self._STOP:
+                        stop = True
+                        break
+                    if item[0] is self._FLUSH:
+                        waiters.append(item[1])
+                        break
+                    batch.append(item)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+
+                # Pick up anything else already queued without waiting
+                while not stop:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item[0] is self._STOP:
+                        stop = True
+                    elif item[0] is self._FLUSH:
+                        waiters.append(item[1])
+                    else:
+                        batch.append(item)
+
+                self._write_batch(conn, batch)
+                for done in waiters:
+                    done.set()
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn, batch):
+        if not batch:
+            return
+        try:
+            with conn:
+                for sql, params in batch:
+                    conn.execute(sql, params)
+            self.batches_written += 1
+            self.rows_written += len(batch)
+        except sqlite3.Error as e:
+            self.errors += 1
+            self.logger.error(f"Write-behind batch of {len(batch)} failed: {e}")
+
+    def get_stats(self):
+        """Get writer statistics"""
+        return {
+            'pending_writes': self._queue.qsize(),
+            'batches_written': self.batches_written,
+            'rows_written': self.rows_written,
+            'write_errors': self.errors
+        }
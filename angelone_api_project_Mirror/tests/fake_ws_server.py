@@ -0,0 +1,96 @@
+"""Minimal local WebSocket server that replays scripted order-update messages"""
+import base64
+import hashlib
+import json
+import socket
+import struct
+import threading
+
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+
+class FakeOrderUpdateServer:
+    def __init__(self, messages):
+        self.messages = messages
+        self.request_headers = {}
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(('127.0.0.1', 0))
+        self._sock.listen(1)
+        self.url = f"ws://127.0.0.1:{self._sock.getsockname()[1]}"
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+
+    @staticmethod
+    def _frame(payload, opcode=0x1):
+        header = bytes([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header += bytes([length])
+        elif length < 65536:
+            header += bytes([126]) + struct.pack('>H', length)
+        else:
+            header += bytes([127]) + struct.pack('>Q', length)
+        return header + payload
+
+    def _recv_exact(self, conn, n):
+        data = b''
+        while len(data) < n:
+            chunk = conn.recv(n - len(data))
+            if not chunk:
+                raise ConnectionError('client closed')
+            data += chunk
+        return data
+
+    def _serve(self):
+        try:
+            conn, _ = self._sock.accept()
+        except OSError:
+            return
+        with conn:
+            request = b''
+            while b'\r\n\r\n' not in request:
+                request += conn.recv(4096)
+            for line in request.decode().split('\r\n')[1:]:
+                if ': ' in line:
+                    key, value = line.split(': ', 1)
+                    self.request_headers[key.lower()] = value
+            accept = base64.b64encode(hashlib.sha1(
+                (self.request_headers['sec-websocket-key'] + WS_GUID).encode()).digest()).decode()
+            conn.sendall((
+                'HTTP/1.1 101 Switching Protocols\r\n'
+                'Upgrade: websocket\r\nConnection: Upgrade\r\n'
+                f'Sec-WebSocket-Accept: {accept}\r\n\r\n').encode())
+
+            for message in self.messages:
+                text = message if isinstance(message, str) else json.dumps(message)
+                conn.sendall(self._frame(text.encode()))
+
+            # Answer pings / close until the client goes away
+            try:
+                while True:
+                    b0, b1 = self._recv_exact(conn, 2)
+                    length = b1 & 0x7F
+                    if length == 126:
+                        length = struct.unpack('>H', self._recv_exact(conn, 2))[0]
+                    elif length == 127:
+                        length = struct.unpack('>Q', self._recv_exact(conn, 8))[0]
+                    mask = self._recv_exact(conn, 4) if b1 & 0x80 else b'\x00' * 4
+                    payload = bytes(c ^ mask[i % 4] for i, c in enumerate(self._recv_exact(conn, length)))
+                    opcode = b0 & 0x0F
+                    if opcode == 0x8:
+                        conn.sendall(self._frame(payload, opcode=0x8))
+                        return
+                    if opcode == 0x9:
+                        conn.sendall(self._frame(payload, opcode=0xA))
+            except (ConnectionError, OSError):
+                return
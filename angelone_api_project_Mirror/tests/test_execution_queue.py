@@ -0,0 +1,54 @@
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.mirror.execution_queue import ExecutionQueue
+
+
+def test_per_symbol_order_preserved_and_slow_symbol_does_not_block_others():
+    done = []
+    lock = threading.Lock()
+
+    def handler(trade):
+        if trade['symbol'] == 'SLOW':
+            time.sleep(0.2)
+        with lock:
+            done.append((trade['symbol'], trade['n']))
+
+    prepared = []
+    executor = ExecutionQueue(handler, {'execution_workers': 4}, prepare=prepared.append)
+    executor.start()
+
+    started = time.monotonic()
+    executor.submit_batch([{'symbol': 'SLOW', 'n': i} for i in range(3)])
+    executor.submit_batch([{'symbol': s, 'n': i} for i in range(5) for s in ('A', 'D')])
+    assert time.monotonic() - started < 0.05  # detection never waits
+
+    deadline = time.monotonic() + 5
+    while len(done) < 13 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    executor.stop()
+
+    for symbol in ('SLOW', 'A', 'D'):
+        assert [n for s, n in done if s == symbol] == list(range(3 if symbol == 'SLOW' else 5))
+    # Fast symbols (on other shards) finished while the slow one was still being worked
+    assert done.index(('D', 4)) < done.index(('SLOW', 2))
+    assert len(prepared) == 2
+
+    stats = executor.get_stats()
+    assert (stats['executed'], stats['failed'], stats['depth']) == (13, 0, 0)
+    assert stats['max_service_ms'] >= 200
+
+
+def test_handler_errors_are_counted_not_fatal():
+    def handler(trade):
+        if trade['n'] == 0:
+            raise RuntimeError('broker down')
+
+    executor = ExecutionQueue(handler, {'execution_workers': 1})
+    executor.start()
+    executor.submit_batch([{'symbol': 'A', 'n': 0}, {'symbol': 'A', 'n': 1}])
+    executor.stop()
+    assert (executor.executed, executor.failed) == (2, 1)
@@ -0,0 +1,49 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.detection.fill_aggregator import FillAggregator
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 100.0
+
+    def __call__(self):
+        return self.t
+
+
+def _fill(key, order_id, qty, price, fill_time='10:00:01'):
+    return {'trade_key': key, 'order_id': order_id, 'source_id': 'source_account',
+            'symbol': 'NIFTY25NOV23400CE', 'quantity': qty, 'order_price': price,
+            'trade_price': price, 'trade_time': fill_time, 'order_type': 'BUY'}
+
+
+def test_partial_fills_consolidated_after_window():
+    clock = FakeClock()
+    aggregator = FillAggregator({'fill_aggregation_window_ms': 150}, clock=clock)
+
+    aggregator.add([_fill('k1', 'ORD1', 75, 45.0), _fill('k2', 'ORD1', 75, 46.0)])
+    assert aggregator.pop_ready() == []
+    assert abs(aggregator.seconds_until_ready() - 0.15) < 1e-9
+
+    clock.t += 0.1
+    aggregator.add([_fill('k3', 'ORD1', 150, 47.0, '10:00:02')])
+    clock.t += 0.06
+    ready = aggregator.pop_ready()
+
+    assert len(ready) == 1
+    trade = ready[0]
+    assert trade['quantity'] == 300
+    assert trade['order_price'] == 46.25
+    assert trade['fill_keys'] == ['k1', 'k2', 'k3']
+    assert trade['trade_key'] == 'k1'
+    assert trade['trade_time'] == '10:00:02'
+    assert aggregator.seconds_until_ready() is None
+
+
+def test_fills_without_order_id_pass_through():
+    aggregator = FillAggregator({'fill_aggregation_window_ms': 150})
+    aggregator.add([_fill('k1', '', 75, 45.0)])
+    assert aggregator.seconds_until_ready() == 0.0
+    assert [t['trade_key'] for t in aggregator.pop_ready()] == ['k1']
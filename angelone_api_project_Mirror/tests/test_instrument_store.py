@@ -0,0 +1,68 @@
+import sys
+import os
+import json
+from datetime import date
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.utils.instrument_store import InstrumentStore
+from src.mirror.mirror_engine import MirrorEngine
+from unittest.mock import Mock
+
+SCRIP_MASTER = [
+    {'token': '43210', 'symbol': 'NIFTY25NOV2523400CE', 'name': 'NIFTY', 'expiry': '25NOV2025',
+     'strike': '2340000.000000', 'lotsize': '75', 'instrumenttype': 'OPTIDX', 'exch_seg': 'NFO',
+     'tick_size': '5.000000'},
+    {'token': '43211', 'symbol': 'NIFTY25NOV2523400PE', 'name': 'NIFTY', 'expiry': '25NOV2025',
+     'strike': '2340000.000000', 'lotsize': '75', 'instrumenttype': 'OPTIDX', 'exch_seg': 'NFO',
+     'tick_size': '5.000000'},
+    {'token': '51000', 'symbol': 'BANKNIFTY25NOV2550000CE', 'name': 'BANKNIFTY', 'expiry': '25NOV2025',
+     'strike': '5000000.000000', 'lotsize': '35', 'instrumenttype': 'OPTIDX', 'exch_seg': 'NFO',
+     'tick_size': '5.000000'},
+    {'token': '99001', 'symbol': 'NIFTY30DEC9923400CE', 'name': 'NIFTY', 'expiry': '30DEC2099',
+     'strike': '2340000.000000', 'lotsize': '65', 'instrumenttype': 'OPTIDX', 'exch_seg': 'NFO',
+     'tick_size': '5.000000'},
+    {'token': '2885', 'symbol': 'RELIANCE-EQ', 'name': 'RELIANCE', 'expiry': '', 'strike': '-1.000000',
+     'lotsize': '1', 'instrumenttype': '', 'exch_seg': 'NSE', 'tick_size': '5.000000'},
+]
+
+
+def _store(tmp_path):
+    master = tmp_path / 'scrip_master.json'
+    master.write_text(json.dumps(SCRIP_MASTER))
+    store = InstrumentStore(str(tmp_path / 'instruments.db'), local_file=str(master))
+    assert store.ensure_loaded()
+    return store
+
+
+def test_index_by_symbol_and_contract(tmp_path):
+    store = _store(tmp_path)
+    assert len(store) == 4  # NSE cash segment is not indexed
+
+    instrument = store.get('NIFTY25NOV2523400CE')
+    assert (instrument['token'], instrument['strike'], instrument['lot_size']) == ('43210', 23400.0, 75)
+    assert store.find('NIFTY', date(2025, 11, 25), 23400.0, 'PE')['token'] == '43211'
+    # Monthly-style symbol resolves through its parts
+    assert store.token_for('NIFTY25NOV23400CE') == '43210'
+    assert store.get('NIFTY25NOV2599999CE') is None
+
+
+def test_loaded_once_per_day_and_supplies_lot_sizes(tmp_path):
+    store = _store(tmp_path)
+    assert not store.ensure_loaded()
+
+    assert store.lot_size('BANKNIFTY25NOV2550000CE') == 35
+    # Underlying lot size comes from the nearest unexpired contract
+    assert store.lot_size('NIFTY') == 65
+    assert store.lot_sizes(['NIFTY', 'BANKNIFTY', 'SENSEX']) == {'NIFTY': 65}
+    store.close()
+
+
+def test_mirror_engine_uses_index_before_search_scrip(tmp_path):
+    config = Mock()
+    config.get_settings.return_value = {'processed_trades_db': str(tmp_path / 'trades.db')}
+    auth = Mock()
+    engine = MirrorEngine(config, auth, Mock(), instruments=_store(tmp_path))
+
+    assert engine.get_symbol_token('NIFTY25NOV2523400CE') == '43210'
+    auth.get_connection.assert_not_called()
+    engine.close()
@@ -0,0 +1,111 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import threading
+from unittest.mock import Mock
+
+from src.mirror.intent_journal import IntentJournal
+from src.mirror.mirror_engine import MirrorEngine
+
+
+def _trade(key):
+    return {'trade_key': key, 'symbol': 'NIFTY25NOV23400CE', 'quantity': 75, 'order_type': 'BUY',
+            'product_type': 'INTRADAY', 'order_price': 50.0, 'exchange': 'NFO'}
+
+
+def test_open_intents_survive_restart_and_torn_lines(tmp_path):
+    path = str(tmp_path / 'journal.log')
+    journal = IntentJournal(path)
+    journal.intent('k1', 'mirror_account', _trade('k1'))
+    journal.intent('k2', 'mirror_account', _trade('k2'))
+    journal.ack('k1', 'O1')
+    journal.close()
+    with open(path, 'a') as f:
+        f.write('{"op":"ack","id":"k2"')  # crash mid-write
+
+    reopened = IntentJournal(path)
+    assert [i['id'] for i in reopened.pending()] == ['k2']
+    reopened.resolve('k2', 'lost')
+    # today's ack is kept until the session rolls over
+    reopened.compact()
+    assert [r['id'] for r in IntentJournal(path).acked()] == ['k1']
+    reopened.compact(day='2999-01-01')
+    reopened.close()
+    assert open(path).read() == ''
+
+
+def test_concurrent_writers_share_commits(tmp_path):
+    journal = IntentJournal(str(tmp_path / 'journal.log'))
+    threads = [threading.Thread(target=lambda n=n: [journal.intent(f'{n}-{i}', 'mirror_account', _trade('k'))
+                                                    for i in range(50)]) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = journal.get_stats()
+    assert stats['records'] == 400 and stats['open_intents'] == 400
+    assert stats['group_commits'] <= 400
+    journal.close()
+
+
+class DummyConfig:
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def get_settings(self):
+        return {'max_retries': 1, 'retry_delay': 0, 'processed_trades_db': self.db_path}
+
+
+def test_engine_resolves_in_flight_intents_against_order_book(tmp_path):
+    db_path = str(tmp_path / 'trades.db')
+    # A previous run crashed after journaling two intents; only k1's order reached the broker
+    crashed = IntentJournal(str(tmp_path / 'intent_journal.log'))
+    crashed.intent('k1', 'mirror_account', _trade('k1'))
+    crashed.intent('k2', 'mirror_account', _trade('k2'))
+    crashed.close()
+
+    conn = Mock()
+    conn.orderBook.return_value = {'status': True, 'data': [
+        {'orderid': 'O1', 'ordertag': IntentJournal.order_tag('k1'), 'status': 'open'}]}
+    auth = Mock()
+    auth.get_connection.return_value = conn
+    engine = MirrorEngine(DummyConfig(db_path), auth, None)
+
+    lost = engine.recover_intents()
+    assert [t['trade_key'] for t in lost] == ['k2']
+    assert engine.is_already_mirrored('k1') and not engine.is_already_mirrored('k2')
+    assert engine.reconciler.pending_count() == 1
+    assert engine.journal.pending() == []
+
+    # The re-queued trade is placed with its order tag and acked in the journal
+    conn.placeOrder.return_value = {'status': True, 'data': {'orderid': 'O2'}}
+    engine.get_symbol_token = Mock(return_value='TOK')
+    engine.get_current_market_price = Mock(return_value=None)
+    engine.mirroring_enabled = True
+    assert engine.mirror_trade(lost[0])
+    assert conn.placeOrder.call_args[0][0]['ordertag'] == IntentJournal.order_tag('k2')
+    assert engine.journal.pending() == []
+    engine.close()
+
+
+def test_acked_intent_blocks_remirror_after_lost_row(tmp_path):
+    db_path = str(tmp_path / 'trades.db')
+    # Crash after the ack but before the write-behind row was flushed
+    crashed = IntentJournal(str(tmp_path / 'intent_journal.log'))
+    crashed.intent('k1', 'mirror_account', _trade('k1'))
+    crashed.ack('k1', 'O1')
+    crashed.compact()
+    crashed.close()
+
+    conn = Mock()
+    conn.orderBook.return_value = {'status': True, 'data': []}
+    auth = Mock()
+    auth.get_connection.return_value = conn
+    engine = MirrorEngine(DummyConfig(db_path), auth, None)
+    assert engine.recover_intents() == []
+    assert engine.is_already_mirrored('k1')
+    engine.mirroring_enabled = True
+    assert engine.mirror_trade(_trade('k1')) is True
+    conn.placeOrder.assert_not_called()
+    engine.close()
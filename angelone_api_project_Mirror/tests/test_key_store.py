@@ -0,0 +1,70 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import sqlite3
+
+from src.utils.key_store import DayPartitionedKeyStore, KeyDigestSet
+
+
+def _legacy_db(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE processed_trades (trade_key TEXT PRIMARY KEY, first_seen TIMESTAMP)")
+    conn.executemany("INSERT INTO processed_trades VALUES (?, ?)", rows)
+    conn.commit()
+    return conn
+
+
+def test_digest_set_membership():
+    digests = KeyDigestSet.from_keys(['a', 'b', 'c'])
+    assert 'b' in digests and 'z' not in digests
+    assert len(KeyDigestSet.from_bytes(digests.to_bytes())) == 3
+
+
+def test_loads_only_current_session_and_compacts_old_days(tmp_path):
+    conn = _legacy_db(str(tmp_path / 'trades.db'), [
+        ('10:00:01_NIFTY25NOV23400CE_75', '2025-11-01T10:00:02'),
+        ('10:00:01_NIFTY25NOV23500CE_75', '2025-11-11T10:00:02'),
+        ('2025-11-11 10:00:01_NIFTY25NOV23500PE_75', '2025-11-11T10:00:02'),
+        ('11:00:00_NIFTY25NOV23400PE_75', '2025-11-12T11:00:01'),
+    ])
+
+    store = DayPartitionedKeyStore(conn, 'processed_trades', 'first_seen',
+                                   lookback_days=2, retention_days=7, today='2025-11-12')
+
+    # Only today's key is loaded as a string; yesterday is in the digest lookback
+    assert store.keys == {'11:00:00_NIFTY25NOV23400PE_75'}
+    assert '2025-11-11 10:00:01_NIFTY25NOV23500PE_75' in store
+    # ...which only answers for keys that identify a trade across days
+    assert '10:00:01_NIFTY25NOV23500CE_75' not in store
+    assert '10:00:01_NIFTY25NOV23400CE_75' not in store
+
+    # The 11-day-old row was folded into a digest blob
+    assert conn.execute("SELECT COUNT(*) FROM processed_trades").fetchone()[0] == 3
+    assert conn.execute("SELECT key_count FROM trade_key_digests WHERE session_date = '2025-11-01'").fetchone()[0] == 1
+
+
+def test_roll_starts_a_new_session(tmp_path):
+    conn = _legacy_db(str(tmp_path / 'trades.db'), [])
+    store = DayPartitionedKeyStore(conn, 'processed_trades', 'first_seen', today='2025-11-12')
+    store.add('10:00:01_NIFTY25NOV23400CE_75')
+
+    assert store.roll(today='2025-11-13')
+    # Same time-of-day key on the next day is a new trade
+    assert '10:00:01_NIFTY25NOV23400CE_75' not in store
+
+
+def test_same_key_on_a_later_day_survives_restart(tmp_path):
+    path = str(tmp_path / 'trades.db')
+    conn = _legacy_db(path, [('10:00:01_NIFTY25NOV23400CE_75', '2025-11-12T10:00:02')])
+    DayPartitionedKeyStore(conn, 'processed_trades', 'first_seen', today='2025-11-12')
+    pk = [r[1] for r in sorted(conn.execute("PRAGMA table_info(processed_trades)"), key=lambda r: r[5]) if r[5]]
+    assert pk == ['session_date', 'trade_key']
+
+    # Seen again the next day: a second row, not an ignored duplicate
+    conn.execute("INSERT OR IGNORE INTO processed_trades (trade_key, first_seen, session_date) VALUES (?, ?, ?)",
+                 ('10:00:01_NIFTY25NOV23400CE_75', '2025-11-13T10:00:02', '2025-11-13'))
+    conn.commit()
+    restarted = DayPartitionedKeyStore(sqlite3.connect(path), 'processed_trades', 'first_seen',
+                                       today='2025-11-13')
+    assert '10:00:01_NIFTY25NOV23400CE_75' in restarted.keys
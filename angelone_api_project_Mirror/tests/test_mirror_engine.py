@@ -227,5 +227,172 @@ def test_mirror_engine():
         print(f"Mirror engine test failed: {e}")
         raise
 
+
+class MultiAccountConfig:
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def get_settings(self):
+        return {'price_tolerance': 0.02, 'max_retries': 1, 'retry_delay': 0,
+                'processed_trades_db': self.db_path}
+
+    def get_mirror_account_ids(self):
+        return ['mirror_account', 'mirror2_account']
+
+    def get_account(self, account_id):
+        return {'lot_multiplier': 2 if account_id == 'mirror2_account' else 1}
+
+
+def test_mirror_trade_fans_out_to_every_mirror_account(tmp_path):
+    import sqlite3
+    import threading
+
+    barrier = threading.Barrier(2, timeout=5)
+
+    def place(params):
+        barrier.wait()  # both accounts must be placing at the same time
+        return {'status': True, 'data': {'orderid': f"ORD{params['quantity']}"}}
+
+    conns = {'mirror_account': Mock(), 'mirror2_account': Mock()}
+    conns['mirror_account'].placeOrder.side_effect = place
+    conns['mirror2_account'].placeOrder.side_effect = place
+    auth = Mock()
+    auth.get_connection.side_effect = lambda account_id: conns[account_id]
+
+    db_path = str(tmp_path / 'trades.db')
+    engine = MirrorEngine(MultiAccountConfig(db_path), auth, None)
+    engine.get_symbol_token = Mock(return_value='TOK123')
+    engine.get_current_market_price = Mock(return_value=None)
+    engine.mirroring_enabled = True
+
+    trade = {'trade_key': 'k1', 'symbol': 'NIFTY25NOV23400CE', 'quantity': 75, 'order_type': 'BUY',
+             'product_type': 'INTRADAY', 'order_price': 50.0, 'exchange': 'NFO'}
+    assert engine.mirror_trade(trade) is True
+    assert conns['mirror_account'].placeOrder.call_args[0][0]['quantity'] == '75'
+    assert conns['mirror2_account'].placeOrder.call_args[0][0]['quantity'] == '150'
+
+    # Already mirrored on both accounts - no new orders
+    assert engine.mirror_trade(trade) is True
+    assert conns['mirror2_account'].placeOrder.call_count == 1
+
+    stats = engine.get_mirror_stats()['accounts']
+    assert stats['mirror2_account']['mirrored'] == 1
+    assert stats['mirror2_account']['last_latency_ms'] is not None
+    engine.close()
+
+    rows = sqlite3.connect(db_path).execute(
+        "SELECT trade_key, account_id, order_id, status FROM mirrored_trades ORDER BY trade_key").fetchall()
+    assert rows == [('k1', 'mirror_account', 'ORD75', 'placed'),
+                    ('mirror2_account:k1', 'mirror2_account', 'ORD150', 'placed')]
+
+
+class DeadlineConfig(MultiAccountConfig):
+    def get_settings(self):
+        return dict(super().get_settings(), max_retries=5, retry_delay=0.05, mirror_deadline_seconds=2)
+
+    def get_mirror_account_ids(self):
+        return ['mirror_account']
+
+
+def test_stale_fill_is_abandoned_and_recorded(tmp_path):
+    import sqlite3
+    from datetime import datetime
+
+    conn = Mock()
+    auth = Mock()
+    auth.get_connection.return_value = conn
+    db_path = str(tmp_path / 'trades.db')
+    engine = MirrorEngine(DeadlineConfig(db_path), auth, None,
+                          now_func=lambda: datetime(2025, 11, 20, 10, 0, 15))
+    engine.get_symbol_token = Mock(return_value='TOK123')
+    engine.mirroring_enabled = True
+
+    trade = {'trade_key': 'late', 'symbol': 'NIFTY25NOV23400CE', 'quantity': 75, 'order_type': 'BUY',
+             'product_type': 'INTRADAY', 'order_price': 50.0, 'exchange': 'NFO', 'trade_time': '10:00:00'}
+    assert engine.mirror_trade(trade) is False
+    conn.placeOrder.assert_not_called()
+    conn.ltpData.assert_not_called()
+
+    stats = engine.get_mirror_stats()['deadline']
+    assert stats['aborts'] == {'dispatch': 1}
+    assert 'deadline exceeded' in stats['last_abort']
+    engine.close()
+    row = sqlite3.connect(db_path).execute("SELECT status, error FROM mirrored_trades").fetchone()
+    assert row[0] == 'expired' and 'budget 2s' in row[1]
+
+
+def test_corrections_ignore_the_deadline_but_recovered_intents_do_not(tmp_path):
+    from datetime import datetime
+
+    conn = Mock()
+    conn.placeOrder.return_value = {'status': True, 'data': {'orderid': 'ORD1'}}
+    auth = Mock()
+    auth.get_connection.return_value = conn
+    engine = MirrorEngine(DeadlineConfig(str(tmp_path / 'trades.db')), auth, None,
+                          now_func=lambda: datetime(2025, 11, 20, 10, 5, 0))
+    engine.get_symbol_token = Mock(return_value='TOK123')
+    engine.get_current_market_price = Mock(return_value=None)
+    engine.mirroring_enabled = True
+
+    trade = {'symbol': 'NIFTY25NOV23400CE', 'quantity': 75, 'order_type': 'BUY',
+             'product_type': 'INTRADAY', 'order_price': 50.0, 'exchange': 'NFO', 'trade_time': '10:00:00'}
+    assert engine.mirror_trade(dict(trade, trade_key='fix', status='correction')) is True
+    assert conn.placeOrder.call_count == 1
+    assert engine.get_mirror_stats()['deadline']['aborts'] == {}
+
+    # An intent lost in a crash and re-queued 5 minutes after its fill is too late
+    assert engine.mirror_trade(dict(trade, trade_key='lost')) is False
+    assert conn.placeOrder.call_count == 1
+    assert engine.get_mirror_stats()['deadline']['aborts'] == {'dispatch': 1}
+    engine.close()
+
+
+def test_correction_still_gets_the_price_check(tmp_path, caplog):
+    from datetime import datetime
+
+    conn = Mock()
+    conn.placeOrder.return_value = {'status': True, 'data': {'orderid': 'ORD1'}}
+    conn.ltpData.return_value = {'status': True, 'data': {'ltp': 80.0}}
+    auth = Mock()
+    auth.get_connection.return_value = conn
+    engine = MirrorEngine(DeadlineConfig(str(tmp_path / 'trades.db')), auth, None,
+                          now_func=lambda: datetime(2025, 11, 20, 10, 5, 0))
+    engine.get_symbol_token = Mock(return_value='TOK123')
+    engine.mirroring_enabled = True
+
+    trade = {'trade_key': 'fix', 'symbol': 'NIFTY25NOV23400CE', 'quantity': 75, 'order_type': 'BUY',
+             'product_type': 'INTRADAY', 'order_price': 50.0, 'exchange': 'NFO', 'trade_time': '10:00:00',
+             'status': 'correction'}
+    assert engine._deadline_for(trade) is None
+    with caplog.at_level('WARNING', logger='mirror_engine'):
+        assert engine.mirror_trade(trade) is True
+    conn.ltpData.assert_called_once()
+    assert 'Price out of tolerance' in caplog.text
+    assert 'Price check failed' not in caplog.text
+    engine.close()
+
+
+def test_retries_stop_at_the_deadline(tmp_path):
+    from datetime import datetime
+
+    conn = Mock()
+    conn.placeOrder.return_value = {'status': False, 'message': 'RMS reject'}
+    auth = Mock()
+    auth.get_connection.return_value = conn
+    # Fill was 1.9s ago: 0.1s of budget left, retries are 0.05s apart
+    engine = MirrorEngine(DeadlineConfig(str(tmp_path / 'trades.db')), auth, None,
+                          now_func=lambda: datetime(2025, 11, 20, 10, 0, 1, 900000))
+    engine.get_symbol_token = Mock(return_value='TOK123')
+    engine.get_current_market_price = Mock(return_value=None)
+    engine.mirroring_enabled = True
+
+    trade = {'trade_key': 'k', 'symbol': 'NIFTY25NOV23400CE', 'quantity': 75, 'order_type': 'BUY',
+             'product_type': 'INTRADAY', 'order_price': 50.0, 'exchange': 'NFO', 'trade_time': '10:00:00'}
+    assert engine.mirror_trade(trade) is False
+    assert 1 <= conn.placeOrder.call_count < 5
+    assert sum(engine.get_mirror_stats()['deadline']['aborts'].values()) == 1
+    engine.close()
+
+
 if __name__ == "__main__":
-    test_mirror_engine()
\ No newline at end of file
+    test_mirror_engine()
@@ -0,0 +1,204 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import sqlite3
+from unittest.mock import Mock
+
+from src.mirror.mirror_engine import MirrorEngine
+
+
+class DummyConfig:
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def get_settings(self):
+        return {'max_retries': 1, 'retry_delay': 0, 'processed_trades_db': self.db_path,
+                'reconcile_interval': 60}
+
+
+def _trade(key, symbol):
+    return {'trade_key': key, 'symbol': symbol, 'quantity': 75, 'order_type': 'BUY',
+            'product_type': 'INTRADAY', 'order_price': 50.0, 'exchange': 'NFO'}
+
+
+def _engine(tmp_path, conn):
+    auth = Mock()
+    auth.get_connection.return_value = conn
+    engine = MirrorEngine(DummyConfig(str(tmp_path / 'trades.db')), auth, None)
+    engine.get_symbol_token = Mock(return_value='TOK')
+    engine.get_current_market_price = Mock(return_value=None)
+    engine.mirroring_enabled = True
+    return engine
+
+
+def test_pending_orders_are_reconciled_with_one_order_book_call(tmp_path):
+    conn = Mock()
+    conn.placeOrder.side_effect = [{'status': True, 'data': {'orderid': 'O1'}},
+                                   {'status': True, 'data': {'orderid': 'O2'}}]
+    conn.orderBook.return_value = {'status': True, 'data': [
+        {'orderid': 'O1', 'status': 'complete', 'averageprice': 51.5, 'filledshares': '75', 'text': ''},
+        {'orderid': 'O2', 'status': 'rejected', 'averageprice': 0, 'filledshares': '0',
+         'text': 'RMS:Margin Exceeds'},
+        {'orderid': 'OTHER', 'status': 'complete'}
+    ]}
+    engine = _engine(tmp_path, conn)
+    alerts = []
+    engine.reconciler.on_alert = alerts.append
+
+    assert engine.mirror_trade(_trade('k1', 'NIFTY25NOV23400CE'))
+    assert engine.mirror_trade(_trade('k2', 'NIFTY25NOV23500CE'))
+    assert engine.reconciler.pending_count() == 2
+
+    assert engine.reconcile_orders() == 2
+    assert conn.orderBook.call_count == 1
+    assert engine.reconciler.pending_count() == 0
+    assert len(alerts) == 1 and 'RMS:Margin Exceeds' in alerts[0]
+
+    # Nothing pending and inside the interval - no further orderBook calls
+    engine.reconcile_orders()
+    assert conn.orderBook.call_count == 1
+
+    engine.close()
+    rows = dict((r[0], r[1:]) for r in sqlite3.connect(str(tmp_path / 'trades.db')).execute(
+        "SELECT trade_key, order_id, status, fill_price, filled_qty, error FROM mirrored_trades"))
+    assert rows['k1'] == ('O1', 'complete', 51.5, 75, None)
+    assert rows['k2'] == ('O2', 'rejected', None, 0, 'RMS:Margin Exceeds')
+    stats = engine.get_mirror_stats()['reconciliation']
+    assert stats['filled'] == 1 and stats['rejected'] == 1
+
+
+def test_open_orders_stay_pending_across_restart(tmp_path):
+    conn = Mock()
+    conn.placeOrder.return_value = {'status': True, 'data': {'orderid': 'O1'}}
+    conn.orderBook.return_value = {'status': True, 'data': [
+        {'orderid': 'O1', 'status': 'open', 'filledshares': '0'}]}
+    engine = _engine(tmp_path, conn)
+    assert engine.mirror_trade(_trade('k1', 'NIFTY25NOV23400CE'))
+    assert engine.reconcile_orders() == 0
+    engine.close()
+
+    restarted = _engine(tmp_path, conn)
+    assert restarted.reconciler.pending_count() == 1
+    restarted.close()
+
+
+class ChaseConfig(DummyConfig):
+    def get_settings(self):
+        return dict(super().get_settings(), order_mode='limit_chase', price_tolerance=0.02,
+                    chase_interval_ms=0, chase_steps=2)
+
+
+def test_limit_chase_steps_toward_market_then_converts(tmp_path):
+    conn = Mock()
+    conn.placeOrder.return_value = {'status': True, 'data': {'orderid': 'O1'}}
+    conn.modifyOrder.return_value = {'status': True, 'data': {'orderid': 'O1'}}
+    conn.orderBook.return_value = {'status': True, 'data': [{'orderid': 'O1', 'status': 'open'}]}
+    auth = Mock()
+    auth.get_connection.return_value = conn
+    engine = MirrorEngine(ChaseConfig(str(tmp_path / 'trades.db')), auth, None)
+    engine.get_symbol_token = Mock(return_value='TOK')
+    engine.get_current_market_price = Mock(return_value=60.0)
+    engine.mirroring_enabled = True
+
+    trade = dict(_trade('k1', 'NIFTY25NOV23400CE'), order_price=50.0)
+    assert engine.limit_price(trade) == 51.0
+    assert engine.limit_price(dict(trade, order_type='SELL', order_price=50.03)) == 49.05
+    assert engine.mirror_trade(trade)
+    # the chase runs on timer threads, not on the caller's
+    assert engine.wait_for_chases(timeout=5)
+
+    placed = conn.placeOrder.call_args[0][0]
+    assert (placed['ordertype'], placed['price']) == ('LIMIT', '51.0')
+    modified = [c[0][0] for c in conn.modifyOrder.call_args_list]
+    assert [(m['ordertype'], m['price']) for m in modified] == [('LIMIT', '55.5'), ('LIMIT', '60.0'),
+                                                               ('MARKET', '0')]
+    assert engine.get_mirror_stats()['chase_conversions'] == 1
+    assert engine.positions == {}  # not filled yet
+
+    # The converted order fills; quality is reported per order mode
+    conn.orderBook.return_value = {'status': True, 'data': [
+        {'orderid': 'O1', 'status': 'complete', 'averageprice': 60.5, 'filledshares': '75'}]}
+    assert engine.reconcile_orders(force=True) == 1
+    assert engine.positions == {'NIFTY25NOV23400CE': ('NFO', 75)}
+    quality = engine.reconciler.get_execution_quality()['limit_chase']
+    assert quality['fills'] == 1 and quality['avg_slippage_bps'] == 2100.0
+    engine.close()
+    row = sqlite3.connect(str(tmp_path / 'trades.db')).execute(
+        "SELECT order_mode, chase_steps, fill_price, time_to_fill_ms IS NOT NULL FROM mirrored_trades").fetchone()
+    assert row == ('limit_chase', 3, 60.5, 1)
+
+
+def test_limit_chase_stops_when_filled(tmp_path):
+    conn = Mock()
+    conn.placeOrder.return_value = {'status': True, 'data': {'orderid': 'O1'}}
+    conn.orderBook.return_value = {'status': True, 'data': [
+        {'orderid': 'O1', 'status': 'complete', 'averageprice': 50.5, 'filledshares': '75'}]}
+    auth = Mock()
+    auth.get_connection.return_value = conn
+    engine = MirrorEngine(ChaseConfig(str(tmp_path / 'trades.db')), auth, None)
+    engine.get_symbol_token = Mock(return_value='TOK')
+    engine.mirroring_enabled = True
+
+    assert engine.mirror_trade(dict(_trade('k1', 'NIFTY25NOV23400CE'), order_price=50.0))
+    assert engine.wait_for_chases(timeout=5)
+    conn.modifyOrder.assert_not_called()
+    assert engine.reconciler.pending_count() == 0
+    assert engine.reconciler.get_execution_quality()['limit_chase']['avg_slippage_bps'] == 100.0
+    assert engine.positions == {'NIFTY25NOV23400CE': ('NFO', 75)}
+    engine.close()
+
+
+def test_limit_chase_cancels_at_the_deadline_and_books_no_position(tmp_path):
+    from datetime import datetime
+
+    conn = Mock()
+    conn.placeOrder.return_value = {'status': True, 'data': {'orderid': 'O1'}}
+    conn.cancelOrder.return_value = {'status': True, 'data': {'orderid': 'O1'}}
+    conn.orderBook.return_value = {'status': True, 'data': [{'orderid': 'O1', 'status': 'open'}]}
+    auth = Mock()
+    auth.get_connection.return_value = conn
+
+    class DeadlineChaseConfig(ChaseConfig):
+        def get_settings(self):
+            return dict(super().get_settings(), mirror_deadline_seconds=2, chase_interval_ms=300)
+
+    # Fill was 1.9s ago: the order is accepted in time, the first chase step is too late
+    engine = MirrorEngine(DeadlineChaseConfig(str(tmp_path / 'trades.db')), auth, None,
+                          now_func=lambda: datetime(2025, 11, 20, 10, 0, 1, 900000))
+    engine.get_symbol_token = Mock(return_value='TOK')
+    engine.get_current_market_price = Mock(return_value=60.0)
+    engine.mirroring_enabled = True
+
+    assert engine.mirror_trade(dict(_trade('k1', 'NIFTY25NOV23400CE'), order_price=50.0, trade_time='10:00:00'))
+    assert engine.wait_for_chases(timeout=5)
+    conn.modifyOrder.assert_not_called()
+    assert conn.cancelOrder.call_args[0][0] == 'O1'
+    assert engine.get_mirror_stats()['deadline']['aborts'] == {'chase': 1}
+
+    conn.orderBook.return_value = {'status': True, 'data': [
+        {'orderid': 'O1', 'status': 'cancelled', 'filledshares': '0', 'text': 'Cancelled by user'}]}
+    assert engine.reconcile_orders(force=True) == 1
+    assert engine.positions == {}
+    engine.close()
+
+
+def test_reconcile_only_updates_the_sessions_row(tmp_path):
+    conn = Mock()
+    conn.placeOrder.return_value = {'status': True, 'data': {'orderid': 'O1'}}
+    conn.orderBook.return_value = {'status': True, 'data': [
+        {'orderid': 'O1', 'status': 'complete', 'averageprice': 51.5, 'filledshares': '75', 'text': ''}]}
+    engine = _engine(tmp_path, conn)
+    # the same time-of-day key was mirrored on an earlier day
+    engine._db_conn.execute("INSERT INTO mirrored_trades (trade_key, session_date, order_id, status) "
+                            "VALUES ('k1', '2000-01-03', 'OLD', 'complete')")
+    engine._db_conn.commit()
+
+    assert engine.mirror_trade(_trade('k1', 'NIFTY25NOV23400CE'))
+    assert engine.reconcile_orders() == 1
+    engine.close()
+
+    rows = sqlite3.connect(str(tmp_path / 'trades.db')).execute(
+        "SELECT session_date, order_id, fill_price FROM mirrored_trades ORDER BY session_date").fetchall()
+    assert rows[0] == ('2000-01-03', 'OLD', None)
+    assert rows[1][1:] == ('O1', 51.5)
@@ -0,0 +1,104 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+from unittest.mock import Mock
+
+from src.detection.trade_detector import TradeDetector
+from tests.fake_ws_server import FakeOrderUpdateServer
+
+
+class DummyConfig:
+    def __init__(self, db_path, url):
+        self._settings = {'processed_trades_db': db_path, 'order_stream_url': url,
+                          'push_safety_poll_interval': 60}
+
+    def get_settings(self):
+        return self._settings
+
+    def get_account(self, account_id):
+        return {'API_KEY': 'KEY', 'CLIENT_ID': 'C123'}
+
+
+class DummyAuth:
+    def __init__(self, config, conn):
+        self.config = config
+        self.tokens = {'source_account': {'jwt_token': 'JWT', 'feed_token': 'FEED'}}
+        self._conn = conn
+
+    def get_connection(self, account_id):
+        return self._conn
+
+
+def _order_update(filled, avg_price, status='open'):
+    return {
+        'user-id': 'C123', 'status-code': '200', 'order-status': 'AB05' if status == 'complete' else 'AB01',
+        'orderData': {
+            'orderid': 'ORD1', 'tradingsymbol': 'NIFTY25NOV23400CE', 'transactiontype': 'BUY',
+            'producttype': 'INTRADAY', 'exchange': 'NFO', 'quantity': '150',
+            'filledshares': str(filled), 'averageprice': avg_price, 'status': status,
+            'exchorderupdatetime': '12-Nov-2025 10:00:0%d' % (filled // 75)
+        }
+    }
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_pushed_fills_flow_through_dedupe_and_safety_net(tmp_path):
+    server = FakeOrderUpdateServer([
+        {'status-code': '200', 'order-status': 'AB00', 'orderData': None},
+        _order_update(75, 45.0),
+        _order_update(75, 45.0),  # duplicate update, nothing new filled
+        _order_update(150, 45.5, status='complete'),
+    ]).start()
+
+    conn = Mock()
+    config = DummyConfig(str(tmp_path / 'trades.db'), server.url)
+    detector = TradeDetector(config, DummyAuth(config, conn))
+    woken = []
+    detector.start_order_stream(listener=lambda: woken.append(1))
+    try:
+        assert _wait_for(lambda: detector.pushed_trade_count == 2)
+        assert server.request_headers['x-client-code'] == 'C123'
+        assert server.request_headers['authorization'] == 'JWT'
+
+        # Safety-net poll sees the same two fills in the tradebook
+        conn.tradeBook.return_value = {'status': True, 'data': [
+            {'orderid': 'ORD1', 'filltime': '10:00:01', 'tradingsymbol': 'NIFTY25NOV23400CE',
+             'fillsize': '75', 'fillprice': '45.0', 'transactiontype': 'BUY', 'exchange': 'NFO'},
+            {'orderid': 'ORD1', 'filltime': '10:00:02', 'tradingsymbol': 'NIFTY25NOV23400CE',
+             'fillsize': '75', 'fillprice': '46.0', 'transactiontype': 'BUY', 'exchange': 'NFO'},
+        ]}
+        trades = detector.detect_new_trades()
+        assert [t['quantity'] for t in trades] == [75, 75]
+        assert all(t['order_id'] == 'ORD1' for t in trades)
+        assert len(woken) == 2
+
+        # Stream connected and safety poll not due -> tradeBook not called again
+        assert detector.detect_new_trades() == []
+        assert conn.tradeBook.call_count == 1
+    finally:
+        detector.stop_order_stream()
+        server.stop()
+
+
+def test_tradebook_fill_not_repeated_on_stream(tmp_path):
+    config = DummyConfig(str(tmp_path / 'trades.db'), None)
+    detector = TradeDetector(config, DummyAuth(config, Mock()))
+    detector.order_streams['source_account'] = Mock(connected=False)
+    detector._claim_order_fill('ORD1', polled_qty=75)
+
+    detector.on_order_update(_order_update(75, 45.0))
+    assert detector.pushed_trade_count == 0
+
+    detector.on_order_update(_order_update(150, 45.5, status='complete'))
+    pushed = detector._drain_pushed_trades()
+    assert [t['quantity'] for t in pushed] == [75]
@@ -0,0 +1,84 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+from datetime import datetime, timedelta
+
+from src.detection.poll_scheduler import PollScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+SETTINGS = {
+    'check_interval': 10,
+    'poll_min_interval': 0.5,
+    'poll_fast_max_interval': 2,
+    'poll_fast_window': 30,
+    'poll_backoff': 2,
+    'max_polls_per_minute': 60
+}
+
+# A Wednesday during market hours
+IN_SESSION = datetime(2025, 11, 12, 11, 0, 0)
+
+
+def test_fast_after_activity_then_backs_off():
+    clock = FakeClock()
+    scheduler = PollScheduler(SETTINGS, clock=clock, now_func=lambda: IN_SESSION)
+    assert scheduler.next_interval() == 10
+
+    scheduler.record_poll(activity=True)
+    assert scheduler.next_interval() == 0.5
+
+    # Quiet polls inside the fast window stay capped at 2s
+    for _ in range(5):
+        clock.t += 1
+        scheduler.record_poll(activity=False)
+    assert scheduler.next_interval() == 2
+
+    # Past the fast window it backs off to check_interval
+    clock.t += 60
+    for _ in range(5):
+        scheduler.record_poll(activity=False)
+    assert scheduler.next_interval() == 10
+
+
+def test_sleeps_until_open_outside_session():
+    # Saturday evening -> Monday 9:15
+    saturday = datetime(2025, 11, 15, 20, 0, 0)
+    scheduler = PollScheduler(SETTINGS, now_func=lambda: saturday)
+    assert not scheduler.in_session()
+    expected = (datetime(2025, 11, 17, 9, 15) - saturday).total_seconds()
+    assert scheduler.next_interval() == expected
+
+
+def test_replay_skips_to_the_open_instead_of_sleeping():
+    now = [datetime(2025, 11, 12, 8, 0, 0)]
+    skipped = []
+
+    def skip_time(seconds):
+        skipped.append(seconds)
+        now[0] += timedelta(seconds=seconds)
+
+    scheduler = PollScheduler(SETTINGS, now_func=lambda: now[0], skip_time=skip_time)
+    started = time.monotonic()
+    scheduler.wait()
+    assert time.monotonic() - started < 1
+    assert skipped == [75 * 60] and scheduler.in_session()
+
+
+def test_respects_call_budget():
+    clock = FakeClock()
+    settings = dict(SETTINGS, max_polls_per_minute=3)
+    scheduler = PollScheduler(settings, clock=clock, now_func=lambda: IN_SESSION)
+    for _ in range(3):
+        scheduler.record_poll(activity=True)
+    assert scheduler.next_interval() == 60
+    assert scheduler.get_stats()['throttled_waits'] == 1
@@ -0,0 +1,56 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.mirror.quote_cache import QuoteCache
+from src.mirror.mirror_engine import MirrorEngine
+from unittest.mock import Mock
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 50.0
+
+    def __call__(self):
+        return self.t
+
+
+def _market_data(mode, exchange_tokens):
+    tokens = next(iter(exchange_tokens.values()))
+    return {'status': True, 'data': {'fetched': [{'symbolToken': t, 'ltp': 100 + int(t)} for t in tokens],
+                                     'unfetched': []}}
+
+
+def test_bulk_refresh_chunks_tokens_and_expires():
+    conn = Mock()
+    conn.getMarketData.side_effect = _market_data
+    auth = Mock()
+    auth.get_connection.return_value = conn
+    clock = FakeClock()
+    cache = QuoteCache(auth, {'quote_cache_ttl_ms': 500}, clock=clock)
+
+    assert cache.refresh({'NFO': [str(i) for i in range(120)]}) == 120
+    assert conn.getMarketData.call_count == 3  # 50 tokens per request
+    assert cache.get('7') == 107.0
+
+    clock.t += 0.6
+    assert cache.get('7') is None
+    assert cache.get_stats()['hits'] == 1
+
+
+def test_price_check_reads_prefetched_quote(tmp_path):
+    conn = Mock()
+    conn.getMarketData.side_effect = _market_data
+    auth = Mock()
+    auth.get_connection.return_value = conn
+    config = Mock()
+    config.get_settings.return_value = {'processed_trades_db': str(tmp_path / 'trades.db')}
+    instruments = Mock()
+    instruments.token_for.return_value = '5'
+    engine = MirrorEngine(config, auth, Mock(), instruments=instruments)
+
+    engine.prefetch_quotes([{'symbol': 'NIFTY25NOV23400CE', 'exchange': 'NFO'}])
+    assert engine.get_current_market_price('NIFTY25NOV23400CE') == 105.0
+    assert engine.get_current_market_price('NIFTY25NOV23400CE', token='5') == 105.0
+    conn.ltpData.assert_not_called()
+    engine.close()
@@ -0,0 +1,64 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+from unittest.mock import Mock
+
+from src.auth.auth_manager import AuthManager
+from src.utils.rate_limiter import RateLimiter, TokenBucket
+
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket(2, now=0.0)
+    bucket.take(0.0)
+    bucket.take(0.0)
+    assert bucket.wait_time(0.0) == 0.5
+    assert bucket.wait_time(0.5) == 0.0
+    # a reserve keeps the last tokens back
+    assert TokenBucket(5, now=0.0).wait_time(0.0, reserve=4.5) > 0
+
+
+def test_reads_are_throttled_and_orders_use_the_reserve():
+    limiter = RateLimiter({'rate_limits': {'tradeBook': 20}, 'rate_limit_account_per_second': 4,
+                           'rate_limit_order_reserve': 2})
+    # Reads get 2 of the 4 account tokens, the third waits for a refill (~0.25s)
+    assert limiter.acquire('src', 'tradeBook') == 0
+    assert limiter.acquire('src', 'tradeBook') == 0
+    assert limiter.acquire('src', 'tradeBook') > 0.15
+
+    # The reserve is still there for orders
+    started = time.monotonic()
+    limiter.acquire('src', 'placeOrder')
+    assert time.monotonic() - started < 0.05
+
+    stats = limiter.get_stats()
+    assert stats['throttled_calls'] == 1
+    assert stats['by_endpoint']['src.tradeBook']['calls'] == 3
+    assert stats['throttle_wait_ms'] > 150
+
+
+class DummyConfig:
+    def __init__(self, **settings):
+        self.settings = settings
+
+    def get_settings(self):
+        return self.settings
+
+
+def test_auth_manager_hands_out_throttled_connections():
+    auth = AuthManager(DummyConfig(rate_limits={'orderBook': 1000}))
+    conn = Mock()
+    conn.orderBook.return_value = {'status': True, 'data': []}
+    auth.connections['mirror_account'] = conn
+
+    limited = auth.get_connection('mirror_account')
+    assert limited.orderBook() == {'status': True, 'data': []}
+    assert auth.get_connection('mirror_account') is limited
+    assert auth.rate_limiter.get_stats()['by_endpoint']['mirror_account.orderBook']['calls'] == 1
+
+    # A new session object (re-login) gets a fresh wrapper
+    auth.connections['mirror_account'] = Mock()
+    assert auth.get_connection('mirror_account') is not limited
+
+    assert AuthManager(DummyConfig(rate_limit_enabled=False)).get_connection('x') is None
@@ -0,0 +1,175 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import random
+from unittest.mock import Mock
+
+import requests
+from SmartApi.smartExceptions import TokenException
+
+from src.mirror.mirror_engine import MirrorEngine
+from src.utils.retry_policy import OK, PERMANENT, RETRYABLE, RetryPolicy, classify
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+def _policy(clock=None, sleeps=None, **settings):
+    settings = dict({'retry_delay': 1, 'retry_max_delay': 4, 'circuit_failure_threshold': 3,
+                     'circuit_reset_seconds': 10}, **settings)
+    return RetryPolicy(settings, clock=clock or FakeClock(),
+                       sleep=(sleeps.append if sleeps is not None else lambda s: None), rng=random.Random(1))
+
+
+def test_classify_separates_transient_from_permanent():
+    assert classify({'status': True, 'data': {}}) == OK
+    assert classify(error=requests.exceptions.ReadTimeout('read timed out')) == RETRYABLE
+    assert classify({'status': False, 'errorcode': 'AB1004',
+                     'message': 'Something Went Wrong, Please Try After Sometime'}) == RETRYABLE
+    assert classify({'status': False, 'message': 'Access denied because of exceeding access rate'}) == RETRYABLE
+    assert classify({'status': False, 'message': 'Insufficient funds: required margin 41250'}) == PERMANENT
+    assert classify({'status': False, 'errorcode': 'AB1009', 'message': 'Symbol Not Found'}) == PERMANENT
+    assert classify(error=TokenException('Invalid Token')) == PERMANENT
+    assert classify(None) == RETRYABLE
+
+
+def test_permanent_rejection_is_not_retried():
+    sleeps = []
+    policy = _policy(sleeps=sleeps)
+    func = Mock(return_value={'status': False, 'message': 'Order rejected: insufficient margin'})
+    response = policy.call('placeOrder', func, account_id='m', attempts=5)
+    assert response['status'] is False
+    assert func.call_count == 1 and sleeps == []
+    assert policy.get_stats()['permanent_failures'] == 1
+
+
+def test_transient_errors_back_off_with_jitter():
+    sleeps = []
+    policy = _policy(sleeps=sleeps, circuit_failure_threshold=10)
+    func = Mock(side_effect=[requests.exceptions.ConnectionError('reset'), None,
+                             {'status': False, 'message': 'gateway timeout'}, {'status': True, 'data': 1}])
+    assert policy.call('ltpData', func, attempts=4)['data'] == 1
+    assert len(sleeps) == 3
+    # full jitter: each wait is within the doubling cap
+    for attempt, delay in enumerate(sleeps):
+        assert 0 <= delay <= min(4, 2 ** attempt)
+    assert policy.get_stats()['retries'] == 3
+
+
+def test_circuit_opens_fails_fast_and_recovers():
+    clock = FakeClock()
+    policy = _policy(clock)
+    down = Mock(side_effect=requests.exceptions.ConnectionError('down'))
+    for _ in range(3):
+        try:
+            policy.call('tradeBook', down, account_id='src', attempts=1)
+        except requests.exceptions.ConnectionError:
+            pass
+
+    response = policy.call('tradeBook', down, account_id='src', attempts=1)
+    assert response['circuit_open'] and down.call_count == 3
+    # other endpoints and accounts are unaffected
+    assert policy.call('tradeBook', Mock(return_value={'status': True}), account_id='src2')['status']
+    stats = policy.get_stats()
+    assert stats['open_circuits'] == ['src.tradeBook'] and stats['fast_fails'] == 1
+
+    clock.t += 10  # half-open: one trial call, which succeeds and closes the circuit
+    up = Mock(return_value={'status': True, 'data': []})
+    assert policy.call('tradeBook', up, account_id='src', attempts=1)['status']
+    assert policy.get_stats()['open_circuits'] == []
+
+
+class RetryConfig:
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def get_settings(self):
+        return {'price_tolerance': 0.02, 'max_retries': 3, 'retry_delay': 0, 'processed_trades_db': self.db_path}
+
+    def get_mirror_account_ids(self):
+        return ['mirror_account']
+
+
+def test_mirror_engine_stops_retrying_a_margin_rejection(tmp_path):
+    import sqlite3
+
+    conn = Mock()
+    conn.placeOrder.return_value = {'status': False, 'errorcode': 'AB4008', 'message': 'Insufficient margin'}
+    auth = Mock()
+    auth.get_connection.return_value = conn
+    auth.retry_policy = _policy(retry_delay=0)
+    db_path = str(tmp_path / 'trades.db')
+    engine = MirrorEngine(RetryConfig(db_path), auth, None)
+    assert engine.retry is auth.retry_policy
+    engine.get_symbol_token = Mock(return_value='TOK123')
+    engine.get_current_market_price = Mock(return_value=None)
+    engine.mirroring_enabled = True
+
+    trade = {'trade_key': 'k', 'symbol': 'NIFTY25NOV23400CE', 'quantity': 75, 'order_type': 'BUY',
+             'product_type': 'INTRADAY', 'order_price': 50.0, 'exchange': 'NFO'}
+    assert engine.mirror_trade(trade) is False
+    assert conn.placeOrder.call_count == 1
+    engine.close()
+    row = sqlite3.connect(db_path).execute("SELECT status, error FROM mirrored_trades").fetchone()
+    assert row == ('failed', 'Insufficient margin')
+
+
+def test_ambiguous_send_is_looked_up_before_resending(tmp_path):
+    from src.mirror.intent_journal import IntentJournal
+
+    conn = Mock()
+    conn.placeOrder.side_effect = requests.exceptions.ReadTimeout('read timed out')
+    conn.orderBook.return_value = {'status': True, 'data': [
+        {'orderid': 'O7', 'ordertag': IntentJournal.order_tag('k'), 'status': 'open'}]}
+    auth = Mock()
+    auth.get_connection.return_value = conn
+    engine = MirrorEngine(RetryConfig(str(tmp_path / 'trades.db')), auth, None)
+    engine.get_symbol_token = Mock(return_value='TOK123')
+    engine.get_current_market_price = Mock(return_value=None)
+    engine.mirroring_enabled = True
+
+    trade = {'trade_key': 'k', 'symbol': 'NIFTY25NOV23400CE', 'quantity': 75, 'order_type': 'BUY',
+             'product_type': 'INTRADAY', 'order_price': 50.0, 'exchange': 'NFO'}
+    assert engine.mirror_trade(trade) is True
+    assert conn.placeOrder.call_count == 1
+    assert engine.reconciler.is_pending('mirror_account', 'O7')
+
+    # Not in the book: the order never arrived, so it is sent again
+    conn.placeOrder.side_effect = [requests.exceptions.ReadTimeout('read timed out'),
+                                   {'status': True, 'data': {'orderid': 'O8'}}]
+    conn.orderBook.return_value = {'status': True, 'data': []}
+    assert engine.mirror_trade(dict(trade, trade_key='k2')) is True
+    assert conn.placeOrder.call_count == 3
+    engine.close()
+
+
+def test_ambiguous_send_with_a_permanent_looking_error_is_still_looked_up(tmp_path):
+    from src.mirror.intent_journal import IntentJournal
+
+    conn = Mock()
+    # a garbled reply reads like a rejection, but the order may still be live
+    conn.placeOrder.side_effect = ValueError('Invalid JSON in broker response')
+    conn.orderBook.return_value = {'status': True, 'data': [
+        {'orderid': 'O9', 'ordertag': IntentJournal.order_tag('k'), 'status': 'open'}]}
+    auth = Mock()
+    auth.get_connection.return_value = conn
+    sleeps = []
+    auth.retry_policy = _policy(sleeps=sleeps, retry_delay=1)
+    engine = MirrorEngine(RetryConfig(str(tmp_path / 'trades.db')), auth, None)
+    engine.get_symbol_token = Mock(return_value='TOK123')
+    engine.get_current_market_price = Mock(return_value=None)
+    engine.mirroring_enabled = True
+
+    trade = {'trade_key': 'k', 'symbol': 'NIFTY25NOV23400CE', 'quantity': 75, 'order_type': 'BUY',
+             'product_type': 'INTRADAY', 'order_price': 50.0, 'exchange': 'NFO'}
+    assert engine.mirror_trade(trade) is True
+    assert conn.placeOrder.call_count == 1
+    assert engine.reconciler.is_pending('mirror_account', 'O9')
+    assert sleeps == []  # looked up straight away, no backoff first
+    engine.close()
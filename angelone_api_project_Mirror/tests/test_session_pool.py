@@ -0,0 +1,80 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import SmartApi.smartConnect as smart_connect_module
+
+from src.auth.session_pool import SessionPool
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = json.dumps({'status': True, 'data': {'ltp': 101.5}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+class FakeSmartConnect:
+    """Issues requests the way SmartConnect._request does (module-level requests.request)"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _request(self, route, method, parameters=None):
+        return smart_connect_module.requests.request(method, f"{self.root}/{route}", timeout=5).json()
+
+    def ltpData(self, exchange, tradingsymbol, symboltoken):
+        return self._request('ltp', 'GET')
+
+
+def test_api_calls_reuse_one_connection(server):
+    pool = SessionPool({})
+    conn = pool.install('mirror_account', FakeSmartConnect(server))
+    for _ in range(5):
+        assert conn.ltpData('NFO', 'X', '1')['data']['ltp'] == 101.5
+
+    stats = pool.get_stats()['mirror_account']
+    assert stats['requests'] == 5
+    assert stats['new_connections'] == 1
+    assert stats['reuse_rate'] == 0.8
+    assert stats['avg_setup_ms'] > 0
+
+    # Unpooled connections are untouched
+    assert FakeSmartConnect(server).ltpData('NFO', 'X', '1')['status'] is True
+    assert pool.get_stats()['mirror_account']['requests'] == 5
+
+
+def test_idle_transports_are_warmed(server):
+    pool = SessionPool({'keepalive_warm_interval': 60})
+    pool.install('mirror_account', FakeSmartConnect(server))
+    assert pool.warm_idle() == 1  # never used - warm it
+    assert pool.warm_idle() == 0  # just warmed
+    conn_stats = pool.get_stats()['mirror_account']
+    assert conn_stats['warmups'] == 1 and conn_stats['new_connections'] == 1
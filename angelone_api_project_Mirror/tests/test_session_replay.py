@@ -0,0 +1,127 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.auth.auth_manager import AuthManager
+from src.backtest.session_replay import SessionRecorder, SessionReplay
+from src.detection.trade_detector import TradeDetector
+from unittest.mock import Mock
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+class DummyConfig:
+    def __init__(self, db_path):
+        self._db_path = db_path
+
+    def get_settings(self):
+        return {'processed_trades_db': self._db_path}
+
+    def get_source_account_ids(self):
+        return ['source_account']
+
+
+def _row(filltime, symbol='NIFTY25NOV23400CE', size='75'):
+    return {'filltime': filltime, 'tradingsymbol': symbol, 'fillsize': size, 'fillprice': '45.5',
+            'transactiontype': 'BUY', 'exchange': 'NFO', 'orderid': f'O{filltime}'}
+
+
+def _record(path, clock):
+    """Record a short session: one fill appears 5s in, a second 20s in"""
+    books = [
+        {'status': True, 'data': []},
+        {'status': True, 'data': [_row('10:00:05')]},
+        {'status': True, 'data': [_row('10:00:05'), _row('10:00:20', 'NIFTY25NOV23500PE')]},
+    ]
+    source = Mock()
+    mirror = Mock()
+    mirror.search_scrip.return_value = {'status': True, 'data': [{'tradingsymbol': 'NIFTY25NOV23400CE'}]}
+    auth = Mock(connections={'source_account': source, 'mirror_account': mirror})
+
+    recorder = SessionRecorder(path, clock=clock)
+    recorder.wrap(auth)
+    for offset, book in zip((0, 5, 20), books):
+        clock.t = 1000.0 + offset
+        source.tradeBook.return_value = book
+        auth.connections['source_account'].tradeBook()
+    auth.connections['mirror_account'].search_scrip(exchange='NFO', searchscrip='NIFTY')
+    recorder.close()
+    return recorder
+
+
+def test_record_and_replay_accelerated(tmp_path):
+    path = str(tmp_path / 'session.jsonl.gz')
+    recorder = _record(path, FakeClock())
+    assert recorder.calls_recorded == 4
+
+    clock = FakeClock()
+    replay = SessionReplay(path, speed=10, simulate_latency=False, clock=clock)
+    auth = Mock(connections={}, tokens={})
+    replay.install(auth, ['source_account', 'mirror_account'])
+    source = auth.connections['source_account']
+
+    assert source.tradeBook()['data'] == []
+    clock.t += 0.6  # 6s of session time at 10x
+    assert len(source.tradeBook()['data']) == 1
+    clock.t += 1.5
+    assert len(source.tradeBook()['data']) == 2
+
+    search = auth.connections['mirror_account'].search_scrip(exchange='NFO', searchscrip='NIFTY')
+    assert search['data'][0]['tradingsymbol'] == 'NIFTY25NOV23400CE'
+    assert replay.finished
+
+
+def test_replay_clock_can_jump_ahead(tmp_path):
+    path = str(tmp_path / 'session.jsonl.gz')
+    _record(path, FakeClock())
+    clock = FakeClock()
+    replay = SessionReplay(path, speed=10, simulate_latency=False, clock=clock)
+    replay.start()
+    before = replay.now()
+    replay.advance(6)
+    assert (replay.now() - before).total_seconds() == 6
+    assert clock.t == 1000.0  # no real time passed
+    replay.advance(20)
+    assert replay.finished
+
+
+def test_replayed_orders_measure_latency(tmp_path):
+    path = str(tmp_path / 'session.jsonl')
+    _record(path, FakeClock())
+
+    clock = FakeClock()
+    replay = SessionReplay(path, speed=1, simulate_latency=False, clock=clock)
+    auth = Mock(connections={}, tokens={})
+    replay.install(auth, ['source_account', 'mirror_account'])
+
+    clock.t += 5.25
+    response = auth.connections['mirror_account'].placeOrder({'tradingsymbol': 'NIFTY25NOV23400CE'})
+    assert response['data']['orderid'] == 'REPLAY000001'
+
+    stats = replay.get_stats()
+    assert stats['orders_matched'] == 1
+    assert stats['latency_max_ms'] == 250.0
+
+
+def test_detector_runs_offline_against_replay(tmp_path):
+    path = str(tmp_path / 'session.jsonl')
+    _record(path, FakeClock())
+
+    clock = FakeClock()
+    replay = SessionReplay(path, speed=1, simulate_latency=False, clock=clock)
+    config = DummyConfig(str(tmp_path / 'trades.db'))
+    auth = AuthManager(config)
+    replay.install(auth, ['source_account', 'mirror_account'])
+    detector = TradeDetector(config, auth)
+
+    assert detector.detect_new_trades() == []
+    clock.t += 21
+    trades = detector.detect_new_trades()
+    assert [t['symbol'] for t in trades] == ['NIFTY25NOV23400CE', 'NIFTY25NOV23500PE']
+    detector.close()
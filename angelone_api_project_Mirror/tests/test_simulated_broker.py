@@ -0,0 +1,144 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import random
+import sqlite3
+from unittest.mock import Mock
+
+from src.backtest.session_replay import SessionRecorder
+from src.backtest.simulated_broker import SimulatedBroker, SimulatedConnection
+from src.mirror.mirror_engine import MirrorEngine
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+def _broker(clock, sleeps=None, **settings):
+    settings = dict({'sim_latency_dist': 'fixed', 'sim_latency_ms': 40, 'sim_fill_delay_ms': 100,
+                     'sim_slippage_bps': 10, 'sim_slippage_sigma_bps': 0}, **settings)
+    return SimulatedBroker(settings, clock=clock, sleep=(sleeps.append if sleeps is not None else lambda s: None),
+                           rng=random.Random(7))
+
+
+def _order(side='BUY', ordertype='MARKET', price=0):
+    return {'tradingsymbol': 'NIFTY25NOV23400CE', 'symboltoken': 'TOK1', 'exchange': 'NFO',
+            'transactiontype': side, 'ordertype': ordertype, 'price': price, 'quantity': '75',
+            'producttype': 'INTRADAY'}
+
+
+def test_market_order_fills_after_delay_with_slippage():
+    clock, sleeps = FakeClock(), []
+    broker = _broker(clock, sleeps)
+    real = Mock()
+    real.ltpData.return_value = {'status': True, 'data': {'ltp': 100.0}}
+    conn = SimulatedConnection(broker, 'mirror_account', real)
+
+    assert conn.ltpData('NFO', 'NIFTY25NOV23400CE', 'TOK1')['data']['ltp'] == 100.0
+    order_id = conn.placeOrder(_order())['data']['orderid']
+    assert sleeps == [0.04]
+    real.placeOrder.assert_not_called()
+    assert conn.orderBook()['data'][0]['status'] == 'open'
+
+    clock.t += 0.2
+    row = conn.orderBook()['data'][0]
+    assert row['orderid'] == order_id and row['status'] == 'complete'
+    assert row['averageprice'] == 100.1  # 10 bps against a BUY
+    assert conn.tradeBook()['data'][0]['fillprice'] == 100.1
+    stats = broker.get_stats()
+    assert stats['fills'] == 1 and stats['latency_p50_ms'] == 40.0
+    assert round(stats['avg_slippage_bps']) == 10
+
+
+def test_rejections_show_in_order_book():
+    broker = _broker(FakeClock(), sim_reject_rate=1.0)
+    conn = SimulatedConnection(broker, 'mirror_account')
+    conn.placeOrder(_order())
+    row = conn.orderBook()['data'][0]
+    assert row['status'] == 'rejected' and 'RMS' in row['text']
+    assert broker.get_stats()['rejections'] == 1
+
+
+def test_limit_order_waits_until_marketable():
+    clock = FakeClock()
+    broker = _broker(clock, sim_slippage_bps=0)
+    broker.observe_price('NIFTY25NOV23400CE', 101.0)
+    conn = SimulatedConnection(broker, 'mirror_account')
+    order_id = conn.placeOrder(_order(ordertype='LIMIT', price=100.0))['data']['orderid']
+
+    clock.t += 1
+    assert conn.orderBook()['data'][0]['status'] == 'open'
+
+    assert conn.modifyOrder({'orderid': order_id, 'ordertype': 'MARKET', 'price': 0})['status']
+    clock.t += 1
+    row = conn.orderBook()['data'][0]
+    assert row['status'] == 'complete' and row['averageprice'] == 101.0
+
+
+def test_quotes_from_a_recorded_session(tmp_path):
+    rec_clock = FakeClock()
+    path = str(tmp_path / 'session.jsonl')
+    source = Mock()
+    auth = Mock(connections={'mirror_account': source})
+    recorder = SessionRecorder(path, clock=rec_clock)
+    recorder.wrap(auth)
+    for offset, ltp in ((0, 100.0), (10, 104.0)):
+        rec_clock.t = 1000.0 + offset
+        source.ltpData.return_value = {'status': True, 'data': {'tradingsymbol': 'NIFTY25NOV23400CE',
+                                                                 'symboltoken': 'TOK1', 'ltp': ltp}}
+        auth.connections['mirror_account'].ltpData('NFO', 'NIFTY25NOV23400CE', 'TOK1')
+    recorder.close()
+
+    clock = FakeClock()
+    broker = _broker(clock, sim_quotes_path=path)
+    conn = SimulatedConnection(broker, 'mirror_account')
+    assert conn.ltpData('NFO', 'NIFTY25NOV23400CE', 'TOK1')['data']['ltp'] == 100.0
+    clock.t += 11
+    assert conn.ltpData('NFO', 'NIFTY25NOV23400CE', 'TOK1')['data']['ltp'] == 104.0
+
+
+class SimConfig:
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def get_settings(self):
+        return {'price_tolerance': 0.02, 'max_retries': 1, 'retry_delay': 0, 'processed_trades_db': self.db_path}
+
+    def get_mirror_account_ids(self):
+        return ['mirror_account']
+
+
+def test_dry_run_goes_through_the_mirror_engine(tmp_path):
+    clock = FakeClock()
+    broker = _broker(clock)
+    real = Mock()
+    real.ltpData.return_value = {'status': True, 'data': {'ltp': 50.0}}
+    auth = Mock(connections={'mirror_account': real})
+    auth.get_connection.side_effect = lambda account_id: auth.connections[account_id]
+    broker.install(auth, ['mirror_account'])
+
+    db_path = str(tmp_path / 'dry_run' / 'mirrored_trades.db')
+    engine = MirrorEngine(SimConfig(str(tmp_path / 'live.db')), auth, None, db_path=db_path)
+    assert engine.journal.path == str(tmp_path / 'dry_run' / 'intent_journal.log')
+    engine.get_symbol_token = Mock(return_value='TOK1')
+    engine.mirroring_enabled = True
+
+    trade = {'trade_key': 'k1', 'symbol': 'NIFTY25NOV23400CE', 'quantity': 75, 'order_type': 'BUY',
+             'product_type': 'INTRADAY', 'order_price': 50.0, 'exchange': 'NFO'}
+    assert engine.mirror_trade(trade) is True
+    real.placeOrder.assert_not_called()
+
+    clock.t += 1
+    engine.reconcile_orders(force=True)
+    quality = engine.get_mirror_stats()['reconciliation']['execution_quality']['market']
+    assert quality['fills'] == 1
+    engine.close()
+
+    row = sqlite3.connect(db_path).execute("SELECT order_id, status, fill_price FROM mirrored_trades").fetchone()
+    assert row == ('SIM000001', 'complete', 50.05)
+    assert not os.path.exists(str(tmp_path / 'live.db'))
@@ -0,0 +1,41 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from datetime import date
+
+from src.utils.symbol_parser import parse_symbol, is_nifty_option, underlying_of
+
+
+def test_parses_weekly_option():
+    info = parse_symbol('NIFTY25NOV2525350PE')
+    assert info.underlying == 'NIFTY'
+    assert info.expiry == date(2025, 11, 25)
+    assert info.strike == 25350
+    assert info.instrument_type == 'PE'
+
+
+def test_parses_monthly_style_and_future():
+    assert parse_symbol('NIFTY25NOV23400CE').strike == 23400
+    assert parse_symbol('NIFTY25NOV23400CE').expiry == (2025, 11)
+    fut = parse_symbol('BANKNIFTY28NOV24FUT')
+    assert fut.is_future and fut.underlying == 'BANKNIFTY' and fut.strike is None
+
+
+def test_nifty_option_classification():
+    assert is_nifty_option('BANKNIFTY25OCT2345000PE')
+    assert is_nifty_option('FINNIFTY25NOV2550000CE')
+    assert not is_nifty_option('NIFTY28NOV24FUT')
+    assert not is_nifty_option('NIFTY25OCT23400')
+    assert not is_nifty_option('RELIANCE')
+    # 'CE' appearing in the underlying name must not make it an option
+    assert not is_nifty_option('NIFTYRELIANCE')
+    assert underlying_of('RELIANCE') == 'RELIANCE'
+    assert parse_symbol('INVALID_SYMBOL') is None
+
+
+def test_parse_is_cached():
+    parse_symbol.cache_clear()
+    parse_symbol('NIFTY25NOV2525350PE')
+    parse_symbol('NIFTY25NOV2525350PE')
+    assert parse_symbol.cache_info().hits == 1
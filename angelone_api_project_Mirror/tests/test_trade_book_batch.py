@@ -0,0 +1,54 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.detection.trade_book_batch import TradeBookBatch, comparable_time
+
+
+def _fill(filltime, symbol, size):
+    return {'filltime': filltime, 'tradingsymbol': symbol, 'fillsize': size,
+            'fillprice': '45.5', 'transactiontype': 'BUY', 'exchange': 'NFO'}
+
+
+def test_columns_cover_old_and_new_formats():
+    rows = [
+        _fill('10:00:01', 'NIFTY25NOV23400CE', '75'),
+        {'orderTimestamp': '2024-10-31 10:00:00', 'tradingSymbol': 'NIFTY25OCT23400PE', 'quantity': '50',
+         'orderType': 'SELL', 'averagePrice': '22.3'},
+    ]
+    batch = TradeBookBatch(rows)
+    assert batch.keys == ['10:00:01_NIFTY25NOV23400CE_75', '2024-10-31 10:00:00_NIFTY25OCT23400PE_50']
+    assert batch.symbols == ['NIFTY25NOV23400CE', 'NIFTY25OCT23400PE']
+
+
+def test_filters_cursor_and_non_nifty_rows():
+    batch = TradeBookBatch([
+        _fill('10:00:01', 'NIFTY25NOV23400CE', '75'),
+        _fill('10:00:05', 'NIFTY25NOV23400PE', '75'),
+        _fill('10:00:05', 'RELIANCE-EQ', '10'),
+        _fill('10:00:07', 'NIFTY25NOV23500CE', '75'),
+    ])
+    ahead = batch.ahead_of('10:00:05', {'10:00:05_NIFTY25NOV23400PE_75'})
+    assert ahead == [2, 3]
+    assert batch.nifty_options(ahead) == [3]
+
+    assert batch.advance_cursor(ahead, '10:00:05', set()) == (
+        '10:00:07', {'10:00:07_NIFTY25NOV23500CE_75'}, True)
+    assert batch.advance_cursor([], '10:00:05', set()) == ('10:00:05', set(), False)
+
+
+def test_cursor_compares_old_and_new_time_formats_as_times():
+    assert comparable_time('2024-10-31 09:59:58') == '09:59:58'
+    assert comparable_time('25-Oct-2023 9:15:00') == '09:15:00'
+    assert comparable_time('10:00:01') == '10:00:01'
+    assert comparable_time('') == '' and comparable_time('n/a') == ''
+
+    batch = TradeBookBatch([
+        {'orderTimestamp': '2024-10-31 10:00:09', 'tradingSymbol': 'NIFTY25NOV23400PE', 'quantity': '50'},
+        _fill('9:59:59', 'NIFTY25NOV23400CE', '75'),
+        _fill('10:00:07', 'NIFTY25NOV23500CE', '75'),
+    ])
+    # '2024-...' would sort below '10:00:05' as a raw string
+    assert batch.ahead_of('10:00:05', set()) == [0, 2]
+    assert batch.advance_cursor([0, 1, 2], '10:00:05', set()) == (
+        '10:00:09', {'2024-10-31 10:00:09_NIFTY25NOV23400PE_50'}, True)
@@ -0,0 +1,44 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from datetime import datetime
+
+from src.mirror.trade_deadline import TradeDeadline
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 100.0
+
+    def __call__(self):
+        return self.t
+
+
+NOW = datetime(2025, 11, 20, 10, 0, 3)
+
+
+def test_budget_is_measured_from_the_fill_time():
+    clock = FakeClock()
+    deadline = TradeDeadline(5, '10:00:00', now=NOW, clock=clock)
+    assert deadline.age() == 3.0
+    assert deadline.remaining() == 2.0
+    assert deadline.check('placement') is None
+
+    clock.t += 2.5
+    assert deadline.expired()
+    assert 'before placement' in deadline.check('placement')
+
+
+def test_full_timestamp_and_unparseable_fill_times():
+    assert TradeDeadline(5, '20-Nov-2025 09:59:59', now=NOW).age() >= 4.0
+    # No usable fill time: the budget starts when the trade reaches the engine
+    assert TradeDeadline(5, '', now=NOW).remaining() > 4.9
+    # Fill stamped in the future (clock skew) counts as just now
+    assert TradeDeadline(5, '10:00:10', now=NOW).age() < 0.1
+
+
+def test_no_budget_never_expires():
+    deadline = TradeDeadline(0, '09:00:00', now=NOW)
+    assert deadline.remaining() == float('inf')
+    assert deadline.check('quote') is None
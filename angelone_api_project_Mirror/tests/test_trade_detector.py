@@ -1,6 +1,8 @@
 import sys
 import os
 import logging
+import sqlite3
+import time
 
 # Add src to Python path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
@@ -8,6 +10,34 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from src.config.config_manager import ConfigManager
 from src.auth.auth_manager import AuthManager
 from src.detection.trade_detector import TradeDetector
+from unittest.mock import Mock, patch
+
+
+class DummyConfig:
+    def __init__(self, db_path, sources=None, **settings):
+        self._db_path = db_path
+        self._sources = sources or ['source_account']
+        self._settings = settings
+
+    def get_settings(self):
+        return {'processed_trades_db': self._db_path, **self._settings}
+
+    def get_source_account_ids(self):
+        return self._sources
+
+
+class DummyAuth:
+    def __init__(self, conn=None, connections=None):
+        self._conn = conn
+        self._connections = connections or {}
+
+    def get_connection(self, account_id):
+        return self._connections.get(account_id, self._conn)
+
+
+def _fill(filltime, symbol, size, price='45.5', side='BUY'):
+    return {'filltime': filltime, 'tradingsymbol': symbol, 'fillsize': size,
+            'fillprice': price, 'transactiontype': side, 'exchange': 'NFO'}
 
 def test_trade_detector():
     print("Starting Trade Detector Test...")
@@ -64,5 +94,200 @@ def test_trade_detector():
         print(f"Trade detector test failed: {e}")
         raise
 
+def test_cursor_skips_fills_behind_high_water_mark(tmp_path):
+    book = [_fill('10:00:01', 'NIFTY25NOV23400CE', 75),
+            _fill('10:00:05', 'NIFTY25NOV23400PE', 75)]
+    conn = Mock()
+    conn.tradeBook.return_value = {'status': True, 'data': book}
+    detector = TradeDetector(DummyConfig(str(tmp_path / 'trades.db')), DummyAuth(conn))
+
+    assert len(detector.detect_new_trades()) == 2
+
+    # Same-second fill arriving on a later poll is still picked up
+    book.append(_fill('10:00:05', 'NIFTY25NOV23500CE', 75))
+    detector.parse_trade = Mock(wraps=detector.parse_trade)
+    new_trades = detector.detect_new_trades()
+    assert [t['symbol'] for t in new_trades] == ['NIFTY25NOV23500CE']
+    assert detector.parse_trade.call_count == 1
+
+
+def test_cursor_does_not_pass_rows_that_failed_to_parse(tmp_path):
+    book = [_fill('10:00:01', 'NIFTY25NOV23400CE', 75),
+            _fill('10:00:05', 'NIFTY25NOV23400PE', 75)]
+    conn = Mock()
+    conn.tradeBook.return_value = {'status': True, 'data': book}
+    detector = TradeDetector(DummyConfig(str(tmp_path / 'trades.db')), DummyAuth(conn))
+    parse = detector.parse_trade
+
+    def raising_parse(trade):
+        if trade['tradingsymbol'] == 'NIFTY25NOV23400PE':
+            raise ValueError('bad row')
+        return parse(trade)
+
+    detector.parse_trade = raising_parse
+    assert detector.detect_new_trades() == []
+    assert detector.get_detection_stats()['cursor_fill_time'] is None
+
+    # A row that parses to nothing is left unsettled: the cursor only passes the
+    # row accepted before the failure
+    detector.parse_trade = lambda trade: None if trade['tradingsymbol'] == 'NIFTY25NOV23400PE' else parse(trade)
+    assert detector.detect_new_trades() == []
+    assert detector.get_detection_stats()['cursor_fill_time'] == '10:00:01'
+
+    # ...and is walked again although the book is byte-for-byte unchanged
+    detector.parse_trade = parse
+    assert [t['symbol'] for t in detector.detect_new_trades()] == ['NIFTY25NOV23400PE']
+    assert detector.get_detection_stats()['cursor_fill_time'] == '10:00:05'
+
+    book.append(_fill('10:00:06', 'NIFTY25NOV23500CE', 75))
+    assert [t['symbol'] for t in detector.detect_new_trades()] == ['NIFTY25NOV23500CE']
+    assert detector.get_detection_stats()['cursor_fill_time'] == '10:00:06'
+    assert detector.detect_new_trades() == []
+    assert detector.get_detection_stats()['fingerprint_hits'] == 1
+    detector.close()
+
+
+def test_cursor_survives_restart(tmp_path):
+    db_path = str(tmp_path / 'trades.db')
+    conn = Mock()
+    conn.tradeBook.return_value = {'status': True, 'data': [_fill('10:00:01', 'NIFTY25NOV23400CE', 75)]}
+    detector = TradeDetector(DummyConfig(db_path), DummyAuth(conn))
+    detector.detect_new_trades()
+    detector.close()
+
+    restarted = TradeDetector(DummyConfig(db_path), DummyAuth(conn))
+    restarted.parse_trade = Mock(wraps=restarted.parse_trade)
+    assert restarted.detect_new_trades() == []
+    restarted.parse_trade.assert_not_called()
+    assert restarted.get_detection_stats()['cursor_fill_time'] == '10:00:01'
+
+
+def test_db_path_override_leaves_the_configured_store_alone(tmp_path):
+    live_db = str(tmp_path / 'live.db')
+    scratch_db = str(tmp_path / 'replay' / 'processed_trades.db')
+    conn = Mock()
+    conn.tradeBook.return_value = {'status': True, 'data': [_fill('10:00:01', 'NIFTY25NOV23400CE', 75)]}
+    detector = TradeDetector(DummyConfig(live_db), DummyAuth(conn), db_path=scratch_db)
+    assert len(detector.detect_new_trades()) == 1
+    detector.close()
+
+    assert not os.path.exists(live_db)
+    assert sqlite3.connect(scratch_db).execute("SELECT COUNT(*) FROM processed_trades").fetchone()[0] == 1
+
+
+def test_trade_keys_are_written_behind_in_batches(tmp_path):
+    db_path = str(tmp_path / 'trades.db')
+    book = [_fill('10:00:%02d' % i, 'NIFTY25NOV23400CE', 75) for i in range(20)]
+    conn = Mock()
+    conn.tradeBook.return_value = {'status': True, 'data': book}
+    detector = TradeDetector(DummyConfig(db_path), DummyAuth(conn))
+
+    assert len(detector.detect_new_trades()) == 20
+    assert detector.flush()
+    stats = detector.get_detection_stats()['persistence']
+    assert stats['rows_written'] == 21  # 20 keys + cursor
+    assert stats['batches_written'] < 5
+
+    detector.close()
+    assert len(TradeDetector(DummyConfig(db_path), DummyAuth(conn)).processed_trades) == 20
+
+
+def test_multiple_sources_polled_concurrently_and_merged(tmp_path):
+    def slow_book(rows):
+        def trade_book():
+            time.sleep(0.3)
+            return {'status': True, 'data': rows}
+        conn = Mock()
+        conn.tradeBook.side_effect = trade_book
+        return conn
+
+    same_fill = _fill('10:00:03', 'NIFTY25NOV23400CE', 75)
+    connections = {
+        'source_account': slow_book([same_fill]),
+        'source2_account': slow_book([_fill('10:00:01', 'NIFTY25NOV23500PE', 75), same_fill]),
+        'source3_account': slow_book([_fill('10:00:02', 'NIFTY25NOV23600CE', 75)]),
+    }
+    config = DummyConfig(str(tmp_path / 'trades.db'), sources=list(connections))
+    detector = TradeDetector(config, DummyAuth(connections=connections))
+
+    started = time.monotonic()
+    trades = detector.detect_new_trades()
+    assert time.monotonic() - started < 0.8
+
+    # One time-ordered stream; the same fill on two accounts is two trades
+    assert [(t['trade_time'], t['source_id']) for t in trades] == [
+        ('10:00:01', 'source2_account'), ('10:00:02', 'source3_account'),
+        ('10:00:03', 'source_account'), ('10:00:03', 'source2_account')]
+    assert trades[3]['trade_key'] == 'source2_account:10:00:03_NIFTY25NOV23400CE_75'
+    assert detector.get_detection_stats()['source_cursors']['source3_account'] == '10:00:02'
+    detector.close()
+
+
+def test_unchanged_trade_book_is_not_walked(tmp_path):
+    conn = Mock()
+    book = {'status': True, 'data': [_fill('10:00:01', 'NIFTY25NOV23400CE', 75)]}
+    conn.tradeBook.return_value = book
+    detector = TradeDetector(DummyConfig(str(tmp_path / 'trades.db')), DummyAuth(conn))
+
+    assert len(detector.detect_new_trades()) == 1
+    with patch('src.detection.trade_detector.TradeBookBatch') as batch:
+        for _ in range(3):
+            assert detector.detect_new_trades() == []
+    batch.assert_not_called()
+
+    book['data'] = book['data'] + [_fill('10:00:02', 'NIFTY25NOV23400CE', 75)]
+    assert len(detector.detect_new_trades()) == 1
+    stats = detector.get_detection_stats()
+    assert (stats['fingerprint_hits'], stats['fingerprint_misses']) == (3, 2)
+    detector.close()
+
+
+def _order(status, filled, qty='150', side='BUY', order_id='O1'):
+    return {'orderid': order_id, 'tradingsymbol': 'NIFTY25NOV23400CE', 'symboltoken': '43210',
+            'transactiontype': side, 'ordertype': 'MARKET', 'producttype': 'CARRYFORWARD',
+            'exchange': 'NFO', 'quantity': qty, 'filledshares': str(filled), 'status': status,
+            'averageprice': '0', 'price': '0', 'updatetime': '17-Nov-2025 10:00:01'}
+
+
+def test_mirror_on_placement_then_fill_is_not_mirrored_again(tmp_path):
+    conn = Mock()
+    conn.ltpData.return_value = {'status': True, 'data': {'ltp': 45.5}}
+    conn.orderBook.return_value = {'status': True, 'data': [_order('open', 0)]}
+    conn.tradeBook.return_value = {'status': True, 'data': []}
+    detector = TradeDetector(DummyConfig(str(tmp_path / 'trades.db'), mirror_on_placement=True), DummyAuth(conn))
+
+    trades = detector.detect_new_trades()
+    assert [(t['status'], t['quantity'], t['order_price']) for t in trades] == [('placed', 150, 45.5)]
+    assert trades[0]['pre_fill']
+
+    fill = dict(_fill('10:00:02', 'NIFTY25NOV23400CE', '150'), orderid='O1')
+    conn.orderBook.return_value = {'status': True, 'data': [_order('complete', 150)]}
+    conn.tradeBook.return_value = {'status': True, 'data': [fill]}
+    assert detector.detect_new_trades() == []
+    assert detector.get_detection_stats()['placement_mirrors'] == 1
+    detector.close()
+
+
+def test_mirror_on_placement_corrects_partial_and_rejected_orders(tmp_path):
+    conn = Mock()
+    conn.ltpData.return_value = {'status': True, 'data': {'ltp': 45.5}}
+    conn.tradeBook.return_value = {'status': True, 'data': []}
+    conn.orderBook.return_value = {'status': True, 'data': [
+        _order('open', 0, order_id='O1'), _order('open', 0, qty='75', side='SELL', order_id='O2')]}
+    detector = TradeDetector(DummyConfig(str(tmp_path / 'trades.db'), mirror_on_placement=True), DummyAuth(conn))
+    assert len(detector.detect_new_trades()) == 2
+
+    conn.orderBook.return_value = {'status': True, 'data': [
+        _order('cancelled', 75, order_id='O1'), _order('rejected', 0, qty='75', side='SELL', order_id='O2')]}
+    trades = detector.detect_new_trades()
+    assert sorted((t['order_id'], t['order_type'], t['quantity']) for t in trades) == [
+        ('O1', 'SELL', 75), ('O2', 'BUY', 75)]
+    assert all(t['status'] == 'correction' for t in trades)
+
+    # Terminal rows keep appearing in the orderBook - corrections happen once
+    assert detector.detect_new_trades() == []
+    detector.close()
+
+
 if __name__ == "__main__":
     test_trade_detector()
\ No newline at end of file
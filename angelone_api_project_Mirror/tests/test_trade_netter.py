@@ -0,0 +1,44 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.detection.trade_netter import TradeNetter
+
+
+def _trade(key, side, qty, price, fill_time, symbol='NIFTY25NOV23400CE'):
+    return {'trade_key': key, 'order_id': key, 'symbol': symbol, 'quantity': qty, 'order_type': side,
+            'product_type': 'CARRYFORWARD', 'order_price': price, 'trade_price': price,
+            'trade_time': fill_time}
+
+
+def test_opposing_trades_net_to_remaining_quantity():
+    netter = TradeNetter({})
+    trades, dropped = netter.net([
+        _trade('k1', 'BUY', 150, 45.0, '10:00:01'),
+        _trade('k2', 'SELL', 75, 47.0, '10:00:03'),
+        _trade('k3', 'BUY', 75, 20.0, '10:00:02', symbol='NIFTY25NOV23500PE'),
+    ])
+
+    assert dropped == []
+    assert [t['symbol'] for t in trades] == ['NIFTY25NOV23500PE', 'NIFTY25NOV23400CE']
+    net = trades[1]
+    assert (net['order_type'], net['quantity'], net['order_price']) == ('BUY', 75, 45.0)
+    assert net['trade_key'] == 'k1'
+    assert net['netted_keys'] == ['k1', 'k2']
+    assert 'netted_keys' not in trades[0]
+
+
+def test_flat_round_trip_is_dropped_but_keys_reported():
+    netter = TradeNetter({})
+    trades, dropped = netter.net([
+        _trade('k1', 'BUY', 75, 45.0, '10:00:01'),
+        _trade('k2', 'SELL', 75, 46.0, '10:00:02'),
+    ])
+    assert trades == []
+    assert dropped == ['k1', 'k2']
+    assert netter.get_stats()['groups_flat'] == 1
+
+
+def test_netting_can_be_disabled():
+    batch = [_trade('k1', 'BUY', 75, 45.0, '10:00:01'), _trade('k2', 'SELL', 75, 46.0, '10:00:02')]
+    assert TradeNetter({'net_opposing_fills': False}).net(batch) == (batch, [])